@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Autotune the Whisper configuration for this host.
+
+Benchmarks every combination of model size, compute type, CPU threads,
+worker count and beam size against a labeled set of recorded orders. Each
+transcript goes through the local intent matcher, so accuracy is counted at
+the menu level (the right dish) rather than as word error rate. The fastest
+configuration (by p95 latency) that reaches `--target` accuracy is written to
+the ASR profile that `sushi_voice_master.get_asr_engine()` loads at startup.
+
+The labeled set uses the bench_e2e.py fixture layout: a directory of WAV
+files plus `manifest.json` with [{"file": ..., "order": <menu item>}, ...].
+
+Usage:
+    python asr_autotune.py --fixtures recorded_orders/ [--target 0.95]
+        [--model-sizes tiny,base,small] [--compute-types int8,int8_float32]
+        [--threads 0,4] [--num-workers 1] [--beam-sizes 1,5] [--output asr_profile.json]
+"""
+
+import argparse
+import gc
+import itertools
+import os
+import sys
+import time
+
+from asr_engine import ASREngine, save_asr_profile
+from audio_capture import read_wav
+from bench_e2e import load_fixtures, percentile
+from intent_matcher import LocalIntentMatcher, MENU_ALIASES
+from sushi_voice_master import (
+    ASR_PROFILE_PATH,
+    DEVICE,
+    LANGUAGE,
+    LOCAL_MATCH_THRESHOLD,
+    SUSHI_MENU,
+    WHISPER_SAMPLE_RATE,
+    resample_audio,
+)
+
+
+def load_labeled_set(directory):
+    """Read the fixtures once and resample them to 16 kHz."""
+    samples = []
+    for item in load_fixtures(directory):
+        audio, rate = read_wav(item["path"])
+        samples.append({
+            "file": item["file"],
+            "order": item["order"],
+            "audio": resample_audio(audio, rate, WHISPER_SAMPLE_RATE),
+        })
+    return samples
+
+
+def candidate_grid(model_sizes, compute_types, threads, num_workers, beam_sizes, device):
+    """
+    Group the candidates by the settings that need a model reload; beam size
+    is a decode-time option, so each loaded model is reused for every beam size.
+    """
+    for model_size, compute_type, cpu_threads, workers in itertools.product(
+        model_sizes, compute_types, threads, num_workers
+    ):
+        load_settings = {
+            "model_size": model_size,
+            "device": device,
+            "compute_type": compute_type,
+            "cpu_threads": cpu_threads,
+            "num_workers": workers,
+        }
+        yield load_settings, list(beam_sizes)
+
+
+def evaluate(engine, samples, matcher, language=LANGUAGE, repeats=1):
+    """Transcribe every sample `repeats` times; returns latency and menu-level accuracy."""
+    latencies = []
+    correct = 0
+    confident = 0
+    audio_s = 0.0
+    misses = []
+    for _ in range(repeats):
+        for sample in samples:
+            start = time.perf_counter()
+            text = engine.transcribe(sample["audio"], language=language, vad_filter=True)
+            latencies.append(time.perf_counter() - start)
+            audio_s += len(sample["audio"]) / WHISPER_SAMPLE_RATE
+
+            result = matcher.match(text)
+            if result is not None and result["order"] == sample["order"]:
+                correct += 1
+                confident += result["score"] >= LOCAL_MATCH_THRESHOLD
+            else:
+                misses.append((sample["file"], text))
+    total = len(samples) * repeats
+    return {
+        "accuracy": correct / total,
+        "local_match_rate": confident / total,
+        "p50_s": percentile(latencies, 50),
+        "p95_s": percentile(latencies, 95),
+        "mean_s": sum(latencies) / len(latencies),
+        "rtf": sum(latencies) / audio_s if audio_s else 0.0,
+        "misses": misses[:5],
+    }
+
+
+def autotune(samples, grid, target, engine_factory=ASREngine, language=LANGUAGE, repeats=1):
+    """Run the grid; returns (best settings + metrics or None, all results)."""
+    matcher = LocalIntentMatcher(SUSHI_MENU, MENU_ALIASES)
+    results = []
+    for load_settings, beam_sizes in grid:
+        try:
+            engine = engine_factory(sample_rate=WHISPER_SAMPLE_RATE, **load_settings)
+            engine.load()
+            engine.warm_up(language=language)
+        except Exception as e:
+            print(f"⚠️  Skipping {load_settings}: {e}")
+            continue
+
+        for beam_size in beam_sizes:
+            engine.beam_size = beam_size
+            settings = dict(load_settings, beam_size=beam_size)
+            metrics = evaluate(engine, samples, matcher, language=language, repeats=repeats)
+            metrics["load_time_s"] = engine.load_time_s
+            results.append((settings, metrics))
+            print(
+                f"{settings['model_size']:<9}{settings['compute_type']:<14}"
+                f"threads={settings['cpu_threads']:<3}workers={settings['num_workers']:<2}"
+                f"beam={beam_size:<2} acc={metrics['accuracy']:6.1%} "
+                f"p50={metrics['p50_s'] * 1000:7.0f}ms p95={metrics['p95_s'] * 1000:7.0f}ms "
+                f"rtf={metrics['rtf']:.3f}"
+            )
+
+        # Free the model before loading the next configuration
+        del engine
+        gc.collect()
+
+    eligible = [r for r in results if r[1]["accuracy"] >= target]
+    if not eligible:
+        return None, results
+    return min(eligible, key=lambda r: (r[1]["p95_s"], r[1]["p50_s"])), results
+
+
+def parse_list(value, cast=str):
+    return [cast(v.strip()) for v in value.split(",") if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--fixtures", required=True, help="directory with WAV files and manifest.json")
+    parser.add_argument("--target", type=float, default=0.95, help="minimum menu-level accuracy")
+    parser.add_argument("--model-sizes", default="tiny,base,small")
+    parser.add_argument("--compute-types", default="int8,int8_float32")
+    parser.add_argument("--threads", default=f"0,{max(1, (os.cpu_count() or 2) // 2)},{os.cpu_count() or 1}")
+    parser.add_argument("--num-workers", default="1")
+    parser.add_argument("--beam-sizes", default="1,5")
+    parser.add_argument("--device", default=DEVICE)
+    parser.add_argument("--language", default=LANGUAGE)
+    parser.add_argument("--repeats", type=int, default=1)
+    parser.add_argument("--output", default=ASR_PROFILE_PATH)
+    args = parser.parse_args()
+
+    samples = load_labeled_set(args.fixtures)
+    if not samples:
+        sys.exit(f"No labeled orders in {args.fixtures}")
+    print(f"Autotuning on {len(samples)} labeled orders (target accuracy {args.target:.0%})\n")
+
+    grid = candidate_grid(
+        parse_list(args.model_sizes),
+        parse_list(args.compute_types),
+        sorted(set(parse_list(args.threads, int))),
+        parse_list(args.num_workers, int),
+        parse_list(args.beam_sizes, int),
+        args.device,
+    )
+    best, results = autotune(samples, grid, args.target, language=args.language, repeats=args.repeats)
+
+    if best is None:
+        top = max(results, key=lambda r: r[1]["accuracy"]) if results else None
+        if top:
+            print(f"\n❌ No configuration reached {args.target:.0%}; best was "
+                  f"{top[1]['accuracy']:.1%} with {top[0]}")
+            for file, text in top[1]["misses"]:
+                print(f"   {file}: {text!r}")
+        sys.exit(1)
+
+    settings, metrics = best
+    metrics = {k: v for k, v in metrics.items() if k != "misses"}
+    metrics["fixtures"] = len(samples)
+    metrics["target"] = args.target
+    save_asr_profile(args.output, settings, metrics)
+    print(f"\n✅ Fastest configuration meeting the target: {settings}")
+    print(f"   accuracy {metrics['accuracy']:.1%}, p95 {metrics['p95_s'] * 1000:.0f} ms")
+    print(f"   Profile written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Long-lived speech recognition engine.
+
+The Whisper model is loaded once (at UI / CLI startup) and shared by every
+later order instead of being rebuilt inside `main()` for each button press.
+"""
+
+import json
+import os
+import platform
+import threading
+import time
+
+import numpy as np
+
+# Engine settings stored in an autotuned profile (see asr_autotune.py)
+PROFILE_KEYS = ("model_size", "device", "compute_type", "beam_size", "cpu_threads", "num_workers")
+
+
+def host_fingerprint():
+    """Identify the machine a profile was tuned on (timings do not transfer between hosts)."""
+    return {"machine": platform.machine(), "processor": platform.processor(),
+            "cpu_count": os.cpu_count()}
+
+
+def save_asr_profile(path, settings, metrics=None):
+    """Write the chosen engine settings (plus how they performed) as JSON."""
+    profile = {key: settings[key] for key in PROFILE_KEYS if key in settings}
+    profile["host"] = host_fingerprint()
+    profile["created_at"] = time.time()
+    profile["metrics"] = metrics or {}
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(profile, f, indent=2)
+    os.replace(tmp_path, path)
+    return profile
+
+
+def load_asr_profile(path):
+    """
+    Return the engine settings stored at `path` (ASREngine keyword arguments),
+    or None if there is no usable profile.
+    """
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            profile = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Ignoring unreadable ASR profile {path}: {e}")
+        return None
+    if profile.get("host") and profile["host"] != host_fingerprint():
+        print(f"⚠️  ASR profile {path} was tuned on a different host; re-run asr_autotune.py")
+    return {key: profile[key] for key in PROFILE_KEYS if key in profile}
+
+
+class ASREngine:
+    """
+    Resident faster-whisper model.
+
+    Any object with the same `load()` / `warm_up()` / `transcribe()` methods can
+    be passed to `sushi_voice_master.main(asr_engine=...)`, which is how a fake
+    engine is injected when there is no model or microphone available.
+    """
+
+    def __init__(self, model_size="small", device="cpu", compute_type="int8",
+                 sample_rate=16000, beam_size=5, cpu_threads=0, num_workers=1):
+        self.model_size = model_size
+        self.device = device
+        self.compute_type = compute_type
+        self.sample_rate = sample_rate
+        # Decoding / threading knobs (faster-whisper defaults; 0 threads = library default)
+        self.beam_size = beam_size
+        self.cpu_threads = cpu_threads
+        self.num_workers = num_workers
+        self.model = None
+        # Timings reported after load / warm-up (seconds, None until done)
+        self.load_time_s = None
+        self.warmup_time_s = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_loaded(self):
+        return self.model is not None
+
+    def load(self):
+        """Load the Whisper model once. Later calls return immediately."""
+        with self._lock:
+            if self.model is not None:
+                return self
+            from faster_whisper import WhisperModel
+
+            print(f"Loading Whisper model: {self.model_size}...")
+            start = time.perf_counter()
+            self.model = WhisperModel(
+                self.model_size,
+                device=self.device,
+                compute_type=self.compute_type,
+                cpu_threads=self.cpu_threads,
+                num_workers=self.num_workers,
+            )
+            self.load_time_s = time.perf_counter() - start
+            print(f"Loading complete ({self.load_time_s:.2f}s)\n")
+        return self
+
+    def warm_up(self, seconds=1.0, language="en"):
+        """
+        Run one dummy transcription so the first real order does not pay for
+        lazy initialization inside CTranslate2.
+        """
+        self.load()
+        dummy = np.zeros(int(seconds * self.sample_rate), dtype=np.float32)
+        start = time.perf_counter()
+        self.transcribe(dummy, language=language, vad_filter=False)
+        self.warmup_time_s = time.perf_counter() - start
+        print(f"Whisper warm-up complete ({self.warmup_time_s:.2f}s)")
+        return self
+
+    def transcribe_segments(self, audio_16k, language="en", vad_filter=True, beam_size=None):
+        """
+        Transcribe 16 kHz audio and return a list of (start_s, end_s, text) segments.
+        `beam_size` overrides the engine's for this call (1 = greedy, when short of time).
+        """
+        self.load()
+        segments, _ = self.model.transcribe(
+            audio_16k, language=language, vad_filter=vad_filter,
+            beam_size=beam_size if beam_size is not None else self.beam_size,
+        )
+        return [(seg.start, seg.end, seg.text) for seg in segments]
+
+    def transcribe(self, audio_16k, language="en", vad_filter=True, beam_size=None):
+        """Transcribe 16 kHz mono float32 audio and return the joined text."""
+        segments = self.transcribe_segments(
+            audio_16k, language=language, vad_filter=vad_filter, beam_size=beam_size
+        )
+        return "".join([text for _, _, text in segments]).strip()
+
+    def transcribe_batch(self, audios, language="en"):
+        """
+        Transcribe several short (< 30 s) 16 kHz utterances in one batched
+        CTranslate2 encode + decode and return one text per utterance.
+
+        This skips faster-whisper's per-utterance VAD and segment loop; the
+        utterances are expected to be end-pointed already (audio_capture does
+        that), which is the case for every order.
+        """
+        self.load()
+        if not audios:
+            return []
+        from faster_whisper.audio import pad_or_trim
+        from faster_whisper.tokenizer import Tokenizer
+
+        model = self.model
+        features = np.stack([
+            pad_or_trim(model.feature_extractor(np.asarray(audio, dtype=np.float32)))
+            for audio in audios
+        ])
+        tokenizer = Tokenizer(
+            model.hf_tokenizer, model.model.is_multilingual, task="transcribe", language=language
+        )
+        prompt = list(tokenizer.sot_sequence) + [tokenizer.no_timestamps]
+        encoder_output = model.encode(features)
+        results = model.model.generate(
+            encoder_output,
+            [prompt] * len(audios),
+            beam_size=self.beam_size,
+            max_length=model.max_length,
+            suppress_blank=True,
+        )
+        return [tokenizer.decode(result.sequences_ids[0]).strip() for result in results]
+
+    def stats(self):
+        return {
+            "model_size": self.model_size,
+            "device": self.device,
+            "compute_type": self.compute_type,
+            "beam_size": self.beam_size,
+            "cpu_threads": self.cpu_threads,
+            "num_workers": self.num_workers,
+            "load_time_s": self.load_time_s,
+            "warmup_time_s": self.warmup_time_s,
+        }
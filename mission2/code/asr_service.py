@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+Shared speech recognition service for several ordering kiosks.
+
+One Whisper model serves every kiosk. Utterances from concurrent intake
+clients wait in a bounded queue; a dispatcher groups whatever has arrived
+within a short window (up to `max_batch`) into a micro-batch and hands it to
+a pool of `workers` threads. Under light load a request is decoded alone
+almost immediately; under heavy load batches grow and the model's batched
+decode keeps all cores busy instead of loading one model per kiosk.
+
+Every request reports its queueing delay and processing time.
+
+Kiosks in other processes talk to the service over multiprocessing.connection
+(`serve_forever()` / `ASRServiceClient`); the client has the same interface
+as ASREngine, so it can be passed to `take_order(asr_engine=...)` directly.
+The service binds to localhost unless --host says otherwise; both sides
+authenticate with ASR_SERVICE_AUTHKEY or the generated key file (ipc_auth.py).
+
+Usage:
+    python asr_service.py [--workers 2] [--max-batch 4] [--batch-window-ms 15]
+"""
+
+import argparse
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+import numpy as np
+
+from ipc_auth import is_loopback, load_authkey
+
+ASR_SERVICE_HOST = "127.0.0.1"
+ASR_SERVICE_PORT = int(os.environ.get("ASR_SERVICE_PORT", "6020"))
+ASR_SERVICE_AUTHKEY_ENV = "ASR_SERVICE_AUTHKEY"  # shared secret, else the generated key file (see ipc_auth.py)
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class ASRRequest:
+    """One queued utterance."""
+
+    def __init__(self, audio, language, kiosk):
+        self.audio = audio
+        self.language = language
+        self.kiosk = kiosk
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class ASRService:
+    """
+    Micro-batching front end for one shared engine.
+
+    `engine` is an ASREngine (or compatible). If it has `transcribe_batch()`,
+    each micro-batch is decoded in one call; otherwise the batch's requests are
+    transcribed one by one by the worker that took the batch.
+    """
+
+    def __init__(self, engine, workers=2, max_batch=4, batch_window_s=0.015, max_queue=64,
+                 language="en", history=1000):
+        self.engine = engine
+        self.workers = workers
+        self.max_batch = max_batch
+        self.batch_window_s = batch_window_s
+        self.language = language
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._free_workers = threading.Semaphore(workers)
+        self._threads = []
+        self._batches = queue.Queue()
+        self._stopped = threading.Event()
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.batches = 0
+        self.batch_sizes = []
+        self.queue_s = []
+        self.process_s = []
+        self._history = history
+
+    # ----- Client side -----
+    def submit(self, audio, language=None, kiosk=None, block=True, timeout=None):
+        """Queue one 16 kHz utterance; returns a Future of the result dict."""
+        if self._stopped.is_set():
+            raise RuntimeError("ASR service is stopped")
+        request = ASRRequest(np.asarray(audio, dtype=np.float32), language or self.language, kiosk)
+        self._queue.put(request, block=block, timeout=timeout)
+        return request.future
+
+    def transcribe(self, audio, language=None, kiosk=None, timeout=None):
+        """
+        Blocking transcription. Returns {"text", "queue_s", "process_s", "batch_size"}.
+        """
+        return self.submit(audio, language=language, kiosk=kiosk).result(timeout=timeout)
+
+    @property
+    def depth(self):
+        return self._queue.qsize()
+
+    # ----- Dispatcher / workers -----
+    def start(self):
+        if self._threads:
+            return self
+        self.engine.load()
+        self._threads.append(threading.Thread(target=self._dispatch, name="asr-dispatch", daemon=True))
+        for i in range(self.workers):
+            self._threads.append(threading.Thread(target=self._work, name=f"asr-worker-{i}", daemon=True))
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def _dispatch(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                break
+            # Wait for a free worker first: while every worker is busy,
+            # new requests keep arriving and the next batch grows.
+            self._free_workers.acquire()
+            batch = [first]
+            deadline = time.perf_counter() + self.batch_window_s
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                try:
+                    if remaining > 0:
+                        request = self._queue.get(timeout=remaining)
+                    else:
+                        request = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if request is None:
+                    self._queue.put(None)
+                    break
+                batch.append(request)
+            self._batches.put(batch)
+        for _ in range(self.workers):
+            self._batches.put(None)
+
+    def _work(self):
+        while True:
+            batch = self._batches.get()
+            if batch is None:
+                return
+            try:
+                self._run_batch(batch)
+            finally:
+                self._free_workers.release()
+
+    def _run_batch(self, batch):
+        started = time.perf_counter()
+        try:
+            # Group by language so one batched decode uses one prompt
+            texts = {}
+            for language in {request.language for request in batch}:
+                group = [request for request in batch if request.language == language]
+                if hasattr(self.engine, "transcribe_batch") and len(group) > 1:
+                    outputs = self.engine.transcribe_batch([r.audio for r in group], language=language)
+                else:
+                    outputs = [self.engine.transcribe(r.audio, language=language) for r in group]
+                texts.update(zip(map(id, group), outputs))
+        except Exception as e:
+            for request in batch:
+                request.future.set_exception(e)
+            return
+
+        finished = time.perf_counter()
+        with self._stats_lock:
+            self.batches += 1
+            self.batch_sizes.append(len(batch))
+            for request in batch:
+                self.requests += 1
+                self.queue_s.append(started - request.enqueued_at)
+                self.process_s.append(finished - started)
+            for values in (self.batch_sizes, self.queue_s, self.process_s):
+                del values[:-self._history]
+        for request in batch:
+            request.future.set_result({
+                "text": texts[id(request)],
+                "queue_s": started - request.enqueued_at,
+                "process_s": finished - started,
+                "batch_size": len(batch),
+                "kiosk": request.kiosk,
+            })
+
+    def stop(self):
+        """Finish queued requests, then stop the dispatcher and workers."""
+        if not self._threads or self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "requests": self.requests,
+                "batches": self.batches,
+                "mean_batch_size": (sum(self.batch_sizes) / len(self.batch_sizes)) if self.batch_sizes else 0.0,
+                "depth": self.depth,
+                "queue_p50_s": _percentile(self.queue_s, 50),
+                "queue_p95_s": _percentile(self.queue_s, 95),
+                "process_p50_s": _percentile(self.process_s, 50),
+                "process_p95_s": _percentile(self.process_s, 95),
+            }
+
+    def engine_view(self, kiosk=None):
+        """ASREngine-compatible handle for an in-process kiosk (see LocalServiceEngine)."""
+        return LocalServiceEngine(self, kiosk)
+
+
+class _ServiceEngineBase:
+    """ASREngine interface on top of `self._request_transcription()`."""
+
+    sample_rate = 16000
+    load_time_s = 0.0
+    warmup_time_s = 0.0
+    last_result = None
+
+    @property
+    def is_loaded(self):
+        return True
+
+    def load(self):
+        return self
+
+    def warm_up(self, seconds=1.0, language="en"):
+        return self
+
+    def transcribe(self, audio_16k, language="en", vad_filter=True):
+        self.last_result = self._request_transcription(audio_16k, language)
+        return self.last_result["text"]
+
+    def transcribe_segments(self, audio_16k, language="en", vad_filter=True):
+        text = self.transcribe(audio_16k, language=language, vad_filter=vad_filter)
+        return [(0.0, len(audio_16k) / self.sample_rate, text)] if text else []
+
+
+class LocalServiceEngine(_ServiceEngineBase):
+    """Engine handle that sends transcriptions to an in-process ASRService."""
+
+    def __init__(self, service, kiosk=None):
+        self.service = service
+        self.kiosk = kiosk
+
+    def _request_transcription(self, audio_16k, language):
+        return self.service.transcribe(audio_16k, language=language, kiosk=self.kiosk)
+
+
+# ===== Server (one connection thread per kiosk) =====
+def _handle_connection(conn, service, stop):
+    with conn:
+        while not stop.is_set():
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                return
+            cmd = message.get("cmd")
+            if cmd == "shutdown":
+                stop.set()
+                conn.send({"ok": True})
+                return
+            try:
+                if cmd == "transcribe":
+                    result = service.transcribe(
+                        message["audio"], language=message.get("language"), kiosk=message.get("kiosk")
+                    )
+                    reply = {"ok": True, **result}
+                elif cmd == "stats":
+                    reply = {"ok": True, **service.stats()}
+                elif cmd == "ping":
+                    reply = {"ok": True}
+                else:
+                    reply = {"ok": False, "error": f"Unknown command: {cmd}"}
+            except Exception as e:
+                reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            conn.send(reply)
+
+
+def serve_forever(service, host=ASR_SERVICE_HOST, port=ASR_SERVICE_PORT,
+                  authkey=None, ready=None):
+    """Accept kiosk connections and transcribe their utterances until "shutdown"."""
+    service.start()
+    stop = threading.Event()
+    authkey = authkey or load_authkey(ASR_SERVICE_AUTHKEY_ENV)
+    if not is_loopback(host):
+        print(f"⚠️  ASR service reachable from other machines on {host}: clients need the same {ASR_SERVICE_AUTHKEY_ENV}")
+    listener = Listener((host, port), authkey=authkey)
+    print(f"🎙️  ASR service listening on {host}:{listener.address[1]}")
+    if ready is not None:
+        ready(listener.address)
+
+    def close_on_stop():
+        stop.wait()
+        # Closing the socket does not wake a blocked accept() on Linux; connect once instead.
+        try:
+            Client(listener.address, authkey=authkey).close()
+        except OSError:
+            pass
+        listener.close()
+
+    threading.Thread(target=close_on_stop, daemon=True).start()
+    try:
+        while not stop.is_set():
+            try:
+                conn = listener.accept()
+            except AuthenticationError:
+                print("⚠️  Rejected a connection with a wrong authkey")
+                continue
+            except OSError:
+                break
+            if stop.is_set():
+                conn.close()
+                break
+            threading.Thread(target=_handle_connection, args=(conn, service, stop), daemon=True).start()
+    finally:
+        stop.set()
+        service.stop()
+
+
+class ASRServiceClient(_ServiceEngineBase):
+    """Engine handle for a kiosk process; pass it to take_order(asr_engine=...)."""
+
+    def __init__(self, host=ASR_SERVICE_HOST, port=ASR_SERVICE_PORT, authkey=None,
+                 kiosk=None):
+        self.address = (host, port)
+        self.authkey = authkey or load_authkey(ASR_SERVICE_AUTHKEY_ENV)
+        self.kiosk = kiosk
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _request(self, command):
+        with self._lock:
+            if self._conn is None:
+                self._conn = Client(self.address, authkey=self.authkey)
+            self._conn.send(command)
+            return self._conn.recv()
+
+    def _request_transcription(self, audio_16k, language):
+        reply = self._request({
+            "cmd": "transcribe",
+            "audio": np.asarray(audio_16k, dtype=np.float32),
+            "language": language,
+            "kiosk": self.kiosk,
+        })
+        if not reply.pop("ok"):
+            raise RuntimeError(reply.get("error"))
+        return reply
+
+    def ping(self):
+        try:
+            return self._request({"cmd": "ping"}).get("ok", False)
+        except (OSError, EOFError):
+            return False
+
+    def stats(self):
+        return self._request({"cmd": "stats"})
+
+    def shutdown(self):
+        try:
+            self._request({"cmd": "shutdown"})
+        finally:
+            self.close()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def main():
+    from asr_engine import ASREngine
+    from sushi_voice_master import LANGUAGE, WHISPER_SAMPLE_RATE, asr_settings
+
+    parser = argparse.ArgumentParser(description="Shared ASR service for ordering kiosks")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--max-batch", type=int, default=4)
+    parser.add_argument("--batch-window-ms", type=float, default=15.0)
+    parser.add_argument("--host", default=ASR_SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=ASR_SERVICE_PORT)
+    args = parser.parse_args()
+
+    settings = asr_settings()
+    # One model, `workers` concurrent decodes sharing the weights; split the cores between them
+    settings["num_workers"] = args.workers
+    if not settings.get("cpu_threads"):
+        settings["cpu_threads"] = max(1, (os.cpu_count() or 1) // args.workers)
+    engine = ASREngine(sample_rate=WHISPER_SAMPLE_RATE, **settings)
+    engine.warm_up(language=LANGUAGE)
+
+    service = ASRService(
+        engine, workers=args.workers, max_batch=args.max_batch,
+        batch_window_s=args.batch_window_ms / 1000, language=LANGUAGE,
+    )
+    serve_forever(service, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
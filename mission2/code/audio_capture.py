@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""
+Streaming microphone capture with voice-activity endpointing.
+
+Instead of always recording a fixed number of seconds with `sd.rec()`, the
+recorder reads blocks from a `sounddevice.InputStream` callback, runs a cheap
+energy-based VAD over them and stops once the customer has been silent for a
+short while after speaking (with a hard maximum duration as a ceiling).
+
+`AlwaysOnInput` keeps the microphone open between orders and writes every
+block into a preallocated ring buffer, so a recording can start instantly and
+include a pre-roll of audio from before it was triggered (the customer's
+first syllable is often spoken before the button click reaches the worker).
+
+For testing without a microphone, `wav_stream_factory()` returns a drop-in
+replacement for `sd.InputStream` that plays a WAV file into the callback.
+"""
+
+import math
+import queue
+import threading
+import time
+import wave
+
+import numpy as np
+
+_OVERRUN = object()  # StreamingRecorder._source_blocks(): the reader was overwritten
+
+
+class EnergyVAD:
+    """
+    Frame-level voice-activity detector based on RMS energy.
+
+    A frame is speech when its energy is `ratio` times above the running noise
+    floor and above an absolute minimum. The noise floor only adapts on
+    non-speech frames so a long utterance does not raise it.
+    """
+
+    def __init__(self, min_rms=0.01, ratio=3.0, noise_alpha=0.05, initial_noise=0.003):
+        self.min_rms = min_rms
+        self.ratio = ratio
+        self.noise_alpha = noise_alpha
+        self.initial_noise = initial_noise
+        self.noise_rms = initial_noise
+
+    def reset(self):
+        self.noise_rms = self.initial_noise
+
+    def is_speech(self, frame):
+        if len(frame) == 0:
+            return False
+        rms = math.sqrt(float(np.dot(frame, frame)) / len(frame))
+        speech = rms >= self.min_rms and rms >= self.noise_rms * self.ratio
+        if not speech:
+            self.noise_rms += self.noise_alpha * (rms - self.noise_rms)
+        return speech
+
+
+class RingBuffer:
+    """
+    Mirrored ring buffer of mono float32 samples.
+
+    Every sample is stored twice, `capacity` apart, so any window of up to
+    `capacity` recent samples is one contiguous slice: `view()` returns it
+    without copying. Positions are absolute sample counts since creation.
+    A view aliases the buffer and is overwritten once `capacity` newer
+    samples have been written; copy it to keep it longer.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self._data = np.zeros(2 * self.capacity, dtype=np.float32)
+        self.position = 0  # total samples written
+
+    def write(self, samples):
+        """Append samples (copied into the preallocated storage, no allocation)."""
+        n = len(samples)
+        if n > self.capacity:
+            samples = samples[n - self.capacity:]
+            self.position += n - self.capacity
+            n = self.capacity
+        cap = self.capacity
+        start = self.position % cap
+        self._data[start:start + n] = samples
+        if start + n <= cap:
+            self._data[start + cap:start + cap + n] = samples
+        else:
+            head = cap - start
+            self._data[start + cap:] = samples[:head]
+            self._data[:n - head] = samples[head:]
+        self.position += n
+
+    @property
+    def oldest(self):
+        """Oldest position still held by the buffer."""
+        return max(0, self.position - self.capacity)
+
+    def view(self, start, end):
+        """Zero-copy view of samples [start, end) (absolute positions)."""
+        if start < self.oldest or end > self.position or end < start:
+            raise ValueError(
+                f"Window [{start}, {end}) is outside the buffer [{self.oldest}, {self.position})"
+            )
+        offset = start % self.capacity
+        return self._data[offset:offset + (end - start)]
+
+    def latest(self, n):
+        """Zero-copy view of the most recent `n` samples."""
+        n = min(n, self.position - self.oldest)
+        return self.view(self.position - n, self.position)
+
+
+class AlwaysOnInput:
+    """
+    Microphone input stream that stays open and fills a RingBuffer.
+
+    The stream callback only copies each block into the ring buffer and wakes
+    waiting readers; recordings read from the buffer (see
+    `StreamingRecorder(source=...)`), so no stream is opened per order.
+    `stream_factory` has the same keyword signature as `sd.InputStream`.
+    """
+
+    def __init__(self, sample_rate=48000, channels=1, device=None, buffer_seconds=30.0,
+                 block_ms=30, stream_factory=None):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.device = device
+        self.blocksize = int(sample_rate * block_ms / 1000)
+        self.ring = RingBuffer(int(buffer_seconds * sample_rate))
+        self.stream_factory = stream_factory
+        self._cond = threading.Condition()
+        self._stream = None
+        self.overflows = 0
+
+    def _callback(self, indata, frames, time_info, status):
+        if status:
+            self.overflows += 1
+        self.ring.write(indata[:, 0] if indata.ndim > 1 else indata)
+        with self._cond:
+            self._cond.notify_all()
+
+    def start(self):
+        if self._stream is None:
+            factory = self.stream_factory
+            if factory is None:
+                import sounddevice as sd
+                factory = sd.InputStream
+            stream = factory(
+                samplerate=self.sample_rate,
+                channels=self.channels,
+                dtype="float32",
+                blocksize=self.blocksize,
+                device=self.device,
+                callback=self._callback,
+            )
+            stream.__enter__()
+            self._stream = stream
+        return self
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.__exit__(None, None, None)
+            self._stream = None
+
+    @property
+    def position(self):
+        return self.ring.position
+
+    def wait_for(self, position, timeout=1.0):
+        """Block until the buffer holds samples up to `position`; False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.ring.position >= position, timeout=timeout)
+
+
+class StreamingRecorder:
+    """
+    Record one utterance from an input stream and stop on trailing silence.
+
+    `stream_factory` has the same keyword signature as `sd.InputStream`
+    (samplerate, channels, dtype, blocksize, device, callback) and must return
+    a context manager; it defaults to `sounddevice.InputStream`.
+
+    With `source` (an AlwaysOnInput) no stream is opened: the recording is
+    read from the source's ring buffer, starting `preroll_seconds` before
+    `record()` was called (or at `start_position`, an absolute ring-buffer
+    position, e.g. from a hands-free wake), and returned as a zero-copy view.
+    A reader that falls more than the buffer behind the microphone stops with
+    `stopped_by == "overrun"` and returns the part still held.
+    """
+
+    def __init__(self, sample_rate=48000, channels=1, device=None, max_seconds=7.0,
+                 silence_seconds=0.8, min_speech_seconds=0.15, block_ms=30,
+                 vad=None, stream_factory=None, source=None, preroll_seconds=0.5,
+                 start_position=None):
+        if source is not None:
+            sample_rate = source.sample_rate
+            if (max_seconds + preroll_seconds) * sample_rate > source.ring.capacity:
+                raise ValueError("The source buffer must hold max_seconds + preroll_seconds of audio")
+        self.source = source
+        self.start_position = start_position
+        self.preroll_seconds = preroll_seconds if source is not None else 0.0
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.device = device
+        self.max_seconds = max_seconds
+        self.silence_seconds = silence_seconds
+        self.min_speech_seconds = min_speech_seconds
+        self.blocksize = int(sample_rate * block_ms / 1000)
+        self.vad = vad or EnergyVAD()
+        self.stream_factory = stream_factory
+        # Filled in after each `record()` call
+        self.stopped_by = None
+        self.speech_detected = False
+        self.speech_end_sample = None
+
+    def _open_stream(self, callback):
+        factory = self.stream_factory
+        if factory is None:
+            import sounddevice as sd
+            factory = sd.InputStream
+        return factory(
+            samplerate=self.sample_rate,
+            channels=self.channels,
+            dtype="float32",
+            blocksize=self.blocksize,
+            device=self.device,
+            callback=callback,
+        )
+
+    def _stream_blocks(self):
+        """Open a stream for this recording and yield its blocks (None if it stalls)."""
+        blocks = queue.Queue()
+
+        def callback(indata, frames, time_info, status):
+            if status:
+                print(f"[Audio stream status]: {status}")
+            # The callback buffer is reused by PortAudio, so it must be copied.
+            blocks.put(indata[:, 0].copy() if indata.ndim > 1 else indata.copy())
+
+        with self._open_stream(callback):
+            while True:
+                try:
+                    yield blocks.get(timeout=1.0)
+                except queue.Empty:
+                    yield None
+
+    def _source_blocks(self, start):
+        """
+        Yield zero-copy views of the source's ring buffer from `start` on (None if
+        it stalls, _OVERRUN once `position` has been overwritten).
+        """
+        position = start
+        while True:
+            end = min(position + self.blocksize, self.source.position)
+            if end <= position:
+                if not self.source.wait_for(position + 1, timeout=1.0):
+                    yield None
+                continue
+            if position < self.source.ring.oldest:
+                yield _OVERRUN
+                continue
+            yield self.source.ring.view(position, end)
+            position = end
+
+    def record(self, on_chunk=None):
+        """
+        Record until end-of-speech (or `max_seconds`) and return mono float32 audio.
+
+        `on_chunk(chunk, is_speech)` is called for every block as it arrives,
+        which lets later stages (e.g. incremental transcription) start early.
+        """
+        max_samples = int((self.max_seconds + self.preroll_seconds) * self.sample_rate)
+        silence_limit = int(self.silence_seconds * self.sample_rate)
+        min_speech = int(self.min_speech_seconds * self.sample_rate)
+
+        if self.source is not None:
+            # Start `preroll_seconds` before the trigger (as far as the buffer goes back)
+            if self.start_position is not None:
+                start = max(self.source.ring.oldest, self.start_position)
+            else:
+                trigger = self.source.position
+                start = max(self.source.ring.oldest, trigger - int(self.preroll_seconds * self.sample_rate))
+            buffer = None
+            blocks = self._source_blocks(start)
+        else:
+            buffer = np.empty(max_samples, dtype=np.float32)
+            blocks = self._stream_blocks()
+
+        self.vad.reset()
+        self.stopped_by = "max_duration"
+        self.speech_detected = False
+        self.speech_end_sample = None
+        filled = 0
+        speech_samples = 0
+        silence_run = 0
+
+        try:
+            while filled < max_samples:
+                chunk = next(blocks)
+                if chunk is None:
+                    self.stopped_by = "stream_stalled"
+                    break
+                if chunk is _OVERRUN:
+                    print(f"⚠️  Recording fell behind the microphone buffer after {filled / self.sample_rate:.1f}s")
+                    self.stopped_by = "overrun"
+                    break
+
+                chunk = chunk[: max_samples - filled]
+                n = len(chunk)
+                if buffer is not None:
+                    buffer[filled:filled + n] = chunk
+                filled += n
+
+                speech = self.vad.is_speech(chunk)
+                if speech:
+                    speech_samples += n
+                    silence_run = 0
+                    self.speech_end_sample = filled
+                    if speech_samples >= min_speech:
+                        self.speech_detected = True
+                else:
+                    silence_run += n
+
+                if on_chunk is not None:
+                    on_chunk(chunk, speech)
+
+                if self.speech_detected and silence_run >= silence_limit:
+                    self.stopped_by = "end_of_speech"
+                    break
+        finally:
+            blocks.close()
+
+        if buffer is None:
+            oldest = self.source.ring.oldest  # after an overrun, only the part still held
+            return self.source.ring.view(max(start, oldest), max(start + filled, oldest))
+        return buffer[:filled]
+
+
+def read_wav(path):
+    """Read a WAV file and return (mono float32 audio in [-1, 1], sample_rate)."""
+    with wave.open(path, "rb") as wf:
+        sample_rate = wf.getframerate()
+        channels = wf.getnchannels()
+        width = wf.getsampwidth()
+        raw = wf.readframes(wf.getnframes())
+
+    if width == 2:
+        audio = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 4:
+        audio = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    elif width == 1:
+        audio = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    else:
+        raise ValueError(f"Unsupported WAV sample width: {width}")
+
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+    return audio, sample_rate
+
+
+class WavInputStream:
+    """
+    Fake `sd.InputStream` that feeds a WAV file into the callback block by block.
+
+    After the file ends it keeps delivering silence (like a quiet microphone)
+    until the stream is closed. `load(audio)` switches an open stream to
+    another signal, from its start. With `realtime=True` blocks are paced at
+    the real audio rate; otherwise they are delivered as fast as possible.
+    """
+
+    def __init__(self, audio, samplerate, channels=1, dtype="float32", blocksize=1024,
+                 device=None, callback=None, realtime=False):
+        self.audio = np.asarray(audio, dtype=np.float32)
+        self.samplerate = samplerate
+        self.channels = channels
+        self.blocksize = blocksize or 1024
+        self.callback = callback
+        self.realtime = realtime
+        self._position = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def load(self, audio):
+        """Play `audio` from the next block on (the stream stays open)."""
+        with self._lock:
+            self.audio = np.asarray(audio, dtype=np.float32)
+            self._position = 0
+
+    def _run(self):
+        block_seconds = self.blocksize / self.samplerate
+        next_time = time.perf_counter()
+        while not self._stop.is_set():
+            block = np.zeros((self.blocksize, self.channels), dtype=np.float32)
+            with self._lock:
+                chunk = self.audio[self._position:self._position + self.blocksize]
+                self._position += self.blocksize
+                done = self._position > len(self.audio) + 60 * self.samplerate
+            block[: len(chunk), :] = chunk[:, None]
+            self.callback(block, self.blocksize, None, None)
+            if self.realtime:
+                next_time += block_seconds
+                delay = next_time - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            elif done:
+                # Safety stop so a misconfigured test cannot spin forever.
+                break
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+
+def wav_stream_factory(path, realtime=False):
+    """
+    Return a `stream_factory` for StreamingRecorder that replays `path`.
+    The WAV is resampled to the rate the recorder asks for, if needed.
+    """
+    audio, file_rate = read_wav(path)
+
+    def factory(samplerate, **kwargs):
+        data = audio
+        if file_rate != samplerate:
+            from scipy import signal
+            g = math.gcd(int(file_rate), int(samplerate))
+            data = signal.resample_poly(audio, int(samplerate) // g, int(file_rate) // g)
+        return WavInputStream(data, samplerate, realtime=realtime, **kwargs)
+
+    return factory
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Load test for the shared ASR service with simulated kiosks.
+
+Each kiosk thread replays WAV fixtures as if customers were speaking: it
+waits for the utterance's duration (plus a random pause between customers),
+then sends the audio to the shared service and records the queueing delay,
+processing time and end-to-end latency of the transcription. The same load
+is run with micro-batching off (`max_batch=1`) and on for comparison.
+
+With `--engine scripted` (default) a stand-in engine with a batched cost
+model is used, so the test runs anywhere; `--engine whisper` loads the real
+model with the tuned settings.
+
+Usage:
+    python bench_asr_service.py [--kiosks 6] [--orders 10] [--workers 2] [--max-batch 4]
+                                [--fixtures DIR] [--engine scripted|whisper] [--speed 4]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from asr_service import ASRService
+from audio_capture import read_wav
+from bench_e2e import ScriptedASREngine, load_fixtures, make_fixtures, percentile
+from resampler import PolyphaseResampler
+
+WHISPER_SAMPLE_RATE = 16000
+
+
+class ScriptedBatchEngine(ScriptedASREngine):
+    """
+    Scripted engine whose decodes compete for `cores` CPU cores.
+    A batch of n utterances costs `base_s + rtf * longest + item_s * (n - 1)`:
+    the fixed per-call overhead is paid once per batch.
+    """
+
+    def __init__(self, texts_by_audio, base_s=0.25, rtf=0.1, item_s=0.04, cores=2):
+        super().__init__(base_s=base_s, rtf=rtf)
+        self.texts_by_audio = texts_by_audio
+        self.item_s = item_s
+        self._cores = threading.Semaphore(cores)
+
+    def _text(self, audio):
+        return self.texts_by_audio.get(audio.tobytes(), "")
+
+    def transcribe(self, audio, language=None, vad_filter=True):
+        with self._cores:
+            time.sleep(self.base_s + self.rtf * len(audio) / self.sample_rate)
+        self.decodes += 1
+        return self._text(audio)
+
+    def transcribe_batch(self, audios, language=None):
+        longest = max(len(audio) for audio in audios) / self.sample_rate
+        with self._cores:
+            time.sleep(self.base_s + self.rtf * longest + self.item_s * (len(audios) - 1))
+        self.decodes += 1
+        return [self._text(audio) for audio in audios]
+
+
+def load_utterances(directory):
+    """Fixtures as 16 kHz audio with their expected transcript."""
+    utterances = []
+    for item in load_fixtures(directory):
+        audio, rate = read_wav(item["path"])
+        if rate != WHISPER_SAMPLE_RATE:
+            audio = PolyphaseResampler(rate, WHISPER_SAMPLE_RATE, max_block=len(audio)).resample(audio)
+        utterances.append({"audio": audio, "text": item.get("text", ""), "order": item["order"]})
+    return utterances
+
+
+def kiosk(name, service, utterances, orders, speed, pause_s, results, rng):
+    """One ordering station: speak, wait for the transcript, next customer."""
+    engine = service.engine_view(kiosk=name)
+    for _ in range(orders):
+        utterance = rng.choice(utterances)
+        time.sleep(rng.uniform(0, pause_s) + len(utterance["audio"]) / WHISPER_SAMPLE_RATE / speed)
+        start = time.perf_counter()
+        text = engine.transcribe(utterance["audio"])
+        result = dict(engine.last_result)
+        result["latency_s"] = time.perf_counter() - start
+        result["correct"] = not utterance["text"] or text == utterance["text"]
+        results.append(result)
+
+
+def run_load(engine, utterances, args, max_batch):
+    service = ASRService(
+        engine, workers=args.workers, max_batch=max_batch,
+        batch_window_s=args.batch_window_ms / 1000,
+    ).start()
+    results = []
+    threads = [
+        threading.Thread(
+            target=kiosk,
+            args=(f"kiosk-{i + 1}", service, utterances, args.orders, args.speed, args.pause_s,
+                  results, random.Random(args.seed + i)),
+        )
+        for i in range(args.kiosks)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_s = time.perf_counter() - start
+    service.stop()
+    return results, wall_s, service.stats()
+
+
+def print_results(label, results, wall_s, stats):
+    def ms(values, pct):
+        return percentile(values, pct) * 1000
+
+    queue_s = [r["queue_s"] for r in results]
+    process_s = [r["process_s"] for r in results]
+    latency_s = [r["latency_s"] for r in results]
+    print(f"\n[{label}] {len(results)} utterances in {wall_s:.1f}s "
+          f"({len(results) / wall_s:.2f}/s), mean batch {stats['mean_batch_size']:.2f}, "
+          f"correct {sum(r['correct'] for r in results)}/{len(results)}")
+    print(f"  queue    p50 {ms(queue_s, 50):7.0f} ms  p95 {ms(queue_s, 95):7.0f} ms")
+    print(f"  process  p50 {ms(process_s, 50):7.0f} ms  p95 {ms(process_s, 95):7.0f} ms")
+    print(f"  total    p50 {ms(latency_s, 50):7.0f} ms  p95 {ms(latency_s, 95):7.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for the shared ASR service")
+    parser.add_argument("--kiosks", type=int, default=6)
+    parser.add_argument("--orders", type=int, default=10, help="utterances per kiosk")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--max-batch", type=int, default=4)
+    parser.add_argument("--batch-window-ms", type=float, default=15.0)
+    parser.add_argument("--fixtures", help="directory with WAV files and manifest.json")
+    parser.add_argument("--engine", choices=("scripted", "whisper"), default="scripted")
+    parser.add_argument("--speed", type=float, default=4.0,
+                        help="replay speed of the customers' speech (1 = real time)")
+    parser.add_argument("--pause-s", type=float, default=0.5, help="max pause between customers")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    fixture_dir = args.fixtures
+    if fixture_dir is None:
+        fixture_dir = os.path.join(tempfile.mkdtemp(prefix="asr_service_bench_"), "fixtures")
+        make_fixtures(fixture_dir)
+    utterances = load_utterances(fixture_dir)
+
+    if args.engine == "whisper":
+        from asr_engine import ASREngine
+        from sushi_voice_master import asr_settings
+
+        settings = asr_settings()
+        settings["num_workers"] = args.workers
+        settings["cpu_threads"] = settings.get("cpu_threads") or max(1, (os.cpu_count() or 1) // args.workers)
+        engine = ASREngine(sample_rate=WHISPER_SAMPLE_RATE, **settings).warm_up()
+        # Real transcripts differ from the fixture text; only timings are compared
+        for utterance in utterances:
+            utterance["text"] = ""
+    else:
+        engine = ScriptedBatchEngine(
+            {u["audio"].tobytes(): u["text"] for u in utterances}, cores=args.workers
+        )
+
+    print(f"{args.kiosks} kiosks x {args.orders} utterances, {args.workers} workers")
+    for label, max_batch in (("no batching", 1), (f"micro-batch {args.max_batch}", args.max_batch)):
+        results, wall_s, stats = run_load(engine, utterances, args, max_batch)
+        print_results(label, results, wall_s, stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+"""
+End-to-end order benchmark without a microphone, Gemini key or robot arm.
+
+Drives `sushi_voice_master.main()` (or the overlapped intake / robot
+pipeline) over a corpus of WAV fixtures:
+
+- microphone: fake `sounddevice` that plays each fixture (fake_hardware.FakeSoundDevice)
+- ASR: scripted engine with configurable latency (or the real Whisper engine, `--asr whisper`)
+- LLM: llm_client.StubBackend with configurable base / tail latency
+- robot: fake `lerobot-record` on PATH that sleeps for the episode time,
+  with models cached from a local directory standing in for the Hub
+
+Reports per-stage and end-to-end latency percentiles, orders per minute and
+order-deadline misses / degradation paths, and compares them with a stored
+baseline (exit code 1 on regression).
+
+Usage:
+    python bench_e2e.py [--orders 20] [--episode-s 0.5] [--llm-ms 300] [--force-llm]
+                        [--deadline-s 10] [--asr-tail-ms 0] [--asr-tail-rate 0]
+                        [--mode sequential|pipeline] [--fixtures DIR] [--fast]
+                        [--save-baseline FILE] [--baseline FILE] [--tolerance 0.15]
+
+A fixture directory holds WAV files and a `manifest.json` list of
+{"file": ..., "text": <transcript>, "order": <expected menu item>}; the
+scripted ASR engine returns `text` for each file. Without `--fixtures`,
+synthetic speech-like fixtures are generated.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+from fake_hardware import FakeSoundDevice, LocalHub
+from tracing import PhaseTracer
+
+FIXTURE_SAMPLE_RATE = 48000
+
+# (expected order, transcript); the last ones only resolve through the LLM
+DEFAULT_CORPUS = [
+    ("egg", "One egg sushi please"),
+    ("tuna", "Can I get the tuna"),
+    ("cucumber roll", "Cucumber roll please"),
+    ("tempura (fried shrimp)", "I'd like the fried shrimp"),
+    ("greentea cup", "A cup of green tea"),
+    ("tuna", "Something with raw fish, the red one"),
+    ("greentea cup", "Just something warm to drink"),
+]
+
+REPORT_STAGES = ("capture", "resample", "asr", "intent", "time_to_order", "robot", "end_to_end")
+
+
+# ===== Fixtures =====
+def synth_utterance(text, sample_rate=FIXTURE_SAMPLE_RATE, seed=0):
+    """Speech-like signal: voiced syllables (harmonics of a gliding f0) between short pauses."""
+    rng = np.random.default_rng(seed)
+    lead = np.zeros(int(0.3 * sample_rate), dtype=np.float32)
+    parts = [lead]
+    for word in text.split():
+        n = int((0.12 + 0.05 * len(word)) * sample_rate)
+        t = np.arange(n) / sample_rate
+        f0 = rng.uniform(110, 180) * (1 + 0.1 * np.sin(2 * np.pi * 3 * t))
+        phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+        voiced = sum(np.sin(k * phase) / k for k in range(1, 6))
+        envelope = np.sin(np.pi * t / t[-1]) ** 0.5
+        parts.append((0.2 * envelope * voiced).astype(np.float32))
+        parts.append(np.zeros(int(0.06 * sample_rate), dtype=np.float32))
+    audio = np.concatenate(parts)
+    audio += rng.normal(0, 0.001, len(audio)).astype(np.float32)
+    return audio
+
+
+def write_wav(path, audio, sample_rate):
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2")
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(pcm.tobytes())
+
+
+def make_fixtures(directory, corpus=DEFAULT_CORPUS):
+    """Write synthetic WAV fixtures and their manifest into `directory`; returns the manifest."""
+    os.makedirs(directory, exist_ok=True)
+    manifest = []
+    for i, (order, text) in enumerate(corpus):
+        name = f"order_{i:02d}.wav"
+        write_wav(os.path.join(directory, name), synth_utterance(text, seed=i), FIXTURE_SAMPLE_RATE)
+        manifest.append({"file": name, "text": text, "order": order})
+    with open(os.path.join(directory, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_fixtures(directory):
+    with open(os.path.join(directory, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    for item in manifest:
+        item["path"] = os.path.join(directory, item["file"])
+    return manifest
+
+
+# ===== Stand-ins =====
+class ScriptedASREngine:
+    """
+    ASREngine stand-in that returns the transcript of the fixture being played.
+    Each decode costs `base_s + rtf * audio_seconds` (rtf = real-time factor),
+    plus `tail_s` for a `tail_rate` share of decodes; greedy decoding
+    (beam_size=1) is `greedy_speedup` times faster.
+    """
+
+    def __init__(self, base_s=0.05, rtf=0.1, sample_rate=16000, texts=None, tail_s=0.0, tail_rate=0.0,
+                 beam_size=5, greedy_speedup=3.0):
+        self.base_s = base_s
+        self.rtf = rtf
+        self.tail_s = tail_s
+        self.tail_rate = tail_rate
+        self.beam_size = beam_size
+        self.greedy_speedup = greedy_speedup
+        self.sample_rate = sample_rate
+        self.text = ""
+        # fingerprint(audio) -> transcript, for audio that arrives without script()
+        self.texts = dict(texts or {})
+        self.load_time_s = 0.0
+        self.warmup_time_s = 0.0
+        self.decodes = 0
+
+    @property
+    def is_loaded(self):
+        return True
+
+    def script(self, text):
+        self.text = text
+
+    @staticmethod
+    def fingerprint(audio):
+        return len(audio), round(float(np.abs(audio).sum()), 2)
+
+    def add_transcript(self, audio_16k, text):
+        self.texts[self.fingerprint(audio_16k)] = text
+
+    def load(self):
+        return self
+
+    def warm_up(self, seconds=1.0, language=None):
+        return 0.0
+
+    def transcribe_segments(self, audio, language=None, vad_filter=True, beam_size=None):
+        seconds = len(audio) / self.sample_rate
+        cost = self.base_s + self.rtf * seconds
+        if self.tail_rate and random.random() < self.tail_rate:
+            cost += self.tail_s
+        if (beam_size or self.beam_size) == 1 and self.beam_size > 1:
+            cost /= self.greedy_speedup
+        time.sleep(cost)
+        self.decodes += 1
+        text = self.texts.get(self.fingerprint(audio), self.text) if self.texts else self.text
+        return [(0.0, seconds, text)] if text else []
+
+    def transcribe(self, audio, language=None, vad_filter=True, beam_size=None):
+        return " ".join(
+            text for _, _, text in self.transcribe_segments(audio, language, vad_filter, beam_size)
+        )
+
+
+def make_llm_reply(fixtures):
+    """Stub LLM reply that returns the expected order of the transcript in the prompt."""
+
+    def reply(prompt):
+        for item in fixtures:
+            if item["text"] in prompt:
+                return json.dumps({"order": item["order"], "confidence": "high"})
+        return json.dumps({"order": "egg", "confidence": "low"})
+
+    return reply
+
+
+def make_llm_latency(base_ms, tail_ms, tail_rate):
+    def latency():
+        return (tail_ms if random.random() < tail_rate else base_ms) / 1000
+
+    return latency
+
+
+# ===== Statistics =====
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def summarize(samples):
+    return {
+        "count": len(samples),
+        "p50": percentile(samples, 50),
+        "p95": percentile(samples, 95),
+        "p99": percentile(samples, 99),
+        "mean": sum(samples) / len(samples),
+    }
+
+
+def summarize_deadlines(traces):
+    """Deadline misses and degradation paths of the traced orders (see order_deadline.py)."""
+    reports = [t["deadline"] for t in traces if t.get("deadline")]
+    if not reports or reports[0]["budget_s"] is None:
+        return None
+    paths = {}
+    for report in reports:
+        path = " > ".join(report["path"]) or "none"
+        paths[path] = paths.get(path, 0) + 1
+    return {
+        "budget_s": reports[0]["budget_s"],
+        "missed": sum(report["missed"] for report in reports),
+        "stage_misses": sum(len(report["stage_misses"]) for report in reports),
+        "intake_p95": percentile([report["elapsed_s"] for report in reports], 95),
+        "paths": paths,
+    }
+
+
+def build_report(traces, wall_s, correct, config):
+    stages = {}
+    for stage in REPORT_STAGES:
+        samples = [t["spans"][stage] for t in traces if stage in t["spans"]]
+        if samples:
+            stages[stage] = summarize(samples)
+    return {
+        "config": config,
+        "orders": len(traces),
+        "accuracy": correct / len(traces) if traces else 0.0,
+        "wall_s": wall_s,
+        "orders_per_minute": len(traces) / wall_s * 60 if wall_s else 0.0,
+        "stages": stages,
+        "deadline": summarize_deadlines(traces),
+    }
+
+
+def print_report(report):
+    print(f"\n{'stage':<15}{'n':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, s in report["stages"].items():
+        print(f"{stage:<15}{s['count']:>5}{s['p50'] * 1000:>10.1f}"
+              f"{s['p95'] * 1000:>10.1f}{s['p99'] * 1000:>10.1f}")
+    print(f"\norders: {report['orders']}  accuracy: {report['accuracy']:.0%}  "
+          f"wall: {report['wall_s']:.1f}s  orders/min: {report['orders_per_minute']:.2f}")
+    deadline = report.get("deadline")
+    if deadline:
+        print(f"deadline {deadline['budget_s']:.1f}s: {deadline['missed']} missed, "
+              f"{deadline['stage_misses']} stage overruns, intake p95 {deadline['intake_p95']:.2f}s")
+        for path, count in sorted(deadline["paths"].items(), key=lambda kv: -kv[1]):
+            print(f"  {count:4d}  {path}")
+
+
+def compare_with_baseline(report, baseline, tolerance, floor_s=0.005):
+    """Print the change against `baseline`; returns a list of regressions."""
+    regressions = []
+    print(f"\nBaseline comparison (tolerance {tolerance:.0%}):")
+    for stage, s in report["stages"].items():
+        base = baseline.get("stages", {}).get(stage)
+        if not base:
+            continue
+        for key in ("p50", "p95"):
+            old, new = base[key], s[key]
+            change = (new - old) / old if old else 0.0
+            regressed = new > old * (1 + tolerance) and new - old > floor_s
+            mark = "  REGRESSION" if regressed else ""
+            print(f"  {stage:<15}{key}: {old * 1000:8.1f} → {new * 1000:8.1f} ms ({change:+.0%}){mark}")
+            if regressed:
+                regressions.append(f"{stage} {key}")
+
+    old, new = baseline.get("orders_per_minute", 0.0), report["orders_per_minute"]
+    if old:
+        regressed = new < old * (1 - tolerance)
+        print(f"  {'throughput':<15}{old:8.2f} → {new:8.2f} orders/min ({(new - old) / old:+.0%})"
+              f"{'  REGRESSION' if regressed else ''}")
+        if regressed:
+            regressions.append("orders_per_minute")
+    return regressions
+
+
+# ===== Benchmark =====
+def install_stand_ins(work_dir, episode_s=0.5, startup_s=0.0, capture_rates=(48000,),
+                      realtime=True):
+    """
+    Install the fake microphone and put a fake lerobot-record on PATH.
+    Must run before sushi_voice_master is imported; returns the fake sounddevice.
+    """
+    sd = FakeSoundDevice(supported_rates=capture_rates, realtime=realtime)
+    sys.modules["sounddevice"] = sd
+
+    import fake_lerobot_record
+    bin_dir = os.path.join(work_dir, "bin")
+    fake_lerobot_record.install(bin_dir)
+    os.environ["PATH"] = bin_dir + os.pathsep + os.environ.get("PATH", "")
+    os.environ["FAKE_LEROBOT_EPISODE_S"] = str(episode_s)
+    os.environ["FAKE_LEROBOT_STARTUP_S"] = str(startup_s)
+    return sd
+
+
+def configure_backends(master, fixtures, work_dir, llm_ms=300.0, llm_tail_ms=1500.0,
+                       llm_tail_rate=0.05):
+    """Point the shared LLM client and serving backend of sushi_voice_master at the stand-ins."""
+    from llm_client import StubBackend
+    from model_inference import ModelInference
+
+    master.get_llm_client(StubBackend(
+        reply=make_llm_reply(fixtures),
+        latency_s=make_llm_latency(llm_ms, llm_tail_ms, llm_tail_rate),
+    ))
+
+    hub_root = os.path.join(work_dir, "hub")
+    for repo_id in master.SUSHI_MODEL_PATHS.values():
+        os.makedirs(os.path.join(hub_root, repo_id), exist_ok=True)
+        with open(os.path.join(hub_root, repo_id, "config.json"), "w") as f:
+            json.dump({"type": "act"}, f)
+    backend = ModelInference(
+        model_paths=master.SUSHI_MODEL_PATHS,
+        robot_port=master.ROBOT_PORT,
+        robot_id=master.ROBOT_ID,
+        cameras=master.ROBOT_CAMERAS,
+        run_root=os.path.join(work_dir, "runs"),
+        cache_dir=os.path.join(work_dir, "model_cache"),
+        downloader=LocalHub(hub_root),
+    )
+    master.get_serving_backend(backend)
+    backend.prefetch_all()
+    master.ORDER_CACHE.clear()
+    master.ORDER_HISTORY_PATH = os.path.join(work_dir, "order_history.sqlite3")
+
+
+def run_benchmark(args):
+    work_dir = tempfile.mkdtemp(prefix="sushi_bench_")
+    sd = install_stand_ins(
+        work_dir, episode_s=args.episode_s, startup_s=args.startup_s,
+        capture_rates=(16000, 48000) if args.capture_16k else (48000,), realtime=not args.fast,
+    )
+    import sushi_voice_master as master
+
+    fixture_dir = args.fixtures
+    if fixture_dir is None:
+        fixture_dir = os.path.join(work_dir, "fixtures")
+        make_fixtures(fixture_dir)
+    fixtures = load_fixtures(fixture_dir)
+    configure_backends(master, fixtures, work_dir, args.llm_ms, args.llm_tail_ms, args.llm_tail_rate)
+    if args.force_llm:
+        master.LOCAL_MATCH_THRESHOLD = 1.01  # every order goes through the (stub) LLM
+    master.CAPTURE_MODE = args.capture_mode
+    if args.fast:
+        # An unpaced fake mic overruns any ring buffer: open a stream per order instead
+        master.ALWAYS_ON_MIC = False
+    if args.deadline_s is not None:
+        master.ORDER_DEADLINE_S = args.deadline_s
+
+    if args.asr == "whisper":
+        engine = master.get_asr_engine(warm_up=True)
+    else:
+        engine = ScriptedASREngine(
+            base_s=args.asr_base_ms / 1000, rtf=args.asr_rtf,
+            tail_s=args.asr_tail_ms / 1000, tail_rate=args.asr_tail_rate,
+        )
+
+    traces = []
+    tracer = PhaseTracer(window=max(500, args.orders), on_finish=traces.append)
+    correct = 0
+
+    print(f"Running {args.orders} orders ({args.mode}) from {len(fixtures)} fixtures...")
+    start = time.perf_counter()
+    if args.mode == "pipeline":
+        from order_pipeline import OrderPipeline
+        pipeline = OrderPipeline(master.serve_order, max_queue=master.PIPELINE_MAX_QUEUE).start()
+    for i in range(args.orders):
+        item = fixtures[i % len(fixtures)]
+        sd.play(item["path"])
+        if isinstance(engine, ScriptedASREngine):
+            engine.script(item["text"])
+        callback = tracer.wrap()
+        if args.mode == "pipeline":
+            pipeline.wait_for_capacity()
+            _, order = master.take_order(callback, asr_engine=engine)
+            pipeline.submit(order, status_callback=callback)
+        else:
+            _, order = master.main(callback, asr_engine=engine)
+        correct += order == item["order"]
+    if args.mode == "pipeline":
+        pipeline.stop()
+    wall_s = time.perf_counter() - start
+
+    config = {
+        key: getattr(args, key)
+        for key in ("mode", "asr", "episode_s", "startup_s", "llm_ms", "llm_tail_ms",
+                    "llm_tail_rate", "asr_tail_ms", "asr_tail_rate", "deadline_s", "force_llm",
+                    "capture_mode", "fast")
+    }
+    return build_report(traces, wall_s, correct, config)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--orders", type=int, default=20)
+    parser.add_argument("--mode", choices=("sequential", "pipeline"), default="sequential")
+    parser.add_argument("--fixtures", help="directory with WAV files and manifest.json")
+    parser.add_argument("--asr", choices=("scripted", "whisper"), default="scripted")
+    parser.add_argument("--asr-base-ms", type=float, default=50.0)
+    parser.add_argument("--asr-rtf", type=float, default=0.1)
+    parser.add_argument("--asr-tail-ms", type=float, default=0.0, help="extra time of a slow decode")
+    parser.add_argument("--asr-tail-rate", type=float, default=0.0, help="share of slow decodes")
+    parser.add_argument("--llm-ms", type=float, default=300.0)
+    parser.add_argument("--llm-tail-ms", type=float, default=1500.0)
+    parser.add_argument("--llm-tail-rate", type=float, default=0.05)
+    parser.add_argument("--force-llm", action="store_true", help="skip the local matcher")
+    parser.add_argument("--deadline-s", type=float, help="order deadline (default: the master's; 0 = none)")
+    parser.add_argument("--episode-s", type=float, default=0.5, help="fake robot episode time")
+    parser.add_argument("--startup-s", type=float, default=0.0, help="fake lerobot-record start-up")
+    parser.add_argument("--capture-mode", choices=("streaming", "fixed"), default="streaming")
+    parser.add_argument("--capture-16k", action="store_true", help="fake mic supports 16 kHz")
+    parser.add_argument("--fast", action="store_true", help="play fixtures faster than real time")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save-baseline", metavar="FILE")
+    parser.add_argument("--baseline", metavar="FILE")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    parser.add_argument("--json", metavar="FILE", help="write the report as JSON")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    report = run_benchmark(args)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline saved to {args.save_baseline}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(report, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ Regressions: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\n✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
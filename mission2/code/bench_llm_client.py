@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark LLMClient timeouts and hedging against a local stub LLM server.
+
+The stub server answers every POST after an injected latency: usually
+`--base-ms`, but a `--tail-rate` fraction of requests take `--tail-ms`.
+
+Usage:
+    python bench_llm_client.py [--requests 200] [--base-ms 150] [--tail-ms 2000] [--tail-rate 0.1]
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llm_client import HTTPBackend, LLMClient
+
+STUB_REPLY = '{"order": "tuna", "confidence": "high"}'
+
+
+def start_stub_server(base_ms, tail_ms, tail_rate, port=0):
+    """Start the stub LLM server in a daemon thread and return (server, url)."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            self.rfile.read(length)
+            delay_ms = tail_ms if random.random() < tail_rate else base_ms
+            time.sleep(delay_ms / 1000)
+            body = json.dumps({"text": STUB_REPLY}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/generate"
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run(client, requests):
+    latencies = []
+    errors = 0
+    for _ in range(requests):
+        start = time.perf_counter()
+        try:
+            client.generate("Customer's statement: tuna please")
+        except TimeoutError:
+            errors += 1
+        latencies.append(time.perf_counter() - start)
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--base-ms", type=float, default=150)
+    parser.add_argument("--tail-ms", type=float, default=2000)
+    parser.add_argument("--tail-rate", type=float, default=0.1)
+    parser.add_argument("--timeout-s", type=float, default=6.0)
+    parser.add_argument("--hedge-percentile", type=float, default=90)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    server, url = start_stub_server(args.base_ms, args.tail_ms, args.tail_rate)
+    print(f"Stub LLM at {url}: {args.base_ms:.0f} ms, {args.tail_rate:.0%} of requests "
+          f"{args.tail_ms:.0f} ms")
+
+    configs = [
+        ("no hedging", None),
+        (f"hedge @ p{args.hedge_percentile:g}", args.hedge_percentile),
+    ]
+    for name, hedge in configs:
+        client = LLMClient(HTTPBackend(url), timeout_s=args.timeout_s, hedge_percentile=hedge)
+        latencies, errors = run(client, args.requests)
+        stats = client.stats()
+        print(f"\n{name}:")
+        print(f"  p50 {percentile(latencies, 50) * 1000:7.1f} ms   "
+              f"p95 {percentile(latencies, 95) * 1000:7.1f} ms   "
+              f"p99 {percentile(latencies, 99) * 1000:7.1f} ms")
+        print(f"  timeouts {errors}   hedged {stats['hedged']}   hedge wins {stats['hedge_wins']}")
+        client.close()
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
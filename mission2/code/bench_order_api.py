@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Load generator for the headless order API.
+
+Many concurrent asyncio clients place orders as JSON text, WAV uploads or
+PCM streamed over the WebSocket (round robin), and record the time until the
+order is recognized (and, with `--serve`, until the robot has served it).
+
+With `--spawn` a fake API server (stub ASR / LLM / robot, see
+`order_api.py --fake`) is started in this process, so the whole run is local.
+
+Usage:
+    python bench_order_api.py --spawn [--clients 20] [--orders 5] [--serve]
+    python bench_order_api.py --url http://127.0.0.1:8080 --fixtures DIR
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import threading
+import time
+
+import aiohttp
+import numpy as np
+
+from audio_capture import read_wav
+from bench_e2e import load_fixtures, make_fixtures, percentile
+
+MODES = ("text", "wav", "stream")
+
+
+async def text_order(session, url, item, serve):
+    async with session.post(
+        f"{url}/orders", params={"wait": "served" if serve else "recognized"},
+        json={"text": item["text"], "serve": serve},
+    ) as response:
+        return response.status, await response.json()
+
+
+async def wav_order(session, url, item, serve):
+    async with session.post(
+        f"{url}/orders",
+        params={"wait": "served" if serve else "recognized", "serve": int(serve)},
+        data=item["wav_bytes"], headers={"Content-Type": "audio/wav"},
+    ) as response:
+        return response.status, await response.json()
+
+
+async def stream_order(session, url, item, serve, block=4800):
+    """Stream float32 PCM over the WebSocket and wait for the final event."""
+    final = "served" if serve else "recognized"
+    async with session.ws_connect(f"{url}/ws") as ws:
+        await ws.send_str(json.dumps({
+            "type": "audio_start", "sample_rate": item["sample_rate"], "format": "f32", "serve": serve,
+        }))
+        audio = item["audio"]
+        for start in range(0, len(audio), block):
+            await ws.send_bytes(audio[start:start + block].astype("<f4").tobytes())
+        await ws.send_str(json.dumps({"type": "audio_end"}))
+        async for msg in ws:
+            event = json.loads(msg.data)
+            if event.get("type") == "error":
+                return 400, event
+            if event.get("type") == "event" and event["phase"] in (final, "rejected", "failed"):
+                status = 200 if event["phase"] == final else 503
+                return status, {"result": {"order": event.get("order")}, "status": event["phase"]}
+    return 500, {}
+
+
+async def client(session, url, fixtures, orders, serve, counter, results):
+    for _ in range(orders):
+        n = next(counter)
+        item = fixtures[n % len(fixtures)]
+        mode = MODES[n % len(MODES)]
+        start = time.perf_counter()
+        try:
+            send = {"text": text_order, "wav": wav_order, "stream": stream_order}[mode]
+            status, payload = await send(session, url, item, serve)
+        except aiohttp.ClientError as e:
+            status, payload = 0, {"error": str(e)}
+        order = (payload.get("result") or {}).get("order")
+        results.append({
+            "mode": mode,
+            "status": status,
+            "latency_s": time.perf_counter() - start,
+            "correct": order == item["order"],
+        })
+
+
+def spawn_fake_server(args):
+    """Start `order_api --fake` on a free port in a daemon thread; returns (url, fixture_dir)."""
+    import order_api
+
+    service, fixture_dir = order_api.build_fake_service(
+        args.fixtures, episode_s=args.episode_s, llm_ms=args.llm_ms
+    )
+    service.max_queue = args.robot_queue
+    ready = threading.Event()
+    port = {}
+
+    def on_ready(bound_port):
+        port["port"] = bound_port
+        ready.set()
+
+    threading.Thread(
+        target=lambda: asyncio.run(order_api.run_server(service, "127.0.0.1", 0, ready=on_ready)),
+        daemon=True,
+    ).start()
+    ready.wait()
+    return f"http://127.0.0.1:{port['port']}", fixture_dir
+
+
+def prepare_fixtures(directory):
+    fixtures = load_fixtures(directory)
+    for item in fixtures:
+        with open(item["path"], "rb") as f:
+            item["wav_bytes"] = f.read()
+        item["audio"], item["sample_rate"] = read_wav(item["path"])
+        item["audio"] = np.asarray(item["audio"], dtype=np.float32)
+    return fixtures
+
+
+async def run(url, fixtures, args):
+    results = []
+    counter = itertools.count()
+    connector = aiohttp.TCPConnector(limit=args.clients)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            client(session, url, fixtures, args.orders, args.serve, counter, results)
+            for _ in range(args.clients)
+        ])
+        wall_s = time.perf_counter() - start
+        async with session.get(f"{url}/stats") as response:
+            stats = await response.json()
+    return results, wall_s, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load generator for the order API")
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument("--spawn", action="store_true", help="start a fake API server in-process")
+    parser.add_argument("--fixtures", help="fixture directory (the server must know the same set)")
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--orders", type=int, default=5, help="orders per client")
+    parser.add_argument("--serve", action="store_true", help="wait until the robot served each order")
+    parser.add_argument("--episode-s", type=float, default=0.2)
+    parser.add_argument("--llm-ms", type=float, default=300.0)
+    parser.add_argument("--robot-queue", type=int, default=100)
+    args = parser.parse_args()
+
+    url = args.url
+    fixture_dir = args.fixtures
+    if args.spawn:
+        url, fixture_dir = spawn_fake_server(args)
+    elif fixture_dir is None:
+        fixture_dir = os.path.join(os.getcwd(), "order_api_fixtures")
+        make_fixtures(fixture_dir)
+    fixtures = prepare_fixtures(fixture_dir)
+
+    results, wall_s, stats = asyncio.run(run(url, fixtures, args))
+
+    print(f"\n{len(results)} orders from {args.clients} clients in {wall_s:.1f}s "
+          f"({len(results) / wall_s:.1f} orders/s)")
+    for mode in MODES:
+        latencies = [r["latency_s"] for r in results if r["mode"] == mode and r["status"] == 200]
+        failures = sum(1 for r in results if r["mode"] == mode and r["status"] != 200)
+        correct = sum(r["correct"] for r in results if r["mode"] == mode)
+        if latencies:
+            print(f"  {mode:<7} n={len(latencies):<4} p50 {percentile(latencies, 50) * 1000:7.0f} ms  "
+                  f"p95 {percentile(latencies, 95) * 1000:7.0f} ms  correct {correct}  failed {failures}")
+        elif failures:
+            print(f"  {mode:<7} failed {failures}")
+    print(f"server: {stats}")
+
+
+if __name__ == "__main__":
+    main()
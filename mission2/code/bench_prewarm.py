@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the order history and demand-driven policy prewarming.
+
+1. Order history: `--history-days` synthetic days of orders are written to
+   an OrderHistory (SQLite), once with batched writes and once with a
+   commit per order (as an unbatched log on the order path would do).
+   Reports the time the order path spends per order and the total.
+2. Replay: the next synthetic day is served on a PolicyRuntime that keeps
+   `--budget` policies resident (fake loader, so only loads are counted).
+   The demand changes over the day (tuna / egg at lunch, green tea in the
+   afternoon, tempura in the evening). Warm-set strategies between orders:
+   - lru:       nothing is prewarmed; the runtime keeps what was served last
+   - fixed:     an arbitrary warm set (the first `--budget` menu dishes)
+   - predicted: DemandPrewarmer with a DemandPredictor learned from the history
+   Reports cold starts (plan steps whose policy had to be loaded while the
+   customer waited), the estimated wait at `--load-s` per load, background
+   preloads and the prewarmer's hit rates.
+
+Usage:
+    python bench_prewarm.py [--history-days 14] [--budget 2] [--load-s 4.0] [--seed 0]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+
+from demand_predictor import DemandPredictor, DemandPrewarmer
+from fake_hardware import FakePolicyLoader, FakeRobot
+from order_history import OrderHistory
+from policy_server import LocalPolicyBackend, PolicyRuntime
+from serving_plan import build_plan, items_to_order
+
+SUSHI_MENU = ["egg", "tuna", "cucumber roll", "tempura (fried shrimp)", "greentea cup"]
+MODEL_PATHS = {item: f"fake/{item.split()[0]}" for item in SUSHI_MENU}
+
+# (from hour, to hour, orders per hour, dish weights)
+DAY_PROFILE = [
+    (11, 14, 30, {"tuna": 5, "egg": 4, "cucumber roll": 1.5, "tempura (fried shrimp)": 0.5, "greentea cup": 1}),
+    (14, 17, 12, {"tuna": 0.5, "egg": 1, "cucumber roll": 2, "tempura (fried shrimp)": 0.5, "greentea cup": 5}),
+    (17, 21, 25, {"tuna": 1.5, "egg": 0.5, "cucumber roll": 3, "tempura (fried shrimp)": 5, "greentea cup": 1}),
+]
+
+
+def synthetic_day(day_start, rng):
+    """[(timestamp, [items])] of one day: Poisson arrivals, 1-3 dishes per order, day-to-day noise."""
+    orders = []
+    for from_hour, to_hour, per_hour, weights in DAY_PROFILE:
+        noisy = {item: w * rng.uniform(0.7, 1.3) for item, w in weights.items()}
+        t = day_start + from_hour * 3600
+        while True:
+            t += rng.expovariate(per_hour / 3600)
+            if t >= day_start + to_hour * 3600:
+                break
+            n = rng.choices((1, 2, 3), weights=(0.7, 0.25, 0.05))[0]
+            orders.append((t, rng.choices(list(noisy), weights=list(noisy.values()), k=n)))
+    return orders
+
+
+def trace_record(ts, items, rng):
+    """An order as PhaseTracer reports it (see OrderHistory.record())."""
+    return {
+        "started_at": ts,
+        "status": "served",
+        "order": items_to_order([{"order": item, "quantity": 1} for item in items]),
+        "text": " and ".join(items),
+        "confidence": "high",
+        "source": rng.choice(("local", "local", "cache", "llm")),
+        "fallback": False,
+        "spans": {"asr": rng.uniform(0.2, 0.6), "intent": rng.uniform(0.0, 0.4), "robot": 20.0},
+    }
+
+
+def write_history(path, days, batched, rng):
+    """Log every order of `days`; returns (order-path ms per order, total s, history)."""
+    history = OrderHistory(path, batch_size=32 if batched else 1, flush_interval_s=1.0)
+    records = [trace_record(ts, items, rng) for day in days for ts, items in day]
+    start = time.perf_counter()
+    path_s = 0.0
+    for record in records:
+        t = time.perf_counter()
+        history.record(record)
+        if not batched:
+            history.flush()
+        path_s += time.perf_counter() - t
+    history.flush()
+    total_s = time.perf_counter() - start
+    return path_s * 1000 / len(records), total_s, history
+
+
+def replay(strategy, day, args, history):
+    loader = FakePolicyLoader()
+    runtime = PolicyRuntime(FakeRobot(), loader, max_policies=args.budget)
+    backend = LocalPolicyBackend(runtime, MODEL_PATHS)
+    prewarmer = None
+    if strategy == "predicted":
+        predictor = DemandPredictor(SUSHI_MENU, half_life_s=args.half_life_s)
+        predictor.fit(history.item_events(until=day[0][0]))
+        prewarmer = DemandPrewarmer(backend, predictor, MODEL_PATHS, budget=args.budget)
+
+    cold = runs = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        if prewarmer is not None:
+            prewarmer.refresh(now=day[0][0] - 600)
+        elif strategy == "fixed":
+            backend.cache_models(SUSHI_MENU[:args.budget])
+        for ts, items in day:
+            resident = list(runtime.policies)
+            for item, _ in build_plan(items, warm=resident):
+                cold += item not in runtime.policies
+                runs += 1
+                runtime.preload(item, MODEL_PATHS[item])
+            # Between orders: prewarm for the next one
+            if prewarmer is not None:
+                prewarmer.observe(items, resident=resident, now=ts)
+                prewarmer.refresh(now=ts + 60)
+            elif strategy == "fixed":
+                backend.cache_models(SUSHI_MENU[:args.budget])
+    runtime.close()
+    return {
+        "strategy": strategy,
+        "runs": runs,
+        "cold": cold,
+        "background": len(loader.loads) - cold,
+        "stats": prewarmer.stats() if prewarmer is not None else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the order history and demand-driven prewarming")
+    parser.add_argument("--history-days", type=int, default=14)
+    parser.add_argument("--budget", type=int, default=2, help="policies kept resident")
+    parser.add_argument("--load-s", type=float, default=4.0, help="policy load time for the wait estimate")
+    parser.add_argument("--half-life-s", type=float, default=1800.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    first_day = time.mktime((2025, 6, 2, 0, 0, 0, 0, 0, -1))
+    days = [synthetic_day(first_day + d * 86400, rng) for d in range(args.history_days + 1)]
+    past, today = days[:-1], days[-1]
+    n_orders = sum(len(day) for day in past)
+
+    work_dir = tempfile.mkdtemp(prefix="sushi_prewarm_bench_")
+    print(f"Order history: {n_orders} orders over {len(past)} days (SQLite)")
+    history = None
+    for batched in (False, True):
+        ms, total_s, history = write_history(
+            os.path.join(work_dir, f"history_{'batched' if batched else 'single'}.sqlite3"),
+            past, batched, random.Random(args.seed),
+        )
+        label = "batched (32)" if batched else "commit per order"
+        print(f"  {label:<18} order path {ms:7.3f} ms/order   total {total_s:6.2f}s")
+        if not batched:
+            history.close()
+    print(f"  {history.stats()}")
+
+    print(f"\nReplay of day {args.history_days + 1}: {len(today)} orders, "
+          f"{sum(len(items) for _, items in today)} dishes, {args.budget} resident policies")
+    print(f"  {'strategy':<10} {'cold':>5} {'rate':>6} {'wait':>8} {'preloads':>9}   hit rates")
+    results = [replay(strategy, today, args, history) for strategy in ("lru", "fixed", "predicted")]
+    for r in results:
+        hits = ""
+        if r["stats"]:
+            hits = (f"predicted {r['stats']['predicted_hit_rate'] * 100:.0f}%, "
+                    f"resident {r['stats']['resident_hit_rate'] * 100:.0f}%")
+        print(f"  {r['strategy']:<10} {r['cold']:5d} {r['cold'] / r['runs'] * 100:5.0f}% "
+              f"{r['cold'] * args.load_s:7.0f}s {r['background']:9d}   {hits}")
+    fixed, predicted = results[1]["cold"], results[2]["cold"]
+    if fixed:
+        print(f"  predicted vs fixed warm set: {(1 - predicted / fixed) * 100:.0f}% fewer cold starts")
+    history.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark for eval-episode recording modes.
+
+1. Policy runtime (policy server / LocalPolicyBackend): a fake robot with two
+   noisy 640x480 cameras and fake policies serve `--episodes` episodes per
+   mode; every `--fail-every`-th episode gets a time limit shorter than the
+   motion, so it ends by timeout (a failure). Modes: "full, inline" (frames
+   encoded in the control loop, as a synchronous recorder would), "full",
+   "sampled", "failures" and "rollout" with the background writer. Reports
+   the time per episode, control-loop overruns, dropped frames, the writer
+   backlog left after the last episode and the disk usage.
+2. Subprocess backend (ModelInference): a fake lerobot-record that writes
+   `--dataset-mb` per episode; reports the time per run, disk usage of
+   each mode and the scratch writes of runs that were not kept.
+
+Usage:
+    python bench_recording.py [--episodes 8] [--fail-every 4] [--every-n 4] [--dataset-mb 20]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+
+from completion import CompletionDetector
+from episode_recorder import EpisodeRecorder, dir_size
+from fake_hardware import FakePolicyLoader, FakeRobot, LocalHub
+from policy_server import PolicyRuntime
+
+MODES = [
+    ("full, inline", "full", False),
+    ("full", "full", True),
+    ("sampled", "sampled", True),
+    ("failures", "failures", True),
+    ("rollout", "rollout", True),
+]
+
+
+def run_runtime(label, mode, background, args):
+    root = tempfile.mkdtemp(prefix="sushi_rec_bench_")
+    recorder = EpisodeRecorder(
+        root, mode=mode, every_n=args.every_n, fps=args.fps, background=background,
+        quota_bytes=args.quota_mb * 1e6 if args.quota_mb else None,
+    )
+    runtime = PolicyRuntime(
+        FakeRobot(camera_pattern="noise"),
+        FakePolicyLoader(motion_steps=int(args.motion_s * args.fps)),
+        fps=args.fps,
+        completion_detector=CompletionDetector(hold_s=0.5, min_episode_s=1.0),
+        recorder=recorder,
+    )
+    timings = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(args.episodes):
+            failing = args.fail_every and (i + 1) % args.fail_every == 0
+            limit = args.motion_s / 2 if failing else args.motion_s + 5.0
+            timings.append(runtime.run_episode("tuna", "fake/tuna", "Serve tuna", limit))
+        backlog_start = time.perf_counter()
+        recorder.flush()
+        backlog_s = time.perf_counter() - backlog_start
+        runtime.close()
+
+    n = len(timings)
+    stats = recorder.stats()
+    return {
+        "label": label,
+        "per_episode_s": sum(t["total_s"] for t in timings) / n,
+        "overruns": sum(t["loop_overruns"] for t in timings) / n,
+        "dropped": stats["frames_dropped"],
+        "recorded": sum(t["recorded"] for t in timings),
+        "backlog_s": backlog_s,
+        "disk_mb": dir_size(root) / 1e6,
+    }
+
+
+def run_subprocess(mode, args, work_dir, hub_root):
+    from model_inference import ModelInference
+
+    run_root = tempfile.mkdtemp(prefix=f"runs_{mode}_", dir=work_dir)
+    backend = ModelInference(
+        model_paths={"tuna": "fake/tuna"},
+        run_root=run_root,
+        cache_dir=os.path.join(work_dir, "model_cache"),
+        downloader=LocalHub(hub_root),
+        recording=mode,
+        record_every=args.every_n,
+        record_quota_bytes=args.quota_mb * 1e6 if args.quota_mb else None,
+    )
+    with contextlib.redirect_stdout(io.StringIO()):
+        backend.cache_models(["tuna"])
+        start = time.perf_counter()
+        for _ in range(args.episodes):
+            backend.run_inference("tuna", episode_time_s=args.motion_s)
+    per_run_s = (time.perf_counter() - start) / args.episodes
+    return per_run_s, dir_size(run_root) / 1e6, backend.scratch_bytes / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark eval-episode recording modes")
+    parser.add_argument("--episodes", type=int, default=8)
+    parser.add_argument("--motion-s", type=float, default=2.0, help="fake policy motion out and back")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--fail-every", type=int, default=4, help="every Nth episode times out (0 = none)")
+    parser.add_argument("--every-n", type=int, default=4, help="sampled mode records every Nth episode")
+    parser.add_argument("--quota-mb", type=float, default=0.0, help="recording disk quota (0 = unlimited)")
+    parser.add_argument("--dataset-mb", type=float, default=20.0, help="fake lerobot-record MB per episode")
+    parser.add_argument("--skip-subprocess", action="store_true")
+    args = parser.parse_args()
+
+    print(f"Policy runtime: {args.episodes} episodes per mode, 2 cameras 640x480 @ {args.fps} fps")
+    print(f"  {'mode':<14} {'s/episode':>9} {'overruns':>9} {'dropped':>8} {'recorded':>9} "
+          f"{'backlog':>8} {'disk':>9}")
+    for label, mode, background in MODES:
+        r = run_runtime(label, mode, background, args)
+        print(f"  {r['label']:<14} {r['per_episode_s']:9.2f} {r['overruns']:9.1f} {r['dropped']:8d} "
+              f"{r['recorded']:9d} {r['backlog_s']:7.2f}s {r['disk_mb']:7.1f}MB")
+
+    if args.skip_subprocess:
+        return
+    import fake_lerobot_record
+
+    work_dir = tempfile.mkdtemp(prefix="sushi_rec_bench_")
+    fake_lerobot_record.install(os.path.join(work_dir, "bin"))
+    os.environ["PATH"] = os.path.join(work_dir, "bin") + os.pathsep + os.environ.get("PATH", "")
+    os.environ["FAKE_LEROBOT_DATASET_MB"] = str(args.dataset_mb)
+    os.environ.pop("FAKE_LEROBOT_EPISODE_S", None)
+    hub_root = os.path.join(work_dir, "hub")
+    os.makedirs(os.path.join(hub_root, "fake/tuna"), exist_ok=True)
+    with open(os.path.join(hub_root, "fake/tuna", "config.json"), "w") as f:
+        json.dump({"type": "act"}, f)
+
+    print(f"\nModelInference + fake lerobot-record ({args.dataset_mb:.0f} MB per episode):")
+    print(f"  {'mode':<14} {'s/run':>9} {'disk':>9} {'scratch':>9}")
+    for mode in ("full", "sampled", "failures", "rollout"):
+        per_run_s, disk_mb, scratch_mb = run_subprocess(mode, args, work_dir, hub_root)
+        print(f"  {mode:<14} {per_run_s:9.2f} {disk_mb:7.1f}MB {scratch_mb:7.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
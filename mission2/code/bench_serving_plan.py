@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Benchmark for multi-item serving plans.
+
+Random multi-item orders (dishes in spoken order, with repeats) are served
+two ways on the same backend:
+
+- one by one: every item as its own order, as before multi-item recognition
+  (one cache check and one run_inference() call per item)
+- plan: build_plan() groups repeated dishes into one N-episode run, starts
+  with a dish whose policy is still loaded, moves the greentea cup last and
+  shares the cache check (run_plan())
+
+Backends:
+- `subprocess`: ModelInference with a fake lerobot-record on PATH, where
+  every run pays `--startup-s` (process start, robot / camera connection,
+  policy load) and repeated episodes pay `--reset-s` in between
+- `runtime`: LocalPolicyBackend over a PolicyRuntime with a fake robot that
+  keeps `--max-policies` policies resident, each load taking `--load-s`
+
+Usage:
+    python bench_serving_plan.py [--backend subprocess|runtime|both] [--orders 6]
+                                 [--episode-s 0.5] [--startup-s 1.0] [--reset-s 0.2] [--load-s 0.6]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import tempfile
+import time
+
+from fake_hardware import FakePolicyLoader, FakeRobot, LocalHub
+from policy_server import LocalPolicyBackend, PolicyRuntime
+from serving_plan import build_plan, resident_policies, run_plan
+
+SUSHI_MENU = ["egg", "tuna", "cucumber roll", "tempura (fried shrimp)", "greentea cup"]
+MODEL_PATHS = {item: f"fake/{item.split()[0]}" for item in SUSHI_MENU}
+SERVE_LAST = ("greentea cup",)
+
+
+def make_orders(n, rng, max_items=4):
+    """Multi-item orders as spoken: 2..max_items items from 1..3 dishes, repeats allowed."""
+    orders = []
+    for _ in range(n):
+        dishes = rng.sample(SUSHI_MENU, rng.randint(1, 3))
+        items = [rng.choice(dishes) for _ in range(rng.randint(2, max_items))]
+        orders.append(items)
+    return orders
+
+
+def subprocess_backend(args, work_dir):
+    import fake_lerobot_record
+    from model_inference import ModelInference
+
+    bin_dir = os.path.join(work_dir, "bin")
+    fake_lerobot_record.install(bin_dir)
+    os.environ["PATH"] = bin_dir + os.pathsep + os.environ.get("PATH", "")
+    os.environ["FAKE_LEROBOT_EPISODE_S"] = str(args.episode_s)
+    os.environ["FAKE_LEROBOT_STARTUP_S"] = str(args.startup_s)
+
+    hub_root = os.path.join(work_dir, "hub")
+    for repo_id in MODEL_PATHS.values():
+        os.makedirs(os.path.join(hub_root, repo_id), exist_ok=True)
+        with open(os.path.join(hub_root, repo_id, "config.json"), "w") as f:
+            json.dump({"type": "act"}, f)
+    backend = ModelInference(
+        model_paths=MODEL_PATHS,
+        run_root=os.path.join(work_dir, "runs"),
+        cache_dir=os.path.join(work_dir, "model_cache"),
+        downloader=LocalHub(hub_root),
+        reset_time_s=args.reset_s,
+    )
+    backend.prefetch_all()
+    return backend, None
+
+
+def runtime_backend(args, work_dir):
+    loader = FakePolicyLoader(load_time_s=args.load_s)
+    runtime = PolicyRuntime(FakeRobot(), loader, max_policies=args.max_policies, fps=30)
+    return LocalPolicyBackend(runtime, MODEL_PATHS), loader
+
+
+def serve(backend, plan, args):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return run_plan(backend, plan, MODEL_PATHS,
+                        step_kwargs=lambda order: {"episode_time_s": args.episode_s})
+
+
+def run(kind, orders, args):
+    """Serve the same orders one by one and as plans, each on a fresh backend; returns per-order seconds."""
+    totals, calls, loads, shown = {}, {}, {}, []
+    for mode in ("one by one", "plan"):
+        work_dir = tempfile.mkdtemp(prefix="sushi_plan_bench_")
+        with contextlib.redirect_stdout(io.StringIO()):
+            backend, loader = (subprocess_backend if kind == "subprocess" else runtime_backend)(args, work_dir)
+        totals[mode], calls[mode] = [], 0
+        for items in orders:
+            plans = [[(item, 1)] for item in items] if mode == "one by one" else [
+                build_plan(items, serve_last=SERVE_LAST, warm=resident_policies(backend))
+            ]
+            if mode == "plan":
+                shown.append(", ".join(f"{item.split()[0]} x{n}" for item, n in plans[0]))
+            start = time.perf_counter()
+            for plan in plans:
+                serve(backend, plan, args)
+                calls[mode] += len(plan)
+            totals[mode].append(time.perf_counter() - start)
+        if loader is not None:
+            loads[mode] = len(loader.loads)
+            backend.runtime.close()
+    return totals, calls, loads, shown
+
+
+def print_run(kind, orders, totals, calls, loads, plans):
+    print(f"\n[{kind}]")
+    print(f"  {'order (as spoken)':<44} {'one by one':>10} {'plan':>8}   plan")
+    for i, items in enumerate(orders):
+        label = ", ".join(item.split()[0] for item in items)
+        print(f"  {label[:44]:<44} {totals['one by one'][i]:9.2f}s {totals['plan'][i]:7.2f}s   {plans[i]}")
+
+    one, plan = sum(totals["one by one"]), sum(totals["plan"])
+    print(f"  total {one:.1f}s one by one vs {plan:.1f}s as plans ({(1 - plan / one) * 100:.0f}% less) "
+          f"for {sum(len(items) for items in orders)} items")
+    print(f"  run_inference calls: {calls['one by one']} vs {calls['plan']}"
+          + (f", policy loads: {loads['one by one']} vs {loads['plan']}" if loads else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark multi-item serving plans against item-by-item serving")
+    parser.add_argument("--backend", choices=("subprocess", "runtime", "both"), default="both")
+    parser.add_argument("--orders", type=int, default=6)
+    parser.add_argument("--max-items", type=int, default=4)
+    parser.add_argument("--episode-s", type=float, default=0.5)
+    parser.add_argument("--startup-s", type=float, default=1.0, help="fake lerobot-record start-up")
+    parser.add_argument("--reset-s", type=float, default=0.2, help="pause between episodes of one run")
+    parser.add_argument("--load-s", type=float, default=0.6, help="policy load time (runtime backend)")
+    parser.add_argument("--max-policies", type=int, default=1, help="resident policies (runtime backend)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    orders = make_orders(args.orders, random.Random(args.seed), args.max_items)
+    kinds = ("subprocess", "runtime") if args.backend == "both" else (args.backend,)
+    for kind in kinds:
+        print_run(kind, orders, *run(kind, orders, args))
+
+
+if __name__ == "__main__":
+    main()
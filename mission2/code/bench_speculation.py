@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark for speculative policy warm-up.
+
+Customers are simulated word by word: every spoken word produces a partial
+transcript, then the final transcript goes to a (simulated) LLM. The robot is
+a PolicyRuntime with a fake robot and a policy loader that takes
+`--load-s` seconds, behind a LocalPolicyBackend, so only `--max-policies`
+policies stay resident and most orders need a load. The same order sequence
+is run without and with speculation; the report compares the time the robot
+stage spends loading policies after the order was recognized, plus the hit
+rate and the number of wasted warm-ups.
+
+Usage:
+    python bench_speculation.py [--orders 20] [--load-s 1.5] [--word-ms 250] [--llm-ms 600]
+"""
+
+import argparse
+import random
+import time
+
+from bench_e2e import DEFAULT_CORPUS, percentile
+from fake_hardware import FakePolicyLoader, FakeRobot
+from intent_matcher import LocalIntentMatcher, MENU_ALIASES
+from policy_server import LocalPolicyBackend, PolicyRuntime
+from speculative import SpeculativeWarmer
+
+SUSHI_MENU = ["egg", "tuna", "cucumber roll", "tempura (fried shrimp)", "greentea cup"]
+MODEL_PATHS = {item: f"fake/{item.split()[0]}" for item in SUSHI_MENU}
+
+
+def speak(text, word_s, on_partial):
+    """Emit one partial transcript per spoken word."""
+    words = text.split()
+    for i in range(1, len(words) + 1):
+        time.sleep(word_s)
+        on_partial(" ".join(words[:i]))
+
+
+def run(orders, args, speculate):
+    runtime = PolicyRuntime(
+        FakeRobot(), FakePolicyLoader(load_time_s=args.load_s), max_policies=args.max_policies, fps=30
+    )
+    backend = LocalPolicyBackend(runtime, MODEL_PATHS)
+    matcher = LocalIntentMatcher(SUSHI_MENU, MENU_ALIASES)
+    warmer = SpeculativeWarmer(backend, matcher, MODEL_PATHS, min_score=args.min_score) if speculate else None
+
+    robot_s = []
+    load_s = []
+    for order, text in orders:
+        speculation = warmer.begin() if warmer is not None else None
+        observe = speculation.observe if speculation is not None else (lambda partial: None)
+        speak(text, args.word_ms / 1000, observe)
+        time.sleep(args.asr_tail_ms / 1000)
+        observe(text)
+        time.sleep(args.llm_ms / 1000)  # the LLM interprets the final transcript
+        if speculation is not None:
+            speculation.resolve(order)
+
+        start = time.perf_counter()
+        timing = backend.run_inference(order, episode_time_s=args.episode_s)[0]
+        # Time the robot stage spends beyond the episode itself (waiting for a warm-up, loading)
+        robot_s.append(time.perf_counter() - start - timing["episode_s"])
+        load_s.append(timing["policy_load_s"])
+
+    stats = warmer.stats() if warmer is not None else None
+    if warmer is not None:
+        warmer.close()
+    runtime.close()
+    return {"robot_s": robot_s, "load_s": load_s, "loads": len(runtime.policy_loader.loads), "speculation": stats}
+
+
+def print_result(label, result):
+    robot_ms = [v * 1000 for v in result["robot_s"]]
+    cold = sum(1 for v in result["load_s"] if v > 0)
+    print(f"\n[{label}] robot-stage overhead mean {sum(robot_ms) / len(robot_ms):6.0f} ms  "
+          f"p50 {percentile(robot_ms, 50):6.0f} ms  p95 {percentile(robot_ms, 95):6.0f} ms")
+    print(f"  cold loads on the critical path: {cold}/{len(robot_ms)}, policy loads in total: {result['loads']}")
+    stats = result["speculation"]
+    if stats is not None:
+        print(f"  hit rate {stats['hit_rate']:.0%} of {stats['speculated']} guesses "
+              f"(coverage {stats['coverage']:.0%}), wasted warm-ups {stats['wasted_warmups']}, "
+              f"cancelled {stats['cancelled']}, saved {stats['mean_saved_s'] * 1000:.0f} ms/order")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark speculative policy warm-up")
+    parser.add_argument("--orders", type=int, default=20)
+    parser.add_argument("--load-s", type=float, default=1.5, help="policy load time")
+    parser.add_argument("--max-policies", type=int, default=1, help="resident policies in the runtime")
+    parser.add_argument("--word-ms", type=float, default=250.0, help="time per spoken word")
+    parser.add_argument("--asr-tail-ms", type=float, default=200.0, help="final decode after speech ends")
+    parser.add_argument("--llm-ms", type=float, default=600.0)
+    parser.add_argument("--episode-s", type=float, default=0.1)
+    parser.add_argument("--min-score", type=float, default=0.8)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    orders = [rng.choice(DEFAULT_CORPUS) for _ in range(args.orders)]
+
+    print(f"{args.orders} orders, policy load {args.load_s:.1f}s, {args.max_policies} resident")
+    baseline = run(orders, args, speculate=False)
+    print_result("no speculation", baseline)
+    speculative = run(orders, args, speculate=True)
+    print_result("speculative warm-up", speculative)
+
+    before = sum(baseline["robot_s"]) / len(orders)
+    after = sum(speculative["robot_s"]) / len(orders)
+    print(f"\nrobot-stage overhead per order: {before * 1000:.0f} ms -> {after * 1000:.0f} ms "
+          f"({(before - after) * 1000:.0f} ms saved)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the multi-arm StationDispatcher with fake stations.
+
+Each station is a PolicyRuntime with a fake robot and a policy loader that
+takes `--load-s` seconds behind a LocalPolicyBackend; an episode takes
+`--episode-s` seconds (plus jitter). Orders arrive as a Poisson stream of
+random dishes. The same order stream is served by 1..N stations, with
+warm-preferring routing and (for comparison) plain least-loaded routing;
+the report shows throughput, wait times, per-station utilization and warm
+policy hits.
+
+Usage:
+    python bench_stations.py [--stations 3] [--orders 30] [--rate 0.8] [--episode-s 1.0] [--load-s 0.6]
+"""
+
+import argparse
+import random
+import time
+
+from bench_e2e import percentile
+from fake_hardware import FakePolicyLoader, FakeRobot
+from policy_server import LocalPolicyBackend, PolicyRuntime
+from station_dispatcher import Station, StationDispatcher
+
+SUSHI_MENU = ["egg", "tuna", "cucumber roll", "tempura (fried shrimp)", "greentea cup"]
+MODEL_PATHS = {item: f"fake/{item.split()[0]}" for item in SUSHI_MENU}
+
+
+def make_station(name, args):
+    runtime = PolicyRuntime(
+        FakeRobot(), FakePolicyLoader(load_time_s=args.load_s), max_policies=args.warm_slots, fps=30
+    )
+    return Station(name, LocalPolicyBackend(runtime, MODEL_PATHS), warm_slots=args.warm_slots)
+
+
+def make_serve(args, seed):
+    rng = random.Random(seed)
+
+    def serve(order, status_callback, backend):
+        episode_s = args.episode_s * rng.uniform(0.8, 1.2)
+        backend.run_inference(order, episode_time_s=episode_s)
+
+    return serve
+
+
+def run(stations_n, orders, arrivals, args, cold_penalty):
+    stations = [make_station(f"arm-{i + 1}", args) for i in range(stations_n)]
+    dispatcher = StationDispatcher(
+        stations, make_serve(args, args.seed), max_queue=len(orders), cold_penalty=cold_penalty
+    ).start()
+    start = time.perf_counter()
+    for order, at in zip(orders, arrivals):
+        delay = start + at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        dispatcher.submit(order)
+    dispatcher.join()
+    wall_s = time.perf_counter() - start
+    stats = dispatcher.stats()
+    dispatcher.stop()
+    for station in stations:
+        station.backend.runtime.close()
+    return wall_s, stats, list(dispatcher.wait_s)
+
+
+def print_run(label, wall_s, stats, wait_s):
+    hits = sum(s["warm_hits"] for s in stats["stations"].values())
+    total = hits + sum(s["cold_starts"] for s in stats["stations"].values())
+    print(f"\n[{label}] {stats['served']} orders in {wall_s:.1f}s "
+          f"({stats['served'] / wall_s * 60:.1f}/min), wait p50 {percentile(wait_s, 50):.2f}s "
+          f"p95 {percentile(wait_s, 95):.2f}s, warm hits {hits}/{total}")
+    for name, s in stats["stations"].items():
+        print(f"  {name:<6} served {s['served']:3d}  utilization {s['utilization']:5.0%}  "
+              f"warm {s['warm_hits']:3d}  cold {s['cold_starts']:3d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark multi-arm order routing with fake stations")
+    parser.add_argument("--stations", type=int, default=3)
+    parser.add_argument("--orders", type=int, default=30)
+    parser.add_argument("--rate", type=float, default=2.0, help="orders per second arriving")
+    parser.add_argument("--episode-s", type=float, default=1.0)
+    parser.add_argument("--load-s", type=float, default=0.6, help="policy load time on a cold station")
+    parser.add_argument("--warm-slots", type=int, default=2, help="policies kept loaded per station")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    orders = [rng.choice(SUSHI_MENU) for _ in range(args.orders)]
+    arrivals, t = [], 0.0
+    for _ in orders:
+        t += rng.expovariate(args.rate)
+        arrivals.append(t)
+
+    runs = [(f"1 station", 1, 0.5)]
+    if args.stations > 1:
+        runs += [
+            (f"{args.stations} stations, least-loaded", args.stations, 0.0),
+            (f"{args.stations} stations, warm-preferring", args.stations, 0.5),
+        ]
+    for label, n, cold_penalty in runs:
+        print_run(label, *run(n, orders, arrivals, args, cold_penalty))
+
+
+if __name__ == "__main__":
+    main()
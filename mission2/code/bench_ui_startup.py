@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Headless measurement of the order UI's startup time and time-to-image.
+
+1. Import cost of sushi_voice_master (numpy / scipy / sounddevice / clients),
+   which the UI used to pay before its window could be drawn and now pays in
+   a background thread.
+2. Time-to-image per dish: open + LANCZOS thumbnail per order (the old
+   `show_sushi_image()`) versus a lookup in the preloaded DishImageCache.
+3. With a display (or `xvfb-run` on PATH), the UI itself is started with
+   SUSHI_UI_STARTUP_REPORT=1 and its startup milestones are reported:
+   window shown, backends imported, speech model ready, and time-to-image
+   including the PhotoImage conversion on the Tk thread.
+
+`--fake-audio` replaces `sounddevice` with fake_hardware.FakeSoundDevice
+(for machines without PortAudio).
+
+Usage:
+    python bench_ui_startup.py [--fake-audio] [--repeat 3] [--no-ui]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_e2e import percentile
+from ui_assets import IMAGE_FILES, DishImageCache, image_path_for_order, load_scaled
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+IMAGES_DIR = os.path.join(SCRIPT_DIR, "..", "images")
+MAX_IMAGE_SIZE = (int(1280 * 0.30), int(720 * 0.35))
+
+FAKE_SOUNDDEVICE = """\
+import sys
+from fake_hardware import FakeSoundDevice
+sys.modules[__name__] = FakeSoundDevice()
+"""
+
+
+def child_env(shim_dir):
+    env = dict(os.environ)
+    paths = [SCRIPT_DIR] + ([shim_dir] if shim_dir else [])
+    env["PYTHONPATH"] = os.pathsep.join(paths + [env.get("PYTHONPATH", "")]).rstrip(os.pathsep)
+    return env
+
+
+def measure_import(module, env):
+    """Seconds to import `module` in a fresh interpreter."""
+    code = (
+        "import time; t = time.perf_counter(); "
+        f"import {module}; print(time.perf_counter() - t)"
+    )
+    out = subprocess.run([sys.executable, "-c", code], env=env, cwd=SCRIPT_DIR,
+                         capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def measure_images(repeat):
+    """(uncached ms per order, cache preload ms, cached lookup ms per order)."""
+    uncached = []
+    for _ in range(repeat):
+        for order in IMAGE_FILES:
+            start = time.perf_counter()
+            load_scaled(image_path_for_order(IMAGES_DIR, order), MAX_IMAGE_SIZE)
+            uncached.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    cache = DishImageCache(IMAGES_DIR, MAX_IMAGE_SIZE, menu=IMAGE_FILES).preload()
+    preload_ms = (time.perf_counter() - start) * 1000
+
+    cached = []
+    for _ in range(repeat):
+        for order in IMAGE_FILES:
+            start = time.perf_counter()
+            cache._image(image_path_for_order(IMAGES_DIR, order))
+            cached.append((time.perf_counter() - start) * 1000)
+    return uncached, preload_ms, cached
+
+
+def run_ui(env, timeout_s):
+    """Start the UI in report mode; returns its JSON report with times since spawn, or None."""
+    command = [sys.executable, os.path.join(SCRIPT_DIR, "sushi_voice_ui.py")]
+    if not os.environ.get("DISPLAY"):
+        if shutil.which("xvfb-run") is None:
+            return None
+        command = ["xvfb-run", "-a"] + command
+    env = dict(env, SUSHI_UI_STARTUP_REPORT="1")
+    spawned = time.time()
+    out = subprocess.run(command, env=env, cwd=SCRIPT_DIR, capture_output=True, text=True,
+                         timeout=timeout_s)
+    for line in reversed(out.stdout.splitlines()):
+        if line.startswith("{"):
+            report = json.loads(line)
+            offset = report["t0"] - spawned
+            report["since_spawn"] = {k: round(v + offset, 3) for k, v in report["startup"].items()}
+            return report
+    raise RuntimeError(f"The UI did not report its startup:\n{out.stdout}\n{out.stderr}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure UI startup and time-to-image")
+    parser.add_argument("--fake-audio", action="store_true", help="use the fake sounddevice")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-ui", action="store_true", help="skip starting the UI itself")
+    parser.add_argument("--timeout-s", type=float, default=300.0)
+    args = parser.parse_args()
+
+    shim_dir = None
+    if args.fake_audio:
+        shim_dir = tempfile.mkdtemp(prefix="fake_sounddevice_")
+        with open(os.path.join(shim_dir, "sounddevice.py"), "w") as f:
+            f.write(FAKE_SOUNDDEVICE)
+    env = child_env(shim_dir)
+
+    master_s = sorted(measure_import("sushi_voice_master", env) for _ in range(args.repeat))
+    window_s = sorted(measure_import("tkinter, PIL.ImageTk, order_pipeline, ui_assets", env)
+                      for _ in range(args.repeat))
+    print(f"import before the window: {window_s[len(window_s) // 2] * 1000:7.0f} ms "
+          f"(tkinter, PIL, order_pipeline, ui_assets)")
+    print(f"import sushi_voice_master: {master_s[len(master_s) // 2] * 1000:6.0f} ms "
+          f"(now in the background, previously before the window)")
+
+    uncached, preload_ms, cached = measure_images(args.repeat)
+    print(f"\ntime-to-image, open + thumbnail: p50 {percentile(uncached, 50):7.2f} ms  "
+          f"p95 {percentile(uncached, 95):7.2f} ms")
+    print(f"time-to-image, image cache:      p50 {percentile(cached, 50):7.4f} ms  "
+          f"p95 {percentile(cached, 95):7.4f} ms  (preload {preload_ms:.0f} ms, background)")
+
+    if args.no_ui:
+        return
+    report = run_ui(env, args.timeout_s)
+    if report is None:
+        print("\nNo display and no xvfb-run: skipped starting the UI.")
+        return
+    print("\nUI milestones since process spawn:")
+    for name, seconds in report["since_spawn"].items():
+        print(f"  {name:<18} {seconds * 1000:8.0f} ms")
+    shown = report["time_to_image_ms"]
+    print(f"time-to-image in the UI (first show, incl. PhotoImage): "
+          f"max {max(shown.values()):.2f} ms over {len(shown)} orders")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Benchmark for hands-free listening.
+
+Replays an audio stream in real time through an AlwaysOnInput: a quiet
+period (to measure the idle CPU load of the listener), then a sequence of
+wake phrases and distractor utterances at known positions. Reports the idle
+and active CPU load of the listening thread, detection latency after the end
+of each wake phrase, misses and false wakes.
+
+By default the wake phrase and distractors are synthetic (bench_e2e
+utterances); pass `--wake-wavs` (several recordings: the first ones are
+enrolled, the rest are played) and `--distractor-wavs` to use real speech.
+
+Usage:
+    python bench_wake.py [--idle-s 10] [--mode phrase|utterance]
+                         [--wake-wavs a.wav b.wav ...] [--distractor-wavs c.wav ...]
+"""
+
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from audio_capture import AlwaysOnInput, WavInputStream, read_wav
+from bench_e2e import percentile, synth_utterance
+from wake_word import SPOTTER_SAMPLE_RATE, HandsFreeListener, KeywordSpotter, to_spotter_rate
+
+SAMPLE_RATE = SPOTTER_SAMPLE_RATE
+DISTRACTORS = ["good morning", "what time is it", "thank you very much", "see you later"]
+
+
+def variant(audio, rng):
+    """Same phrase, another take: different gain, speed and background noise."""
+    rate = rng.uniform(0.92, 1.08)
+    positions = np.arange(0, len(audio) - 1, rate)
+    stretched = np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+    stretched *= rng.uniform(0.7, 1.3)
+    return stretched + rng.normal(0, 0.002, len(stretched)).astype(np.float32)
+
+
+def load_wavs(paths):
+    return [to_spotter_rate(*read_wav(path)) for path in paths]
+
+
+def build_stream(idle_s, wakes, distractors, rng, gap_s=1.5):
+    """Idle noise, then alternating distractors and wake phrases; returns (audio, events)."""
+    parts = [rng.normal(0, 0.002, int(idle_s * SAMPLE_RATE)).astype(np.float32)]
+    position = len(parts[0])
+    events = []
+    items = [("wake", w) for w in wakes] + [("distractor", d) for d in distractors]
+    rng.shuffle(items)
+    for kind, audio in items:
+        events.append({"kind": kind, "start": position, "end": position + len(audio)})
+        gap = rng.normal(0, 0.002, int(gap_s * SAMPLE_RATE)).astype(np.float32)
+        parts += [audio, gap]
+        position += len(audio) + len(gap)
+    return np.concatenate(parts), events
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hands-free wake-phrase listening")
+    parser.add_argument("--idle-s", type=float, default=10.0)
+    parser.add_argument("--mode", choices=("phrase", "utterance"), default="phrase")
+    parser.add_argument("--wake-phrase", default="hey sushi")
+    parser.add_argument("--enroll", type=int, default=3, help="recordings used for enrollment")
+    parser.add_argument("--plays", type=int, default=6, help="wake phrases in the stream (synthetic)")
+    parser.add_argument("--wake-wavs", nargs="*", default=[])
+    parser.add_argument("--distractor-wavs", nargs="*", default=[])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    if args.wake_wavs:
+        recordings = load_wavs(args.wake_wavs)
+        enrolled, played = recordings[:args.enroll], recordings[args.enroll:]
+    else:
+        phrase = synth_utterance(args.wake_phrase, sample_rate=SAMPLE_RATE, seed=42)
+        enrolled = [variant(phrase, rng) for _ in range(args.enroll)]
+        played = [variant(phrase, rng) for _ in range(args.plays)]
+    if args.distractor_wavs:
+        distractors = load_wavs(args.distractor_wavs)
+    else:
+        distractors = [synth_utterance(text, sample_rate=SAMPLE_RATE, seed=i)
+                       for i, text in enumerate(DISTRACTORS)]
+
+    spotter = KeywordSpotter()
+    for audio in enrolled:
+        spotter.enroll(audio, SAMPLE_RATE)
+    print(f"Enrolled {len(enrolled)} takes, threshold {spotter.calibrate():.2f}")
+
+    audio, events = build_stream(args.idle_s, played, distractors, rng)
+    mic = AlwaysOnInput(
+        sample_rate=SAMPLE_RATE, buffer_seconds=30,
+        stream_factory=lambda samplerate, **kw: WavInputStream(audio, samplerate, realtime=True, **kw),
+    ).start()
+    listener = HandsFreeListener(mic, spotter=spotter, mode=args.mode)
+    listener.position = 0
+    print(f"Replaying {len(audio) / SAMPLE_RATE:.0f}s of audio in real time...")
+
+    # Idle period: only the energy gate runs
+    listener.wait_for_wake(timeout=args.idle_s - 0.5)
+    idle = listener.stats()
+    listener.cpu_s = listener.listen_s = 0.0
+
+    wakes = []
+
+    def listen():
+        while True:
+            wake = listener.wait_for_wake(timeout=1.0)
+            if wake is not None:
+                wakes.append(wake)
+                if args.mode == "utterance":
+                    # The woken recorder takes the rest of the utterance; resume after it
+                    time.sleep(1.0)
+                    listener.skip_to_now()
+            elif mic.position >= len(audio):
+                return
+
+    thread = threading.Thread(target=listen)
+    thread.start()
+    thread.join()
+    active = listener.stats()
+    mic.close()
+
+    # In utterance mode every utterance should wake the listener (measured from its start)
+    targets = ("wake", "distractor") if args.mode == "utterance" else ("wake",)
+    reference = "start" if args.mode == "utterance" else "end"
+    latencies, false_wakes, detected = [], 0, set()
+    for wake in wakes:
+        match = next(
+            (i for i, e in enumerate(events)
+             if e["start"] <= wake["detected_at"] <= e["end"] + SAMPLE_RATE), None
+        )
+        if match is None or events[match]["kind"] not in targets or match in detected:
+            false_wakes += 1
+            continue
+        detected.add(match)
+        latencies.append((wake["detected_at"] - events[match][reference]) / SAMPLE_RATE)
+
+    total = sum(e["kind"] in targets for e in events)
+    print(f"\nidle CPU   {idle['cpu_percent']:5.2f} % of one core ({idle['blocks']} blocks, "
+          f"{idle['spotter_runs']} spotter runs)")
+    print(f"active CPU {active['cpu_percent']:5.2f} % of one core ({active['spotter_runs']} spotter runs)")
+    print(f"detected {len(detected)}/{total} {'utterances' if args.mode == 'utterance' else 'wake phrases'}, "
+          f"false wakes {false_wakes}")
+    if latencies:
+        ms = [v * 1000 for v in latencies]
+        print(f"detection latency after the {reference} of speech: p50 {percentile(ms, 50):.0f} ms  "
+              f"p95 {percentile(ms, 95):.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
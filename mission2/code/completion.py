@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Episode completion detection.
+
+A serving episode used to run for the full `episode_time_s` even though the
+arm is back at rest long before that. `CompletionDetector` watches the joint
+state and the action stream of a running episode and reports completion once
+the arm has left its rest pose, come back, and stayed still for `hold_s`
+seconds; `episode_time_s` remains the ceiling.
+
+`EpisodeLog` records the real episode durations per menu item (JSONL), and
+the `replay` command runs the detector over recorded trajectories (LeRobot
+dataset episodes, e.g. the eval_* datasets, or .npz files) to check when it
+would have stopped each one:
+
+    python completion.py replay eval_tuna/data/chunk-000/*.parquet [--hold-s 1.0]
+    python completion.py synth trajectories/   # fake-policy trajectories as .npz
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+
+def joint_vector(values, joint_names):
+    """Joint positions of an observation or action dict as a float array."""
+    return np.array([values[name] for name in joint_names], dtype=np.float32)
+
+
+class CompletionDetector:
+    """
+    Decide, step by step, whether a serving episode is finished.
+
+    - `rest_pose`: joint positions of the rest pose; None uses the joint
+      state at the first update (the arm starts each episode at rest)
+    - `position_tol`: max joint distance (degrees / gripper %) from the rest pose
+    - `velocity_tol`: max joint and action change per second while holding
+    - `departure_tol`: distance from rest the arm must reach before a return
+      to rest counts (so the idle start of an episode does not end it)
+    - `hold_s`: how long the arm must stay converged
+    - `min_episode_s`: never stop earlier than this
+    """
+
+    def __init__(self, rest_pose=None, position_tol=3.0, velocity_tol=2.0, departure_tol=15.0,
+                 hold_s=1.0, min_episode_s=2.0):
+        self.rest_pose = None if rest_pose is None else np.asarray(rest_pose, dtype=np.float32)
+        self.position_tol = position_tol
+        self.velocity_tol = velocity_tol
+        self.departure_tol = departure_tol
+        self.hold_s = hold_s
+        self.min_episode_s = min_episode_s
+        self.reset()
+
+    def reset(self):
+        self._rest = self.rest_pose
+        self._previous = None
+        self.departed = False
+        self.converged_since = None
+        self.completed_at = None
+
+    def update(self, t, state, action=None):
+        """
+        Feed the joint state (and the commanded action) at episode time `t`
+        seconds; returns True once the episode is complete.
+        """
+        if self.completed_at is not None:
+            return True
+        state = np.asarray(state, dtype=np.float32)
+        action = state if action is None else np.asarray(action, dtype=np.float32)
+        if self._rest is None:
+            self._rest = state.copy()
+
+        distance = float(np.max(np.abs(state - self._rest)))
+        if distance > self.departure_tol:
+            self.departed = True
+
+        still = True
+        if self._previous is not None:
+            previous_t, previous_state, previous_action = self._previous
+            dt = max(t - previous_t, 1e-6)
+            speed = float(np.max(np.abs(state - previous_state))) / dt
+            action_speed = float(np.max(np.abs(action - previous_action))) / dt
+            still = speed <= self.velocity_tol and action_speed <= self.velocity_tol
+        self._previous = (t, state, action)
+
+        at_rest = distance <= self.position_tol and float(np.max(np.abs(action - self._rest))) <= self.position_tol
+        if not (self.departed and at_rest and still):
+            self.converged_since = None
+            return False
+        if self.converged_since is None:
+            self.converged_since = t
+        if t - self.converged_since >= self.hold_s and t >= self.min_episode_s:
+            self.completed_at = t
+            return True
+        return False
+
+
+class EpisodeLog:
+    """Real episode durations per menu item, appended to a JSONL file (if `path` is set)."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.durations = {}  # item -> [episode_s, ...]
+        self.early = {}      # item -> number of episodes ended by the detector
+        self._lock = threading.Lock()
+
+    def record(self, timing):
+        item = timing["model_name"]
+        with self._lock:
+            self.durations.setdefault(item, []).append(timing["episode_s"])
+            self.early[item] = self.early.get(item, 0) + int(timing.get("stop_reason") == "completed")
+            if self.path:
+                entry = {"time": time.time(), **{k: v for k, v in timing.items() if not isinstance(v, dict)}}
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry) + "\n")
+
+    def summary(self):
+        with self._lock:
+            return {
+                item: {
+                    "episodes": len(values),
+                    "mean_s": round(float(np.mean(values)), 2),
+                    "p95_s": round(float(np.percentile(values, 95)), 2),
+                    "max_s": round(max(values), 2),
+                    "ended_early": self.early.get(item, 0),
+                }
+                for item, values in self.durations.items()
+            }
+
+
+# ===== Recorded trajectories =====
+def load_trajectory(path):
+    """
+    Load one recorded episode as {"states", "actions", "fps"}.
+    Supports LeRobot dataset episode files (`observation.state` / `action`
+    columns in parquet; needs pandas + pyarrow) and .npz files with
+    `states`, `actions` and `fps`.
+    """
+    if path.endswith(".npz"):
+        data = np.load(path)
+        return {
+            "states": np.asarray(data["states"], dtype=np.float32),
+            "actions": np.asarray(data["actions"], dtype=np.float32),
+            "fps": float(data["fps"]),
+        }
+    import pandas as pd
+
+    frame = pd.read_parquet(path)
+    states = np.stack(frame["observation.state"].to_numpy()).astype(np.float32)
+    actions = np.stack(frame["action"].to_numpy()).astype(np.float32)
+    if "timestamp" in frame and len(frame) > 1:
+        fps = round(1.0 / float(np.median(np.diff(frame["timestamp"].to_numpy()))))
+    else:
+        fps = 30
+    return {"states": states, "actions": actions, "fps": float(fps)}
+
+
+def replay(trajectory, detector):
+    """
+    Run `detector` over a recorded trajectory.
+    Returns {"recorded_s", "stopped_s", "saved_s", "completed"}.
+    """
+    detector.reset()
+    fps = trajectory["fps"]
+    recorded_s = len(trajectory["states"]) / fps
+    for i, (state, action) in enumerate(zip(trajectory["states"], trajectory["actions"])):
+        if detector.update(i / fps, state, action):
+            stopped_s = (i + 1) / fps
+            return {"recorded_s": recorded_s, "stopped_s": stopped_s,
+                    "saved_s": recorded_s - stopped_s, "completed": True}
+    return {"recorded_s": recorded_s, "stopped_s": recorded_s, "saved_s": 0.0, "completed": False}
+
+
+def synth_trajectories(directory, episode_s=20.0, fps=30, motion_steps=(240, 300, 360)):
+    """Record fake-policy episodes (FakeRobot + FakePolicy) as .npz trajectories."""
+    from fake_hardware import JOINT_NAMES, FakePolicy, FakeRobot
+
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for steps in motion_steps:
+        robot, policy = FakeRobot(), FakePolicy(f"fake_{steps}", motion_steps=steps)
+        states, actions = [], []
+        for _ in range(int(episode_s * fps)):
+            observation = robot.get_observation()
+            action = policy.select_action(observation)
+            robot.send_action(action)
+            states.append(joint_vector(observation, JOINT_NAMES))
+            actions.append(joint_vector(action, JOINT_NAMES))
+        path = os.path.join(directory, f"fake_{steps}.npz")
+        np.savez(path, states=np.array(states), actions=np.array(actions), fps=fps)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Episode completion detection on recorded trajectories")
+    sub = parser.add_subparsers(dest="command", required=True)
+    replay_parser = sub.add_parser("replay", help="run the detector over recorded episodes")
+    replay_parser.add_argument("paths", nargs="+", help="LeRobot episode .parquet or .npz files")
+    replay_parser.add_argument("--hold-s", type=float, default=1.0)
+    replay_parser.add_argument("--position-tol", type=float, default=3.0)
+    replay_parser.add_argument("--velocity-tol", type=float, default=2.0)
+    replay_parser.add_argument("--departure-tol", type=float, default=15.0)
+    synth_parser = sub.add_parser("synth", help="write fake-policy trajectories as .npz")
+    synth_parser.add_argument("directory")
+    args = parser.parse_args()
+
+    if args.command == "synth":
+        for path in synth_trajectories(args.directory):
+            print(path)
+        return
+
+    detector = CompletionDetector(
+        position_tol=args.position_tol, velocity_tol=args.velocity_tol,
+        departure_tol=args.departure_tol, hold_s=args.hold_s,
+    )
+    total_recorded = total_stopped = 0.0
+    for path in args.paths:
+        result = replay(load_trajectory(path), detector)
+        total_recorded += result["recorded_s"]
+        total_stopped += result["stopped_s"]
+        status = "stop" if result["completed"] else "timeout"
+        print(f"{os.path.basename(path):<40} {result['recorded_s']:6.1f}s -> {result['stopped_s']:6.1f}s  "
+              f"({status}, saved {result['saved_s']:.1f}s)")
+    print(f"\nTotal: {total_recorded:.1f}s recorded, {total_stopped:.1f}s with early termination "
+          f"({total_recorded - total_stopped:.1f}s saved)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Demand-driven policy prewarming.
+
+A resident policy backend keeps only a few policies loaded (PolicyRuntime
+`max_policies`), so which ones stay warm decides how many orders pay a
+policy load. LRU keeps whatever was served last; `DemandPredictor` instead
+estimates what comes next from the order history:
+
+- time of day: each dish's share of the orders in the same hour (and, at
+  half weight, the neighbouring hours) on previous days
+- recent popularity: exponentially decayed counts with half-life `half_life_s`
+
+and `warm_set()` picks the most likely dishes that fit a fixed budget (a
+number of policy slots, or bytes with per-model `sizes`). `DemandPrewarmer`
+applies the set to a serving backend between orders and reports how often
+the served dish was already warm.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from serving_plan import resident_policies
+
+
+def hour_of_day(ts):
+    return time.localtime(ts).tm_hour
+
+
+class DemandPredictor:
+    """
+    - `menu`: dishes to predict
+    - `half_life_s`: decay of the recent-popularity counts
+    - `recent_weight`: share of recent popularity in the blend (the rest is time of day)
+    - `prior`: pseudo-count per dish, so unseen dishes keep a small score
+    """
+
+    def __init__(self, menu, half_life_s=1800.0, recent_weight=0.5, prior=0.5):
+        self.menu = list(menu)
+        self.half_life_s = half_life_s
+        self.recent_weight = recent_weight
+        self.prior = prior
+        self.hourly = [dict.fromkeys(self.menu, 0.0) for _ in range(24)]
+        self.recent = dict.fromkeys(self.menu, 0.0)
+        self.recent_at = None
+        self.observed = 0
+        self._lock = threading.Lock()
+
+    def _decay(self, now):
+        if self.recent_at is not None and now > self.recent_at:
+            factor = 0.5 ** ((now - self.recent_at) / self.half_life_s)
+            for item in self.recent:
+                self.recent[item] *= factor
+        self.recent_at = now if self.recent_at is None else max(self.recent_at, now)
+
+    def observe(self, item, ts=None):
+        """Count one served dish."""
+        if item not in self.recent:
+            return
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            self.hourly[hour_of_day(ts)][item] += 1
+            self._decay(ts)
+            self.recent[item] += 1
+            self.observed += 1
+
+    def fit(self, events):
+        """Learn from [(timestamp, item)] (e.g. OrderHistory.item_events()); returns the count used."""
+        n = 0
+        for ts, item in sorted(events):
+            if item in self.recent:
+                self.observe(item, ts)
+                n += 1
+        return n
+
+    def scores(self, now=None):
+        """{item: probability of being ordered next} at time `now`."""
+        now = time.time() if now is None else now
+        hour = hour_of_day(now)
+        with self._lock:
+            self._decay(now)
+            by_hour = {
+                item: sum(self.hourly[(hour + offset) % 24][item] * weight
+                          for offset, weight in ((-1, 0.5), (0, 1.0), (1, 0.5)))
+                + self.prior
+                for item in self.menu
+            }
+            recent = {item: self.recent[item] + self.prior for item in self.menu}
+        hour_total = sum(by_hour.values())
+        recent_total = sum(recent.values())
+        return {
+            item: (1 - self.recent_weight) * by_hour[item] / hour_total
+            + self.recent_weight * recent[item] / recent_total
+            for item in self.menu
+        }
+
+    def warm_set(self, budget, now=None, sizes=None):
+        """
+        Dishes to keep warm, most likely first: greedy by score per unit of
+        size until `budget` is used (each dish costs 1 without `sizes`).
+        """
+        scores = self.scores(now)
+        cost = (lambda item: sizes.get(item, 1)) if sizes else (lambda item: 1)
+        ranked = sorted(self.menu, key=lambda item: scores[item] / max(cost(item), 1e-9), reverse=True)
+        chosen, used = [], 0
+        for item in ranked:
+            if used + cost(item) <= budget:
+                chosen.append(item)
+                used += cost(item)
+        return sorted(chosen, key=lambda item: scores[item], reverse=True)
+
+
+class DemandPrewarmer:
+    """
+    Keeps the predicted warm set loaded on a serving backend.
+
+    - `backend`: anything with `cache_models(model_names=[...])` (a resident
+      policy backend preloads the policies; ModelInference checks its file cache)
+    - `budget` / `sizes`: see DemandPredictor.warm_set()
+
+    `observe(items)` after each order scores the prediction and updates the
+    predictor; `schedule()` refreshes the warm set in the background.
+    """
+
+    def __init__(self, backend, predictor, model_paths, budget=2, sizes=None):
+        self.backend = backend
+        self.predictor = predictor
+        self.model_paths = model_paths
+        self.budget = budget
+        self.sizes = sizes
+        self.warm = []
+        self.executor = ThreadPoolExecutor(1, thread_name_prefix="demand-prewarm")
+        self._pending = None
+        self._lock = threading.Lock()
+        self.refreshes = 0
+        self.preloads = 0
+        self.served = 0
+        self.predicted_hits = 0
+        self.resident_hits = 0
+
+    def refresh(self, now=None):
+        """Load the current warm set (least likely first, so the most likely ends up most recent)."""
+        target = [item for item in self.predictor.warm_set(self.budget, now, self.sizes)
+                  if item in self.model_paths]
+        resident = resident_policies(self.backend)
+        missing = [item for item in target if item not in resident]
+        with self._lock:
+            self.warm = target
+            self.refreshes += 1
+            self.preloads += len(missing)
+        if missing or not resident:
+            try:
+                self.backend.cache_models(model_names=list(reversed(target)))
+            except Exception as e:
+                print(f"⚠️  Demand prewarm failed: {e}")
+        return target
+
+    def schedule(self, now=None):
+        """Refresh in the background unless a refresh is already waiting."""
+        with self._lock:
+            if self._pending is not None and not self._pending.done():
+                return self._pending
+            self._pending = self.executor.submit(self.refresh, now)
+            return self._pending
+
+    def observe(self, items, resident=None, now=None):
+        """
+        Score one served order (`items`: dish names) against the warm set and
+        learn from it. `resident`: policies loaded when the order started, if known.
+        """
+        with self._lock:
+            warm = set(self.warm)
+            for item in items:
+                self.served += 1
+                self.predicted_hits += item in warm
+                self.resident_hits += resident is not None and item in resident
+        for item in items:
+            self.predictor.observe(item, now)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "served": self.served,
+                "warm": list(self.warm),
+                "predicted_hit_rate": self.predicted_hits / self.served if self.served else 0.0,
+                "resident_hit_rate": self.resident_hits / self.served if self.served else 0.0,
+                "refreshes": self.refreshes,
+                "preloads": self.preloads,
+            }
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Eval-episode recording off the serving path.
+
+Every serve used to record a full dataset episode (camera frames, states,
+actions), so each customer order paid for frame encoding and disk writes
+and `eval_lerobot_dataset` grew without limit. Recording is now a choice:
+
+- "full":     record every episode
+- "rollout":  serve only, write nothing (with ModelInference, lerobot-record
+              still writes each run to a scratch directory that is deleted)
+- "sampled":  record every `every_n`-th episode
+- "failures": keep only episodes that did not complete (the arm was not back
+              at rest before the time limit, or the episode raised); frames
+              are written while the episode runs and discarded on success
+
+`EpisodeRecorder` is used by PolicyRuntime: the control loop only hands
+frames to a bounded queue (`add_frame()` never blocks; a full queue drops the
+frame and counts it), and a writer thread compresses and writes them. Each
+episode is a directory with one compressed .npz per frame, `data.npz`
+(states, actions, fps; readable by completion.load_trajectory) and
+`meta.json`. With a quota the oldest recorded episodes are deleted to stay
+under it. `prune_to_quota()` does the same for ModelInference's per-run
+datasets.
+"""
+
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+import zipfile
+
+import numpy as np
+
+from completion import joint_vector
+
+RECORDING_MODES = ("full", "rollout", "sampled", "failures")
+
+
+def dir_size(path):
+    """Bytes used by the files under `path`."""
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass
+    return total
+
+
+def prune_to_quota(root, quota_bytes, keep=()):
+    """
+    Delete the oldest entries (by name) directly under `root` until it uses at
+    most `quota_bytes`; entries in `keep` are never deleted. Returns the bytes used.
+    """
+    if not os.path.isdir(root):
+        return 0
+    entries = sorted(name for name in os.listdir(root) if name not in keep)
+    used = dir_size(root)
+    for name in entries:
+        if used <= quota_bytes:
+            break
+        path = os.path.join(root, name)
+        if os.path.isdir(path):
+            size = dir_size(path)
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            size = os.path.getsize(path)
+            os.remove(path)
+        used -= size
+        print(f"🧹 Recording quota: removed {name} ({size / 1e6:.1f} MB)")
+    return used
+
+
+def write_frames_npz(path, images, level=1):
+    """Write camera frames as an .npz (np.load-able) with fast deflate compression."""
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED, compresslevel=level) as archive:
+        for name, image in images.items():
+            with archive.open(f"{name}.npy", "w") as f:
+                np.lib.format.write_array(f, np.asarray(image))
+
+
+def run_name(model_name, index):
+    """Sortable directory name of one recording, e.g. 20250101-120000_tuna_000042."""
+    return f"{time.strftime('%Y%m%d-%H%M%S')}_{model_name.split()[0]}_{index:06d}"
+
+
+class RecordedEpisode:
+    """Handle of an episode being recorded (returned by EpisodeRecorder.begin())."""
+
+    def __init__(self, index, name, path, model_name, task):
+        self.index = index
+        self.name = name
+        self.path = path
+        self.model_name = model_name
+        self.task = task
+        self.frames = 0
+        self.dropped = 0
+        # Written by the writer thread only
+        self.states = []
+        self.actions = []
+        self.timestamps = []
+        self.bytes = 0
+        self.truncated = False
+
+
+class EpisodeRecorder:
+    """
+    Record serving episodes in a background writer thread.
+
+    - `root`: directory of the recorded episodes
+    - `mode`: one of RECORDING_MODES; `every_n` for "sampled"
+    - `max_queue`: frames waiting for the writer before new ones are dropped
+    - `quota_bytes`: disk budget of `root` (None = unlimited)
+    - `joint_names`: state / action keys (default: the robot's action features)
+    - `encode(path, images)`: frame writer, default write_frames_npz()
+    - `background`: False writes in the caller's thread (the old inline cost, for benchmarks)
+    """
+
+    def __init__(self, root, mode="full", every_n=10, max_queue=256, quota_bytes=None, fps=30,
+                 joint_names=None, encode=None, background=True):
+        if mode not in RECORDING_MODES:
+            raise ValueError(f"Unknown recording mode: {mode} (use one of {', '.join(RECORDING_MODES)})")
+        self.root = root
+        self.mode = mode
+        self.every_n = max(1, int(every_n))
+        self.quota_bytes = quota_bytes
+        self.fps = fps
+        self.joint_names = joint_names
+        self.encode = encode or write_frames_npz
+        self.background = background
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.episodes = 0
+        self.recorded = 0
+        self.discarded = 0
+        self.frames_written = 0
+        self.frames_dropped = 0
+        self.used_bytes = dir_size(root) if os.path.isdir(root) else 0
+        self._thread = None
+
+    # ----- Control loop side -----
+    def start(self):
+        if self.mode != "rollout":
+            os.makedirs(self.root, exist_ok=True)
+        if self._thread is None and self.mode != "rollout" and self.background:
+            self._thread = threading.Thread(target=self._run, name="episode-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def begin(self, model_name, task):
+        """Start an episode; returns a RecordedEpisode, or None if this one is not recorded."""
+        index = self.episodes
+        self.episodes += 1
+        if self.mode == "rollout" or (self.mode == "sampled" and index % self.every_n):
+            return None
+        self.start()
+        name = run_name(model_name, index)
+        episode = RecordedEpisode(index, name, os.path.join(self.root, name), model_name, task)
+        self._submit(("begin", episode, None))
+        return episode
+
+    def add_frame(self, episode, observation, action):
+        """Queue one control step of `episode`; drops the frame if the writer is behind."""
+        episode.frames += 1
+        try:
+            self._submit(("frame", episode, (time.perf_counter(), observation, action)), block=False)
+        except queue.Full:
+            episode.dropped += 1
+            self.frames_dropped += 1
+
+    def end(self, episode, stop_reason):
+        """
+        Finish `episode` ("completed", "timeout" or "error"); the writer saves it
+        in the background. Returns True if it is kept.
+        """
+        keep = self.mode != "failures" or stop_reason != "completed"
+        self._submit(("end", episode, (stop_reason, keep)))
+        return keep
+
+    def flush(self, timeout=None):
+        """Wait until everything queued so far is written."""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        self.queue.put(("flush", None, done))
+        return done.wait(timeout)
+
+    def close(self):
+        if self._thread is not None:
+            self.queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "episodes": self.episodes,
+            "recorded": self.recorded,
+            "discarded": self.discarded,
+            "frames_written": self.frames_written,
+            "frames_dropped": self.frames_dropped,
+            "queue": self.queue.qsize(),
+            "used_bytes": self.used_bytes,
+        }
+
+    # ----- Writer thread -----
+    def _submit(self, item, block=True):
+        if self.background:
+            self.queue.put(item, block=block)
+        else:
+            self._handle(item)
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            self._handle(item)
+
+    def _handle(self, item):
+        kind, episode, payload = item
+        try:
+            if kind == "begin":
+                os.makedirs(os.path.join(episode.path, "frames"), exist_ok=True)
+            elif kind == "frame":
+                self._write_frame(episode, *payload)
+            elif kind == "end":
+                self._finish(episode, *payload)
+            elif kind == "flush":
+                payload.set()
+        except Exception as e:
+            print(f"⚠️  Episode writer error ({kind}): {e}")
+
+    def _write_frame(self, episode, t, observation, action):
+        joint_names = self.joint_names or list(action)
+        episode.timestamps.append(t)
+        episode.states.append(joint_vector(observation, joint_names))
+        episode.actions.append(joint_vector(action, joint_names))
+        if episode.truncated:
+            return
+        images = {
+            key: value for key, value in observation.items()
+            if isinstance(value, np.ndarray) and value.ndim == 3
+        }
+        if not images:
+            return
+        path = os.path.join(episode.path, "frames", f"{len(episode.timestamps) - 1:06d}.npz")
+        self.encode(path, images)
+        size = os.path.getsize(path)
+        episode.bytes += size
+        self.used_bytes += size
+        self.frames_written += 1
+        if self.quota_bytes is not None and self.used_bytes > self.quota_bytes:
+            self.used_bytes = prune_to_quota(self.root, self.quota_bytes, keep=(episode.name,))
+            if self.used_bytes > self.quota_bytes:
+                # This episode alone fills the quota: keep its states, stop its frames
+                episode.truncated = True
+                print(f"⚠️  Recording quota reached, frames of {episode.name} truncated")
+
+    def _finish(self, episode, stop_reason, keep):
+        if not keep:
+            self.used_bytes -= episode.bytes
+            shutil.rmtree(episode.path, ignore_errors=True)
+            self.discarded += 1
+            return
+        start = episode.timestamps[0] if episode.timestamps else 0.0
+        np.savez(
+            os.path.join(episode.path, "data.npz"),
+            states=np.array(episode.states, dtype=np.float32),
+            actions=np.array(episode.actions, dtype=np.float32),
+            timestamps=np.array(episode.timestamps, dtype=np.float64) - start,
+            fps=self.fps,
+        )
+        with open(os.path.join(episode.path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "model_name": episode.model_name,
+                "task": episode.task,
+                "stop_reason": stop_reason,
+                "frames": episode.frames,
+                "dropped_frames": episode.dropped,
+                "truncated": episode.truncated,
+            }, f)
+        self.used_bytes += sum(
+            os.path.getsize(os.path.join(episode.path, name)) for name in ("data.npz", "meta.json")
+        )
+        self.recorded += 1
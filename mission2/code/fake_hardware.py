@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Stand-ins for the SO-101 arm, its cameras, ACT policies, the Hugging Face Hub
+and the microphone (`sounddevice`).
+
+They follow the same small interface the serving code uses for the real
+objects, so it can run on a machine without a robot or network access.
+"""
+
+import math
+import os
+import shutil
+import time
+
+import numpy as np
+
+from audio_capture import WavInputStream, read_wav
+
+JOINT_NAMES = [
+    "shoulder_pan.pos",
+    "shoulder_lift.pos",
+    "elbow_flex.pos",
+    "wrist_flex.pos",
+    "wrist_roll.pos",
+    "gripper.pos",
+]
+
+# Joint positions the arm returns to after serving (degrees / gripper %)
+REST_POSE = np.array([0.0, -100.0, 100.0, 70.0, 0.0, 0.0], dtype=np.float32)
+
+
+class FakeCamera:
+    """
+    Returns a constant black frame, or with `pattern="noise"` cycles through a
+    few noisy frames that compress like real images (for recording benchmarks);
+    optional delay emulates camera latency.
+    """
+
+    def __init__(self, width=640, height=480, read_delay_s=0.0, pattern="black"):
+        if pattern == "noise":
+            rng = np.random.default_rng(0)
+            gradient = np.linspace(0, 200, width, dtype=np.float32)[None, :, None]
+            self.frames = [
+                np.clip(gradient + rng.normal(0, 4, (height, width, 3)), 0, 255).astype(np.uint8)
+                for _ in range(8)
+            ]
+        else:
+            self.frames = [np.zeros((height, width, 3), dtype=np.uint8)]
+        self.frame = self.frames[0]
+        self.reads = 0
+        self.read_delay_s = read_delay_s
+
+    def read(self):
+        if self.read_delay_s:
+            time.sleep(self.read_delay_s)
+        self.frame = self.frames[self.reads % len(self.frames)]
+        self.reads += 1
+        return self.frame
+
+
+class FakeRobot:
+    """
+    Joint-space robot that moves each joint toward the commanded position.
+    `connect_delay_s` emulates the serial / camera start-up cost.
+    """
+
+    robot_type = "fake_so101"
+
+    def __init__(self, camera_names=("top", "wrist"), connect_delay_s=0.0, max_step=5.0,
+                 camera_delay_s=0.0, camera_pattern="black"):
+        self.cameras = {
+            name: FakeCamera(read_delay_s=camera_delay_s, pattern=camera_pattern) for name in camera_names
+        }
+        self.connect_delay_s = connect_delay_s
+        self.max_step = max_step
+        self.state = REST_POSE.copy()
+        self.is_connected = False
+        self.connect_count = 0
+        self.actions_sent = 0
+
+    @property
+    def action_features(self):
+        return list(JOINT_NAMES)
+
+    def connect(self):
+        if self.connect_delay_s:
+            time.sleep(self.connect_delay_s)
+        self.is_connected = True
+        self.connect_count += 1
+
+    def disconnect(self):
+        self.is_connected = False
+
+    def get_observation(self):
+        observation = {name: float(v) for name, v in zip(JOINT_NAMES, self.state)}
+        for name, camera in self.cameras.items():
+            observation[name] = camera.read()
+        return observation
+
+    def send_action(self, action):
+        target = np.array([action[name] for name in JOINT_NAMES], dtype=np.float32)
+        step = np.clip(target - self.state, -self.max_step, self.max_step)
+        self.state = self.state + step
+        self.actions_sent += 1
+        return action
+
+
+class FakePolicy:
+    """
+    Policy that sweeps out to a serving pose and back to REST_POSE.
+    `serve_fraction` of `motion_steps` is spent moving out, the rest coming back.
+    """
+
+    def __init__(self, name, motion_steps=300, serve_pose=None):
+        self.name = name
+        self.motion_steps = motion_steps
+        self.serve_pose = (
+            serve_pose if serve_pose is not None
+            else REST_POSE + np.array([40.0, 60.0, -50.0, -20.0, 30.0, 50.0], dtype=np.float32)
+        )
+        self.step = 0
+
+    def reset(self):
+        self.step = 0
+
+    def select_action(self, observation, task=None):
+        half = self.motion_steps / 2
+        if self.step < half:
+            alpha = self.step / half
+        elif self.step < self.motion_steps:
+            alpha = 1.0 - (self.step - half) / half
+        else:
+            alpha = 0.0
+        self.step += 1
+        target = REST_POSE + alpha * (self.serve_pose - REST_POSE)
+        return {name: float(v) for name, v in zip(JOINT_NAMES, target)}
+
+
+class FakePolicyLoader:
+    """Callable `loader(model_name, policy_path) -> FakePolicy` with an artificial load time."""
+
+    def __init__(self, load_time_s=0.0, motion_steps=300):
+        self.load_time_s = load_time_s
+        self.motion_steps = motion_steps
+        self.loads = []
+
+    def __call__(self, model_name, policy_path):
+        delay = self.load_time_s(model_name) if callable(self.load_time_s) else self.load_time_s
+        if delay:
+            time.sleep(delay)
+        self.loads.append(model_name)
+        return FakePolicy(model_name, motion_steps=self.motion_steps)
+
+
+class LocalHub:
+    """
+    `snapshot_download`-compatible callable that copies `<root>/<repo_id>` into
+    `local_dir`, counting calls so tests can assert that warm hits are offline.
+    """
+
+    def __init__(self, root, delay_s=0.0):
+        self.root = root
+        self.delay_s = delay_s
+        self.calls = []
+
+    def __call__(self, repo_id, cache_dir=None, local_dir=None, **kwargs):
+        self.calls.append(repo_id)
+        source = os.path.join(self.root, repo_id)
+        if not os.path.isdir(source):
+            raise FileNotFoundError(f"Repository not found: {repo_id}")
+        if self.delay_s:
+            time.sleep(self.delay_s)
+        target = local_dir or os.path.join(cache_dir or self.root + "_cache", repo_id)
+        shutil.copytree(source, target, dirs_exist_ok=True)
+        return target
+
+
+class FakeSoundDevice:
+    """
+    Module-shaped stand-in for `sounddevice` that plays WAV files as microphone input.
+
+    Install it with `sys.modules["sounddevice"] = FakeSoundDevice()` before the
+    voice modules are imported, then `play(path)` before each order.
+    `InputStream` streams the file (then silence), and a stream that is still
+    open (the always-on microphone) switches to each file played after it was
+    opened; `rec()` / `wait()` return it
+    padded or cut to the requested length. `supported_rates` are the capture
+    rates `check_input_settings()` accepts, like a real device would.
+    """
+
+    def __init__(self, supported_rates=(48000,), realtime=True):
+        self.supported_rates = tuple(supported_rates)
+        self.realtime = realtime
+        self.audio = np.zeros(0, dtype=np.float32)
+        self.file_rate = 16000
+        self.streams_opened = 0
+        self._streams = []
+        self._rec_until = None
+
+    def play(self, path):
+        """Use `path` as the microphone signal for the next recording (and on open streams)."""
+        self.audio, self.file_rate = read_wav(path)
+        self._streams = [s for s in self._streams if not s._stop.is_set()]
+        for stream in self._streams:
+            stream.load(self._audio_at(stream.samplerate))
+
+    def _audio_at(self, samplerate):
+        if self.file_rate == samplerate:
+            return self.audio
+        from scipy import signal
+        g = math.gcd(int(self.file_rate), int(samplerate))
+        return signal.resample_poly(
+            self.audio, int(samplerate) // g, int(self.file_rate) // g
+        ).astype(np.float32)
+
+    def check_input_settings(self, device=None, samplerate=None, channels=None, dtype=None, **kwargs):
+        if samplerate is not None and int(samplerate) not in self.supported_rates:
+            raise ValueError(f"Invalid sample rate: {samplerate}")
+
+    def InputStream(self, samplerate, channels=1, dtype="float32", blocksize=1024,
+                    device=None, callback=None, **kwargs):
+        self.check_input_settings(samplerate=samplerate)
+        self.streams_opened += 1
+        stream = WavInputStream(
+            self._audio_at(samplerate), samplerate, channels=channels, blocksize=blocksize,
+            callback=callback, realtime=self.realtime,
+        )
+        self._streams.append(stream)
+        return stream
+
+    def rec(self, frames, samplerate, channels=1, dtype=np.float32, device=None, **kwargs):
+        self.check_input_settings(samplerate=samplerate)
+        data = self._audio_at(samplerate)[:frames]
+        out = np.zeros((frames, channels), dtype=np.float32)
+        out[: len(data), :] = data[:, None]
+        if self.realtime:
+            self._rec_until = time.perf_counter() + frames / samplerate
+        return out
+
+    def wait(self):
+        if self._rec_until is not None:
+            delay = self._rec_until - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self._rec_until = None
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Fake `lerobot-record` executable for benchmarks on machines without an arm.
+
+Accepts the same command line ModelInference.run_inference() builds, checks
+that the policy path exists when it is a local directory, and sleeps for
+the episode time instead of driving the robot:
+
+    episode sleep = FAKE_LEROBOT_EPISODE_S if set,
+                    else --dataset.episode_time_s * FAKE_LEROBOT_TIME_SCALE (default 1.0)
+                    (times --dataset.num_episodes, with --dataset.reset_time_s
+                    between episodes, 60s by default like the real CLI)
+
+FAKE_LEROBOT_STARTUP_S adds the process start-up cost of the real CLI
+(imports, robot / camera connection, policy load). FAKE_LEROBOT_DATASET_MB
+writes that many MB per episode under --dataset.root, standing in for the
+recorded frames. Install it on PATH as
+`lerobot-record` with `install(bin_dir)`.
+"""
+
+import os
+import stat
+import sys
+import time
+
+
+def parse_args(argv):
+    """Parse `--key=value` arguments into a dict."""
+    args = {}
+    for arg in argv:
+        if arg.startswith("--") and "=" in arg:
+            key, value = arg[2:].split("=", 1)
+            args[key] = value
+    return args
+
+
+def install(bin_dir):
+    """Write a `lerobot-record` shim into `bin_dir` that runs this script; returns its path."""
+    os.makedirs(bin_dir, exist_ok=True)
+    shim = os.path.join(bin_dir, "lerobot-record")
+    with open(shim, "w", encoding="utf-8") as f:
+        f.write(f'#!/bin/sh\nexec "{sys.executable}" "{os.path.abspath(__file__)}" "$@"\n')
+    os.chmod(shim, os.stat(shim).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return shim
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+
+    policy_path = args.get("policy.path")
+    if policy_path and os.path.isabs(policy_path) and not os.path.isdir(policy_path):
+        print(f"fake lerobot-record: policy not found: {policy_path}", file=sys.stderr)
+        return 1
+
+    startup_s = float(os.environ.get("FAKE_LEROBOT_STARTUP_S", "0"))
+    scale = float(os.environ.get("FAKE_LEROBOT_TIME_SCALE", "1.0"))
+    if "FAKE_LEROBOT_EPISODE_S" in os.environ:
+        episode_s = float(os.environ["FAKE_LEROBOT_EPISODE_S"])
+    else:
+        episode_s = float(args.get("dataset.episode_time_s", 0)) * scale
+    num_episodes = int(args.get("dataset.num_episodes", 1))
+    reset_s = float(args.get("dataset.reset_time_s", 60)) * scale
+
+    time.sleep(startup_s + episode_s * num_episodes + reset_s * (num_episodes - 1))
+    dataset_mb = float(os.environ.get("FAKE_LEROBOT_DATASET_MB", "0"))
+    if dataset_mb and args.get("dataset.root"):
+        data_dir = os.path.join(args["dataset.root"], "data")
+        os.makedirs(data_dir, exist_ok=True)
+        for _ in range(num_episodes):
+            index = len(os.listdir(data_dir))
+            with open(os.path.join(data_dir, f"episode_{index:06d}.bin"), "wb") as f:
+                f.write(bytes(int(dataset_mb * 1e6)))
+    print(f"fake lerobot-record: {args.get('dataset.single_task', '')} "
+          f"({num_episodes} x {episode_s:.2f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
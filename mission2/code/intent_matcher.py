@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Local fast-path order matcher.
+
+Obvious transcripts such as "egg" or "one tuna please" are resolved locally
+against the menu and an alias table, without a network round trip. The index
+(normalized aliases, phonetic keys, fuzzy candidates) is built once when the
+matcher is created; exact and phonetic lookups are dict probes and fuzzy
+matching only runs over the short alias list, so a match takes microseconds.
+Only transcripts below the confidence threshold are sent to the LLM.
+
+`match_items()` handles multi-item orders ("two tuna and a green tea"): the
+transcript is split at "and" / commas, each part is matched on its own and
+a number word in front of an item gives its quantity.
+"""
+
+import difflib
+import re
+import threading
+
+# Extra ways customers (and Whisper) say each menu item.
+MENU_ALIASES = {
+    "egg": ["egg", "eggs", "egg sushi", "tamago", "tamagoyaki", "omelet", "omelette"],
+    "tuna": ["tuna", "tuna sushi", "maguro", "akami", "toro"],
+    "cucumber roll": ["cucumber roll", "cucumber", "cucumber sushi", "kappa maki",
+                      "kappamaki", "kappa roll"],
+    "tempura (fried shrimp)": ["tempura", "fried shrimp", "shrimp", "shrimp tempura",
+                               "prawn", "ebi", "ebi tempura", "tempura sushi"],
+    "greentea cup": ["greentea cup", "green tea", "greentea", "tea", "tea cup", "teacup",
+                     "cup of tea", "ocha", "matcha"],
+}
+
+# Filler words that must never match a menu item phonetically.
+STOPWORDS = {
+    "a", "an", "the", "and", "to", "too", "two", "one", "three", "please", "i", "id",
+    "want", "would", "like", "some", "can", "could", "have", "get", "me", "give", "for",
+    "of", "do", "you", "it", "this", "that", "then", "ten", "time", "thank", "thanks",
+    "um", "uh", "with", "order", "okay", "ok", "yes", "no",
+}
+
+# Quantity words (digits are read as numbers)
+QUANTITY_WORDS = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+                  "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10}
+
+# Amounts the fast path does not read; the LLM decides ("a dozen", "twenty", "a couple of")
+OTHER_QUANTITY_WORDS = {"eleven", "twelve", "dozen", "thirteen", "fourteen", "fifteen", "sixteen",
+                        "seventeen", "eighteen", "nineteen", "twenty", "thirty", "forty", "fifty",
+                        "hundred", "couple", "few", "several", "many", "lots", "half"}
+
+# Words that separate the items of a multi-item order
+ITEM_SEPARATORS = {",", "and", "plus", "also"}
+
+# Words that revise an order ("tuna, no, egg"); the LLM decides between several items then
+CORRECTION_WORDS = {"no", "not", "dont", "instead", "actually", "sorry", "without", "except", "but"}
+
+_WORD_RE = re.compile(r"[a-z]+")
+_ITEM_TOKEN_RE = re.compile(r"[a-z]+|\d+|,")
+_APOSTROPHE_RE = re.compile(r"['’]")  # "don't" -> "dont", "I'd" -> "id"
+
+# Soundex digit for each consonant (vowels, h, w, y are dropped)
+_SOUNDEX = {}
+for _letters, _digit in (("bfpv", "1"), ("cgjkqsxz", "2"), ("dt", "3"),
+                         ("l", "4"), ("mn", "5"), ("r", "6")):
+    for _letter in _letters:
+        _SOUNDEX[_letter] = _digit
+
+
+def normalize(text):
+    """Lower-case word tokens (punctuation removed, contractions kept whole)."""
+    return _WORD_RE.findall(_APOSTROPHE_RE.sub("", (text or "").lower()))
+
+
+def phonetic_key(word):
+    """Soundex code, e.g. 'tuna' and 'tune' both give 'T500'."""
+    if not word:
+        return ""
+    code = word[0].upper()
+    last = _SOUNDEX.get(word[0], "")
+    for letter in word[1:]:
+        digit = _SOUNDEX.get(letter, "")
+        if digit and digit != last:
+            code += digit
+        if letter not in "hw":
+            last = digit
+    return (code + "000")[:4]
+
+
+def confidence_label(score):
+    if score >= 0.9:
+        return "high"
+    if score >= 0.7:
+        return "medium"
+    return "low"
+
+
+class LocalIntentMatcher:
+    """
+    Match a transcript to a menu item with exact, phonetic and fuzzy alias lookup.
+
+    Scores: exact alias 1.0, phonetic match 0.8, fuzzy match 0.9 * similarity.
+    A phonetic key shared by two dishes is not used, and a phonetic match
+    loses to a fuzzy match on another dish.
+    When two different items both match, or the transcript revises itself
+    ("not tuna", CORRECTION_WORDS), the result is treated as ambiguous and its
+    score is reduced so that the LLM decides.
+    """
+
+    EXACT_SCORE = 1.0
+    PHONETIC_SCORE = 0.8
+    FUZZY_WEIGHT = 0.9
+    FUZZY_CUTOFF = 0.8
+    AMBIGUITY_PENALTY = 0.5
+    MULTI_ITEM_PENALTY = 0.9  # several dishes: only an exact match of every part stays local
+    MAX_LOCAL_QUANTITY = 5    # larger amounts are left to the LLM (and its limits)
+
+    def __init__(self, menu, aliases=None):
+        self.menu = list(menu)
+        aliases = aliases if aliases is not None else MENU_ALIASES
+        self.exact = {}
+        self.phonetic = {}
+        self.max_ngram = 1
+        shared_keys = set()
+        for item in self.menu:
+            for alias in [item] + list(aliases.get(item, [])):
+                tokens = tuple(normalize(alias))
+                if not tokens:
+                    continue
+                self.max_ngram = max(self.max_ngram, len(tokens))
+                self.exact.setdefault(tokens, item)
+                if not any(t in STOPWORDS for t in tokens):
+                    key = tuple(phonetic_key(t) for t in tokens)
+                    if self.phonetic.setdefault(key, item) != item:
+                        shared_keys.add(key)
+        for key in shared_keys:  # a key that sounds like two dishes decides nothing
+            del self.phonetic[key]
+        self.vocabulary = {t for tokens in self.exact for t in tokens}
+        self.fuzzy_choices = [" ".join(tokens) for tokens in self.exact]
+        self.fuzzy_items = {" ".join(tokens): item for tokens, item in self.exact.items()}
+
+    def _ngrams(self, tokens):
+        for n in range(min(self.max_ngram, len(tokens)), 0, -1):
+            for i in range(len(tokens) - n + 1):
+                yield tokens[i:i + n]
+
+    def _singular(self, token):
+        """'tunas' -> 'tuna' (a plural the alias table does not list)."""
+        if (token in self.vocabulary or token in STOPWORDS or len(token) < 4
+                or not token.endswith("s") or token.endswith("ss")):
+            return token
+        return token[:-1]
+
+    def match(self, text):
+        """
+        Return {"order", "confidence", "score", "method"} for the best menu item,
+        or None if nothing in the transcript resembles the menu.
+
+        Plurals are matched as the singular, and a phonetic match is dropped
+        when the spelling is closer to another dish:
+
+        >>> matcher = LocalIntentMatcher(list(MENU_ALIASES))
+        >>> [matcher.match(t)["order"] for t in ("i want two tunas", "cucumber rolls", "tamagos")]
+        ['tuna', 'cucumber roll', 'egg']
+        """
+        tokens = [self._singular(t) for t in normalize(text)]
+        best = {}  # item -> (score, method)
+
+        def consider(item, score, method):
+            if score > best.get(item, (0.0, None))[0]:
+                best[item] = (score, method)
+
+        for gram in self._ngrams(tokens):
+            gram = tuple(gram)
+            item = self.exact.get(gram)
+            if item is not None:
+                consider(item, self.EXACT_SCORE, "exact")
+                continue
+            if any(t in STOPWORDS or len(t) < 3 for t in gram):
+                continue
+            phrase = " ".join(gram)
+            fuzzy_item = None
+            for candidate in difflib.get_close_matches(
+                phrase, self.fuzzy_choices, n=1, cutoff=self.FUZZY_CUTOFF
+            ):
+                ratio = difflib.SequenceMatcher(None, phrase, candidate).ratio()
+                fuzzy_item = self.fuzzy_items[candidate]
+                consider(fuzzy_item, self.FUZZY_WEIGHT * ratio, "fuzzy")
+            item = self.phonetic.get(tuple(phonetic_key(t) for t in gram))
+            if item is not None and fuzzy_item in (None, item):
+                consider(item, self.PHONETIC_SCORE, "phonetic")
+
+        if not best:
+            return None
+
+        ranked = sorted(best.items(), key=lambda kv: kv[1][0], reverse=True)
+        order, (score, method) = ranked[0]
+        if (len(ranked) > 1 and ranked[1][1][0] >= self.PHONETIC_SCORE) or CORRECTION_WORDS.intersection(tokens):
+            score *= self.AMBIGUITY_PENALTY
+            method = "ambiguous"
+        return {
+            "order": order,
+            "confidence": confidence_label(score),
+            "score": round(score, 3),
+            "method": method,
+        }
+
+    def match_items(self, text):
+        """
+        Like `match()` for orders of one or more items: returns
+        {"order", "items": [{"order", "quantity"}], "confidence", "score", "method"}
+        with "order" the first item and the lowest part score, or None if no
+        part of the transcript resembles the menu. Several dishes cost
+        MULTI_ITEM_PENALTY; a correction word anywhere, an amount the fast path
+        does not read (OTHER_QUANTITY_WORDS, two numbers for one dish) or one
+        above MAX_LOCAL_QUANTITY makes the result ambiguous:
+
+        >>> matcher = LocalIntentMatcher(list(MENU_ALIASES))
+        >>> [(r["items"][0]["quantity"], r["method"]) for r in map(matcher.match_items, (
+        ...     "three tuna please", "i want ten tuna", "a dozen eggs"))]
+        [(3, 'exact'), (10, 'ambiguous'), (1, 'ambiguous')]
+        """
+        tokens = _ITEM_TOKEN_RE.findall(_APOSTROPHE_RE.sub("", (text or "").lower()))
+        parts, current = [], []
+        for token in tokens + [","]:
+            if token in ITEM_SEPARATORS:
+                if current:
+                    parts.append(current)
+                current = []
+            else:
+                current.append(token)
+
+        quantities = {}
+        score, method = None, None
+        unsure = False  # an amount the fast path may have misread
+        for part in parts:
+            quantity = None
+            words = []
+            for token in part:
+                if token in OTHER_QUANTITY_WORDS:
+                    unsure = True
+                elif quantity is None and (token.isdigit() or token in QUANTITY_WORDS):
+                    quantity = int(token) if token.isdigit() else QUANTITY_WORDS[token]
+                elif token.isdigit() or (token in QUANTITY_WORDS and token not in ("a", "an")):
+                    unsure = True
+                else:
+                    words.append(token)
+            match = self.match(" ".join(words))
+            if match is None:
+                continue  # filler such as "that's all"
+            quantities[match["order"]] = quantities.get(match["order"], 0) + max(quantity or 1, 1)
+            if score is None or match["score"] < score:
+                score, method = match["score"], match["method"]
+
+        if not quantities:
+            return None
+        unsure = unsure or max(quantities.values()) > self.MAX_LOCAL_QUANTITY
+        if method != "ambiguous" and (unsure or CORRECTION_WORDS.intersection(tokens)):
+            score *= self.AMBIGUITY_PENALTY
+            method = "ambiguous"
+        elif len(quantities) > 1:
+            score *= self.MULTI_ITEM_PENALTY
+        items = [{"order": order, "quantity": quantity} for order, quantity in quantities.items()]
+        return {
+            "order": items[0]["order"],
+            "items": items,
+            "confidence": confidence_label(score),
+            "score": round(score, 3),
+            "method": method,
+        }
+
+
+class RecognitionStats:
+    """Counters and timings per recognition path ("local", "cache", "llm")."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {"local": 0, "cache": 0, "llm": 0}
+        self.total_s = {"local": 0.0, "cache": 0.0, "llm": 0.0}
+        self.last_s = {"local": None, "cache": None, "llm": None}
+
+    def record(self, path, elapsed_s):
+        with self._lock:
+            self.counts[path] = self.counts.get(path, 0) + 1
+            self.total_s[path] = self.total_s.get(path, 0.0) + elapsed_s
+            self.last_s[path] = elapsed_s
+
+    def summary(self):
+        with self._lock:
+            total = sum(self.counts.values())
+            return {
+                "orders": total,
+                "fast_path_rate": (self.counts.get("local", 0) / total) if total else 0.0,
+                "counts": dict(self.counts),
+                "mean_ms": {
+                    path: (self.total_s[path] / n * 1000) if n else None
+                    for path, n in self.counts.items()
+                },
+                "last_ms": {
+                    path: (t * 1000 if t is not None else None)
+                    for path, t in self.last_s.items()
+                },
+            }
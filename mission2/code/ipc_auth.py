@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Shared secret for the local IPC services (policy_server.py, asr_service.py).
+
+Both services use `multiprocessing.connection`, which pickles every message:
+whoever can connect and authenticate can make the other side unpickle
+arbitrary objects, i.e. run code. The authkey is therefore never a built-in
+default. It comes from the service's environment variable (e.g.
+POLICY_SERVER_AUTHKEY), or else from a key file generated on first use
+(SUSHI_IPC_AUTHKEY_FILE, default ~/.config/sushi/ipc_authkey, mode 0600),
+which every process of the same user on the machine reads. Give the key
+to clients on other machines via the environment variable.
+"""
+
+import os
+import secrets
+
+AUTHKEY_FILE = os.environ.get(
+    "SUSHI_IPC_AUTHKEY_FILE", os.path.join(os.path.expanduser("~"), ".config", "sushi", "ipc_authkey")
+)
+
+
+def load_authkey(env_var, path=None):
+    """The authkey (bytes) from `env_var`, or from the key file (created if missing)."""
+    value = os.environ.get(env_var)
+    if value:
+        return value.encode("utf-8")
+    path = path or AUTHKEY_FILE
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(path, "rb") as f:
+            key = f.read().strip()
+        if not key:
+            raise RuntimeError(f"IPC key file is empty: {path} (delete it or set {env_var})")
+        return key
+    key = secrets.token_hex(32).encode("ascii")
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    return key
+
+
+def is_loopback(host):
+    return host in ("localhost", "::1") or host.startswith("127.")
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Reusable, deadline-bounded LLM client for order interpretation.
+
+The client is created once and reused for every order. Each request has a
+timeout, and an optional hedged second request is sent when the first one is
+slower than a latency percentile of recent requests. Backends are pluggable:
+Gemini for production, an in-process stub or a local HTTP stub server for
+benchmarks and tests.
+"""
+
+import asyncio
+import concurrent.futures
+import json
+import threading
+import time
+import urllib.request
+from collections import deque
+
+
+class LLMResponse:
+    """Minimal stand-in for a genai response (only `.text` is used)."""
+
+    def __init__(self, text):
+        self.text = text
+
+
+class GeminiBackend:
+    """Google Gemini; `genai.configure()` and the model are set up once."""
+
+    def __init__(self, api_key, model_name="gemini-2.5-flash"):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt, timeout_s):
+        response = self.model.generate_content(prompt, request_options={"timeout": timeout_s})
+        return response.text
+
+
+class StubBackend:
+    """
+    In-process fake LLM with injected latency.
+    `reply` is a string or a function `reply(prompt) -> str`;
+    `latency_s` is a number or a function `latency_s() -> seconds`.
+    """
+
+    def __init__(self, reply='{"order": "tuna", "confidence": "high"}', latency_s=0.0):
+        self.reply = reply
+        self.latency_s = latency_s
+        self.calls = 0
+
+    def generate(self, prompt, timeout_s):
+        self.calls += 1
+        delay = self.latency_s() if callable(self.latency_s) else self.latency_s
+        if delay:
+            time.sleep(delay)
+        return self.reply(prompt) if callable(self.reply) else self.reply
+
+
+class HTTPBackend:
+    """POST {"prompt": ...} as JSON to `url` and read {"text": ...} back (local stub servers)."""
+
+    def __init__(self, url):
+        self.url = url
+
+    def generate(self, prompt, timeout_s):
+        body = json.dumps({"prompt": prompt}).encode("utf-8")
+        request = urllib.request.Request(
+            self.url, data=body, headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request, timeout=timeout_s) as response:
+            return json.loads(response.read().decode("utf-8"))["text"]
+
+
+class LLMClient:
+    """
+    Long-lived client wrapping one backend.
+
+    - `timeout_s`: overall deadline per request (raises TimeoutError when exceeded)
+    - `hedge_percentile`: if set (e.g. 95), send a second request when the first
+      has not answered after that percentile of recent latencies; the first
+      answer wins. Hedging starts after `hedge_min_samples` requests.
+    - `generate_content(prompt)` mirrors genai.GenerativeModel, so the client can
+      be passed wherever a Gemini model is expected.
+    """
+
+    def __init__(self, backend, timeout_s=8.0, hedge_percentile=None, hedge_min_samples=20,
+                 history=200, max_workers=8):
+        self.backend = backend
+        self.timeout_s = timeout_s
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self._latencies = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="llm"
+        )
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.timeouts = 0
+
+    def _call(self, prompt, timeout_s):
+        start = time.perf_counter()
+        text = self.backend.generate(prompt, timeout_s)
+        with self._lock:
+            self._latencies.append(time.perf_counter() - start)
+        return text
+
+    def hedge_delay(self):
+        """Seconds to wait before hedging, or None when hedging is off / not enough data."""
+        if self.hedge_percentile is None:
+            return None
+        with self._lock:
+            if len(self._latencies) < self.hedge_min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.hedge_percentile / 100))
+        return ordered[index]
+
+    def generate(self, prompt, timeout_s=None):
+        """Return the response text, or raise TimeoutError after `timeout_s`."""
+        timeout_s = self.timeout_s if timeout_s is None else timeout_s
+        deadline = time.perf_counter() + timeout_s
+        with self._lock:
+            self.requests += 1
+
+        futures = [self._executor.submit(self._call, prompt, timeout_s)]
+        hedge_delay = self.hedge_delay()
+        if hedge_delay is not None and hedge_delay < timeout_s:
+            done, _ = concurrent.futures.wait(futures, timeout=hedge_delay)
+            if not done:
+                with self._lock:
+                    self.hedged += 1
+                remaining = max(0.0, deadline - time.perf_counter())
+                futures.append(self._executor.submit(self._call, prompt, remaining))
+
+        error = None
+        pending = set(futures)
+        while pending:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            done, pending = concurrent.futures.wait(
+                pending, timeout=remaining, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                if future.exception() is None:
+                    if future is not futures[0]:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return future.result()
+                error = future.exception()
+
+        if error is not None and not pending:
+            raise error
+        with self._lock:
+            self.timeouts += 1
+        raise TimeoutError(f"LLM request exceeded {timeout_s:.1f}s")
+
+    def generate_content(self, prompt, timeout_s=None):
+        return LLMResponse(self.generate(prompt, timeout_s=timeout_s))
+
+    async def agenerate(self, prompt, timeout_s=None):
+        """asyncio version of `generate()` (the blocking wait runs in the loop's default executor)."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.generate, prompt, timeout_s)
+
+    async def agenerate_content(self, prompt, timeout_s=None):
+        return LLMResponse(await self.agenerate(prompt, timeout_s=timeout_s))
+
+    def stats(self):
+        with self._lock:
+            ordered = sorted(self._latencies)
+            return {
+                "requests": self.requests,
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+                "timeouts": self.timeouts,
+                "p50_ms": ordered[len(ordered) // 2] * 1000 if ordered else None,
+                "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000
+                if ordered else None,
+            }
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
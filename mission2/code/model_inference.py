@@ -1,10 +1,65 @@
 import subprocess
 import os
-from huggingface_hub import snapshot_download
+import re
+import json
+import time
+import hashlib
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from episode_recorder import RECORDING_MODES, dir_size, prune_to_quota, run_name
+
+MANIFEST_NAME = "manifest.json"
+_COMMIT_RE = re.compile(r"^[0-9a-f]{40}$")
+
+
+def _default_downloader(**kwargs):
+    from huggingface_hub import snapshot_download
+    return snapshot_download(**kwargs)
+
+
+def _file_sha256(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _list_files(root):
+    """Relative paths of all model files (the huggingface_hub .cache folder is skipped)"""
+    files = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d != ".cache"]
+        for filename in filenames:
+            files.append(os.path.relpath(os.path.join(dirpath, filename), root))
+    return sorted(files)
+
+
+def _detect_revision(local_path):
+    """Commit hash of a downloaded snapshot, if it can be found on disk"""
+    name = os.path.basename(os.path.normpath(local_path))
+    if _COMMIT_RE.match(name):
+        # cache_dir layout: .../snapshots/<commit>
+        return name
+    metadata_dir = os.path.join(local_path, ".cache", "huggingface", "download")
+    for dirpath, _, filenames in os.walk(metadata_dir):
+        for filename in filenames:
+            if filename.endswith(".metadata"):
+                with open(os.path.join(dirpath, filename), "r") as f:
+                    commit = f.readline().strip()
+                if _COMMIT_RE.match(commit):
+                    return commit
+    return None
+
 
 class ModelInference:
     def __init__(self, model_paths, robot_port='/dev/ttyACM0', robot_id='my_awsome_follower_arm',
-                cameras=None, run_root=None, cache_dir=None):
+                cameras=None, run_root=None, cache_dir=None, offline=False, max_workers=4,
+                downloader=None, reset_time_s=None, recording="full", record_every=10,
+                record_quota_bytes=None):
         # Dictionary mapping model names to HuggingFace repository IDs
         self.model_paths = model_paths
         self.robot_port = robot_port
@@ -17,49 +72,196 @@ class ModelInference:
         self.cache_dir = cache_dir
         # Local paths for cached models
         self.cached_model_paths = {}
+        # Fail fast instead of downloading when a model is not cached yet
+        self.offline = offline
+        # Parallel downloads for cold misses
+        self.max_workers = max_workers
+        # snapshot_download-compatible callable (a local directory can stand in for the Hub)
+        self.downloader = downloader or _default_downloader
+        # Pause between episodes when one run serves a dish several times (None = lerobot default)
+        self.reset_time_s = reset_time_s
+        # Which runs keep their eval dataset (see episode_recorder.RECORDING_MODES); "full"
+        # appends every run to the dataset under run_root, the other modes give each run its
+        # own dataset and keep it only when sampled / failed, within record_quota_bytes.
+        # lerobot-record cannot serve without recording, so runs that are not kept still
+        # write a dataset to a scratch directory that is deleted afterwards (counted in
+        # scratch_bytes); only the policy server serves "rollout" with no writes at all
+        if recording not in RECORDING_MODES:
+            raise ValueError(f"Unknown recording mode: {recording}")
+        self.recording = recording
+        self.record_every = max(1, int(record_every))
+        self.record_quota_bytes = record_quota_bytes
+        self.runs = 0
+        self.scratch_bytes = 0
+        self.last_run = None
+        # Manifest of cached revisions / file hashes (only with an explicit cache_dir)
+        self.manifest_path = os.path.join(cache_dir, MANIFEST_NAME) if cache_dir else None
+        self._manifest_lock = threading.Lock()
+        self.manifest = self._load_manifest()
+        # Downloads in progress (shared when the same model is requested twice)
+        self._executor = None
+        self._inflight = {}
+
+    def _load_manifest(self):
+        if not self.manifest_path or not os.path.exists(self.manifest_path):
+            return {}
+        try:
+            with open(self.manifest_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Warning: ignoring unreadable manifest {self.manifest_path}: {e}")
+            return {}
+
+    def _save_manifest(self):
+        if not self.manifest_path:
+            return
+        os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _manifest_hit(self, model_name, verify=False):
+        """
+        Local path if the manifest entry matches the files on disk, else None.
+        Sizes are always checked; sha256 hashes only with verify=True.
+        """
+        entry = self.manifest.get(model_name)
+        if not entry or entry.get("repo_id") != self.model_paths.get(model_name):
+            return None
+        local_path = entry.get("local_path")
+        if not local_path or not os.path.isdir(local_path):
+            return None
+        for rel_path, info in entry.get("files", {}).items():
+            path = os.path.join(local_path, rel_path)
+            try:
+                if os.path.getsize(path) != info["size"]:
+                    return None
+            except OSError:
+                return None
+            if verify and _file_sha256(path) != info["sha256"]:
+                return None
+        return local_path
+
+    def _download(self, model_name):
+        hf_repo_id = self.model_paths[model_name]
+        print(f"Caching model: {model_name} ({hf_repo_id})")
+        start = time.perf_counter()
+        local_path = self.downloader(
+            repo_id=hf_repo_id,
+            cache_dir=self.cache_dir,
+            local_dir=os.path.join(self.cache_dir, model_name) if self.cache_dir else None,
+        )
+        files = {}
+        for rel_path in _list_files(local_path):
+            path = os.path.join(local_path, rel_path)
+            files[rel_path] = {"size": os.path.getsize(path), "sha256": _file_sha256(path)}
+        entry = {
+            "repo_id": hf_repo_id,
+            "revision": _detect_revision(local_path),
+            "local_path": os.path.abspath(local_path),
+            "files": files,
+            "cached_at": time.time(),
+        }
+        print(f"✓ Cache complete: {local_path} ({time.perf_counter() - start:.1f}s)")
+        return entry
 
-    def cache_models(self, model_names=None):
+    def cache_models(self, model_names=None, verify=False):
         """
         Pre-download and cache models from HuggingFace
         model_names: List of model names to cache (all models if None)
+        verify: Re-hash cached files against the manifest instead of only checking sizes
+
+        Warm hits (already cached in this process, or listed in the manifest with
+        matching files) return without any network call. Cold misses are
+        downloaded in parallel. In offline mode a cold miss raises RuntimeError.
         """
         if model_names is None:
             model_names = list(self.model_paths.keys())
-        
+
+        missing = []
         for model_name in model_names:
             if model_name not in self.model_paths:
                 print(f"Warning: Model {model_name} is not registered")
                 continue
-            
-            hf_repo_id = self.model_paths[model_name]
-            print(f"Caching model: {model_name} ({hf_repo_id})")
-            
-            try:
-                # Download model from HuggingFace Hub
-                local_path = snapshot_download(
-                    repo_id=hf_repo_id,
-                    cache_dir=self.cache_dir,
-                    local_dir=os.path.join(self.cache_dir, model_name) if self.cache_dir else None,
-                )
+            if model_name in self.cached_model_paths and not verify:
+                continue
+            local_path = self._manifest_hit(model_name, verify=verify)
+            if local_path:
                 self.cached_model_paths[model_name] = local_path
-                print(f"✓ Cache complete: {local_path}")
+            elif model_name not in missing:
+                missing.append(model_name)
+
+        if not missing:
+            return self.cached_model_paths
+
+        if self.offline:
+            raise RuntimeError(f"Models not cached (offline mode): {', '.join(missing)}")
+
+        futures = {}
+        with self._manifest_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="model-cache"
+                )
+            for model_name in missing:
+                future = self._inflight.get(model_name)
+                if future is None:
+                    future = self._executor.submit(self._download, model_name)
+                    self._inflight[model_name] = future
+                futures[model_name] = future
+
+        for model_name, future in futures.items():
+            try:
+                entry = future.result()
             except Exception as e:
                 print(f"✗ Cache failed {model_name}: {e}")
-        
+                entry = None
+            with self._manifest_lock:
+                if self._inflight.get(model_name) is future:
+                    del self._inflight[model_name]
+                if entry is not None:
+                    self.manifest[model_name] = entry
+                    self.cached_model_paths[model_name] = entry["local_path"]
+
+        with self._manifest_lock:
+            self._save_manifest()
         return self.cached_model_paths
 
+    def prefetch_all(self, verify=False):
+        """Cache every registered model (e.g. at startup, before the first order)"""
+        return self.cache_models(model_names=None, verify=verify)
+
     def run_inference(self, model_name, task="Serve ordered sushi", repo_id=None, 
                     episode_time_s=40, num_episodes=1, display_data=True):
+        """
+        Serve `model_name` with one lerobot-record run. Returns `last_run`; a
+        non-zero exit code raises RuntimeError (after `last_run` is recorded and
+        a failing run is kept in "failures" mode).
+        """
         if model_name not in self.model_paths:
             raise ValueError(f"Model {model_name} is not available.")
         
         hf_repo_id = self.model_paths[model_name]
+        # Use the cached snapshot when available so lerobot-record does not hit the Hub
+        policy_path = self.cached_model_paths.get(model_name, hf_repo_id)
         hf_user = os.environ.get('HF_USER', 'user')
         if repo_id is None:
             repo_id = f"{hf_user}/eval_{model_name}"
 
-        dataset_path = os.path.join(self.run_root, repo_id)
-        resume = os.path.exists(dataset_path)
+        # lerobot-record always writes a dataset; runs that are not kept write to scratch
+        index = self.runs
+        self.runs += 1
+        keep_dir = None
+        scratch = None
+        if self.recording == "full":
+            dataset_root = self.run_root
+        elif self.recording == "sampled" and index % self.record_every == 0:
+            keep_dir = os.path.join(self.run_root, "sampled")
+            dataset_root = os.path.join(keep_dir, run_name(model_name, index))
+        else:
+            scratch = tempfile.mkdtemp(prefix="lerobot_rollout_")
+            dataset_root = os.path.join(scratch, "dataset")
 
         # Create inference command
         command = [
@@ -70,15 +272,44 @@ class ModelInference:
             f"--robot.cameras={self.cameras}",
             f"--dataset.single_task={task}",
             f"--dataset.repo_id={repo_id}",
-            f"--dataset.root={self.run_root}",
+            f"--dataset.root={dataset_root}",
             f"--dataset.episode_time_s={episode_time_s}",
             f"--dataset.num_episodes={num_episodes}",
-            f"--policy.path={hf_repo_id}",
+            f"--policy.path={policy_path}",
             "--dataset.push_to_hub=false",
             f"--display_data={str(display_data).lower()}",
-            f"--resume=true"  # {str(resume).lower()}"
+            # Per-run datasets (modes other than "full") start a new one
+            f"--resume={'true' if dataset_root == self.run_root else 'false'}",
         ]
+        if self.reset_time_s is not None:
+            command.append(f"--dataset.reset_time_s={self.reset_time_s}")
         
         print(f"Running inference for {model_name}...")
         print(f"HuggingFace model: {hf_repo_id}")
-        subprocess.run(command, env=os.environ.copy())
\ No newline at end of file
+        start = time.perf_counter()
+        result = subprocess.run(command, env=os.environ.copy())
+
+        scratch_bytes = 0
+        if scratch is not None:
+            scratch_bytes = dir_size(scratch)
+            self.scratch_bytes += scratch_bytes
+            if self.recording == "failures" and result.returncode != 0:
+                keep_dir = os.path.join(self.run_root, "failures")
+                os.makedirs(keep_dir, exist_ok=True)
+                target = os.path.join(keep_dir, run_name(model_name, index))
+                if os.path.isdir(dataset_root):
+                    shutil.move(dataset_root, target)
+                dataset_root = target
+            shutil.rmtree(scratch, ignore_errors=True)
+        if keep_dir is not None and self.record_quota_bytes is not None:
+            prune_to_quota(keep_dir, self.record_quota_bytes, keep=(os.path.basename(dataset_root),))
+        self.last_run = {
+            "model_name": model_name,
+            "returncode": result.returncode,
+            "elapsed_s": time.perf_counter() - start,
+            "dataset": dataset_root if (keep_dir is not None or scratch is None) else None,
+            "scratch_bytes": scratch_bytes,
+        }
+        if result.returncode != 0:
+            raise RuntimeError(f"lerobot-record failed for {model_name} (exit code {result.returncode})")
+        return self.last_run
\ No newline at end of file
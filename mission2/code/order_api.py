@@ -0,0 +1,503 @@
+#!/usr/bin/env python3
+"""
+Headless order API (HTTP + WebSocket) on asyncio.
+
+Runs the same transcribe → recognize → serve stages as the Tk UI, for
+tablets, load generators or any other client. Connections are handled on one
+event loop; ASR / intent work runs in a small bounded thread pool and robot
+serving goes through the shared OrderPipeline, so many concurrent clients do
+not mean one thread per request. Phase events from `status_callback` are
+pushed to WebSocket subscribers as they happen.
+
+HTTP:
+    GET  /health
+    GET  /stats
+    POST /orders         JSON {"text": "...", "serve": true}
+                         or a WAV body (Content-Type: audio/wav)
+                         or raw PCM (application/octet-stream, ?sample_rate=48000&format=f32|s16)
+                         ?serve=0 only recognizes, ?wait=served waits for the robot;
+                         a guess made without the LLM (order deadline) is not served
+                         but ends as "needs_confirmation" (409 with ?wait=served)
+    GET  /orders/{id}    status, result and events of one order
+
+WebSocket /ws (JSON text frames, PCM as binary frames):
+    → {"type": "subscribe", "order_id": 3}      (omit order_id for every order)
+    → {"type": "text_order", "text": "...", "serve": true}
+    → {"type": "audio_start", "sample_rate": 48000, "format": "f32", "serve": true}
+      <binary PCM frames> {"type": "audio_end"}
+    ← {"type": "accepted", "order_id": 3}
+    ← {"type": "event", "order_id": 3, "phase": "recognized", ...}
+
+Usage:
+    python order_api.py [--host 127.0.0.1] [--port 8080]
+    python order_api.py --fake        # stub ASR / LLM / robot, no hardware or keys needed
+"""
+
+import argparse
+import asyncio
+import io
+import itertools
+import json
+import os
+import queue
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from serving_plan import items_to_order, result_items
+
+ORDER_API_HOST = os.environ.get("ORDER_API_HOST", "127.0.0.1")
+ORDER_API_PORT = int(os.environ.get("ORDER_API_PORT", "8080"))
+MAX_UPLOAD_SECONDS = 30      # longest accepted utterance
+MAX_ORDERS_KEPT = 1000       # finished orders kept for GET /orders/{id}
+
+# phase -> order status shown by GET /orders/{id}
+STATUS_BY_PHASE = {
+    "transcribing": "transcribing",
+    "recognizing": "recognizing",
+    "recognized": "recognized",
+    "queued": "queued",
+    "serving": "serving",
+    "served": "served",
+    "rejected": "rejected",
+    "confirm_needed": "needs_confirmation",
+    "failed": "failed",
+    "serve_failed": "failed",
+}
+
+
+class ApiOrder:
+    """One order placed through the API."""
+
+    def __init__(self, order_id, kind):
+        self.id = order_id
+        self.kind = kind
+        self.status = "received"
+        self.created_at = time.time()
+        self.result = None
+        self.events = []
+        self.phases = set()
+        self.done = False
+        self.changed = asyncio.Event()
+
+    def to_dict(self):
+        return {
+            "order_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "result": self.result,
+            "events": self.events,
+        }
+
+
+class EventListener:
+    """Event queue of one WebSocket; `order_ids` None means every order."""
+
+    def __init__(self, order_ids=None, max_events=256):
+        self.queue = asyncio.Queue(maxsize=max_events)
+        self.order_ids = order_ids
+
+    def wants(self, order_id):
+        return self.order_ids is None or order_id in self.order_ids
+
+
+class OrderService:
+    """
+    Order processing shared by every API client.
+
+    `asr_engine` defaults to the process-wide engine; `pipeline` to a new
+    OrderPipeline around `serve_order` (pass the UI's pipeline to share the robot).
+    """
+
+    def __init__(self, asr_engine=None, pipeline=None, workers=2, max_queue=None):
+        import sushi_voice_master as master
+
+        self.master = master
+        self.asr_engine = asr_engine
+        self.workers = workers
+        self.pipeline = pipeline
+        self._owns_pipeline = pipeline is None
+        self.max_queue = max_queue or master.PIPELINE_MAX_QUEUE
+        self.orders = OrderedDict()
+        self.listeners = set()
+        self._ids = itertools.count(1)
+        self.loop = None
+        self.executor = None
+        self.rejected = 0
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.executor = ThreadPoolExecutor(self.workers, thread_name_prefix="order-api")
+        if self.asr_engine is None:
+            self.asr_engine = await self.loop.run_in_executor(
+                self.executor, lambda: self.master.get_asr_engine(warm_up=True)
+            )
+        if self.pipeline is None:
+            from order_pipeline import OrderPipeline
+            self.pipeline = OrderPipeline(self.master.serve_order, max_queue=self.max_queue).start()
+        return self
+
+    async def close(self):
+        if self._owns_pipeline and self.pipeline is not None:
+            await self.loop.run_in_executor(None, self.pipeline.stop)
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+
+    # ----- Events -----
+    def _status_callback(self, order):
+        """status_callback for worker threads: hands every phase to the event loop."""
+
+        def callback(phase, **info):
+            self.loop.call_soon_threadsafe(self._publish, order, phase, info)
+
+        return self.master.trace_order(callback)
+
+    def _publish(self, order, phase, info):
+        event = {"phase": phase, "t": time.time(), **info}
+        order.events.append(event)
+        order.status = STATUS_BY_PHASE.get(phase, order.status)
+        order.phases.add(phase)
+        if phase == "recognized":
+            order.result.update(
+                {key: info.get(key) for key in ("text", "order", "items", "confidence", "source")}
+            )
+        if phase in ("served", "rejected", "confirm_needed", "failed", "serve_failed") or (
+            phase == "recognized" and not order.result["serve"]
+        ):
+            order.done = True
+        # Wake everyone waiting on this order, then start a fresh event
+        order.changed.set()
+        order.changed = asyncio.Event()
+
+        message = {"type": "event", "order_id": order.id, **event}
+        for listener in list(self.listeners):
+            if listener.wants(order.id):
+                try:
+                    listener.queue.put_nowait(message)
+                except asyncio.QueueFull:
+                    pass  # slow client: drop events rather than block the loop
+
+    def add_listener(self, order_ids=None):
+        listener = EventListener(order_ids)
+        self.listeners.add(listener)
+        return listener
+
+    def remove_listener(self, listener):
+        self.listeners.discard(listener)
+
+    # ----- Orders -----
+    def _new_order(self, kind, serve):
+        order = ApiOrder(next(self._ids), kind)
+        order.result = {"serve": serve}
+        self.orders[order.id] = order
+        while len(self.orders) > MAX_ORDERS_KEPT:
+            self.orders.popitem(last=False)
+        return order
+
+    def place_text_order(self, text, serve=True):
+        """Start processing a text order; returns the ApiOrder immediately."""
+        order = self._new_order("text", serve)
+        asyncio.ensure_future(self._process(order, text=text))
+        return order
+
+    def place_audio_order(self, audio, sample_rate, serve=True):
+        """Start processing a recorded utterance; returns the ApiOrder immediately."""
+        order = self._new_order("audio", serve)
+        asyncio.ensure_future(self._process(order, audio=audio, sample_rate=sample_rate))
+        return order
+
+    async def _process(self, order, text=None, audio=None, sample_rate=None):
+        callback = self._status_callback(order)
+        notify = self.master.make_notifier(callback)
+        deadline = self.master.new_order_deadline()
+        try:
+            if audio is not None:
+                text = await self.loop.run_in_executor(
+                    self.executor, self.master.transcribe_recording,
+                    audio, sample_rate, self.asr_engine, notify, deadline,
+                )
+            result = await self.loop.run_in_executor(
+                self.executor, self.master.interpret_order, text, notify, deadline
+            )
+        except Exception as e:
+            self._publish(order, "failed", {"error": f"{type(e).__name__}: {e}"})
+            return
+        report = deadline.report()
+        self.master.DEADLINE_STATS.record(report)
+        notify("deadline_report", deadline=report)
+
+        if not order.result["serve"]:
+            return
+        queued = items_to_order(result_items(result))
+        if result.get("needs_confirmation"):
+            # A guess made without the LLM: the client confirms by placing the dish again
+            self._publish(order, "confirm_needed", {"order": queued})
+            return
+        try:
+            self.pipeline.submit(queued, block=False, status_callback=callback)
+        except queue.Full:
+            self.rejected += 1
+            self._publish(order, "rejected", {"reason": "robot queue full"})
+            return
+        except ValueError as e:
+            # StationDispatcher.route(): no station has every dish of the order on its menu
+            self.rejected += 1
+            self._publish(order, "rejected", {"reason": str(e)})
+            return
+        self._publish(order, "queued", {"order": queued, "depth": self.pipeline.depth})
+
+    async def wait_for(self, order, phase="recognized", timeout=None):
+        """Wait until `order` reached `phase` (or finished); returns the order."""
+
+        async def reached():
+            while phase not in order.phases and not order.done:
+                await order.changed.wait()
+
+        await asyncio.wait_for(reached(), timeout)
+        return order
+
+    def stats(self):
+        statuses = {}
+        for order in self.orders.values():
+            statuses[order.status] = statuses.get(order.status, 0) + 1
+        return {
+            "orders": statuses,
+            "rejected": self.rejected,
+            "listeners": len(self.listeners),
+            "pipeline": self.pipeline.stats() if self.pipeline else None,
+        }
+
+
+# ===== Audio payloads =====
+def decode_pcm(data, fmt="f32"):
+    """Raw little-endian PCM bytes → mono float32 in [-1, 1]."""
+    if fmt == "s16":
+        return np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768.0
+    return np.frombuffer(data, dtype="<f4").astype(np.float32)
+
+
+def decode_wav(data):
+    from audio_capture import read_wav
+    return read_wav(io.BytesIO(data))
+
+
+def check_duration(audio, sample_rate):
+    if len(audio) == 0:
+        raise ValueError("empty audio")
+    if len(audio) > MAX_UPLOAD_SECONDS * sample_rate:
+        raise ValueError(f"audio longer than {MAX_UPLOAD_SECONDS}s")
+
+
+def parse_flag(value, name="serve"):
+    """
+    true / false from a query parameter or a JSON field: a JSON boolean, 0 / 1,
+    or "1" / "true" / "yes" / "0" / "false" / "no". Anything else is a ValueError (400).
+    """
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str) and value.strip().lower() in ("1", "true", "yes", "0", "false", "no"):
+        return value.strip().lower() in ("1", "true", "yes")
+    raise ValueError(f"'{name}' must be true or false, got {value!r}")
+
+
+# ===== HTTP / WebSocket handlers =====
+def create_app(service):
+    from aiohttp import WSMsgType, web
+
+    def json_response(payload, status=200):
+        return web.json_response(payload, status=status, dumps=lambda o: json.dumps(o, default=str))
+
+    async def health(request):
+        return json_response({"ok": True})
+
+    async def stats(request):
+        return json_response(service.stats())
+
+    async def post_order(request):
+        try:
+            serve = parse_flag(request.query.get("serve", "1"))
+            if request.content_type == "application/json":
+                payload = await request.json()
+                text = str(payload.get("text", "")).strip()
+                if not text:
+                    raise ValueError("missing 'text'")
+                serve = parse_flag(payload.get("serve", serve))
+                order = service.place_text_order(text, serve=serve)
+            else:
+                body = await request.read()
+                if request.content_type in ("audio/wav", "audio/x-wav", "audio/wave"):
+                    audio, sample_rate = decode_wav(body)
+                else:
+                    sample_rate = int(request.query.get("sample_rate", "16000"))
+                    audio = decode_pcm(body, request.query.get("format", "f32"))
+                check_duration(audio, sample_rate)
+                order = service.place_audio_order(audio, sample_rate, serve=serve)
+        except (ValueError, json.JSONDecodeError) as e:
+            return json_response({"ok": False, "error": str(e)}, status=400)
+
+        wait = request.query.get("wait", "recognized")
+        try:
+            await service.wait_for(order, wait, timeout=float(request.query.get("timeout", "120")))
+        except asyncio.TimeoutError:
+            return json_response({"ok": False, "error": "timeout", **order.to_dict()}, status=504)
+        status = {"rejected": 503, "needs_confirmation": 409, "failed": 500}.get(order.status, 200)
+        return json_response({"ok": status == 200, **order.to_dict()}, status=status)
+
+    async def get_order(request):
+        order = service.orders.get(int(request.match_info["order_id"]))
+        if order is None:
+            return json_response({"ok": False, "error": "unknown order"}, status=404)
+        return json_response({"ok": True, **order.to_dict()})
+
+    async def websocket(request):
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        listener = service.add_listener(order_ids=set())
+
+        async def forward_events():
+            while True:
+                message = await listener.queue.get()
+                await ws.send_str(json.dumps(message, default=str))
+
+        sender = asyncio.ensure_future(forward_events())
+        stream = None   # {"chunks": [...], "sample_rate": ..., "format": ..., "serve": ...}
+        try:
+            async for msg in ws:
+                if msg.type == WSMsgType.BINARY:
+                    if stream is not None:
+                        stream["chunks"].append(decode_pcm(msg.data, stream["format"]))
+                    continue
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                try:
+                    command = json.loads(msg.data)
+                    kind = command.get("type")
+                    if kind == "subscribe":
+                        if command.get("order_id") is None:
+                            listener.order_ids = None
+                        elif listener.order_ids is not None:
+                            listener.order_ids.add(int(command["order_id"]))
+                        continue
+                    if kind == "text_order":
+                        order = service.place_text_order(
+                            str(command["text"]), serve=parse_flag(command.get("serve", True))
+                        )
+                    elif kind == "audio_start":
+                        stream = {
+                            "chunks": [],
+                            "sample_rate": int(command.get("sample_rate", 16000)),
+                            "format": command.get("format", "f32"),
+                            "serve": parse_flag(command.get("serve", True)),
+                        }
+                        continue
+                    elif kind == "audio_end" and stream is not None:
+                        audio = np.concatenate(stream["chunks"]) if stream["chunks"] else np.zeros(0, np.float32)
+                        check_duration(audio, stream["sample_rate"])
+                        order = service.place_audio_order(audio, stream["sample_rate"], serve=stream["serve"])
+                        stream = None
+                    else:
+                        raise ValueError(f"unknown message type: {kind}")
+                except (ValueError, KeyError, json.JSONDecodeError) as e:
+                    await ws.send_str(json.dumps({"type": "error", "error": str(e)}))
+                    continue
+                if listener.order_ids is not None:
+                    listener.order_ids.add(order.id)
+                await ws.send_str(json.dumps({"type": "accepted", "order_id": order.id}))
+        finally:
+            sender.cancel()
+            service.remove_listener(listener)
+        return ws
+
+    app = web.Application(client_max_size=MAX_UPLOAD_SECONDS * 48000 * 4 + 1024)
+    app.router.add_get("/health", health)
+    app.router.add_get("/stats", stats)
+    app.router.add_post("/orders", post_order)
+    app.router.add_get("/orders/{order_id}", get_order)
+    app.router.add_get("/ws", websocket)
+    return app
+
+
+async def run_server(service, host=ORDER_API_HOST, port=ORDER_API_PORT, ready=None):
+    """Serve the API until cancelled. `ready(port)` is called once listening."""
+    from aiohttp import web
+
+    await service.start()
+    runner = web.AppRunner(create_app(service))
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = runner.addresses[0][1]
+    print(f"🍣 Order API listening on http://{host}:{bound_port}")
+    if ready is not None:
+        ready(bound_port)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        await service.close()
+
+
+def start_in_thread(service, host=ORDER_API_HOST, port=ORDER_API_PORT):
+    """Run the API on its own event loop in a daemon thread (e.g. next to the Tk UI)."""
+    thread = threading.Thread(
+        target=lambda: asyncio.run(run_server(service, host, port)), name="order-api", daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def build_fake_service(fixture_dir=None, episode_s=0.5, llm_ms=300.0, asr_base_ms=50.0):
+    """
+    OrderService on stand-ins: scripted ASR that knows the fixture transcripts,
+    stub LLM and a fake lerobot-record. Returns (service, fixture_dir).
+    """
+    import bench_e2e
+
+    work_dir = tempfile.mkdtemp(prefix="order_api_fake_")
+    bench_e2e.install_stand_ins(work_dir, episode_s=episode_s, realtime=False)
+    import sushi_voice_master as master
+
+    if fixture_dir is None:
+        fixture_dir = os.path.join(work_dir, "fixtures")
+        bench_e2e.make_fixtures(fixture_dir)
+    fixtures = bench_e2e.load_fixtures(fixture_dir)
+    bench_e2e.configure_backends(master, fixtures, work_dir, llm_ms=llm_ms)
+
+    engine = bench_e2e.ScriptedASREngine(base_s=asr_base_ms / 1000)
+    for item in fixtures:
+        audio, rate = decode_wav(open(item["path"], "rb").read())
+        engine.add_transcript(master.resample_audio(audio, rate, master.WHISPER_SAMPLE_RATE), item["text"])
+    return OrderService(asr_engine=engine), fixture_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless order API (HTTP + WebSocket)")
+    parser.add_argument("--host", default=ORDER_API_HOST)
+    parser.add_argument("--port", type=int, default=ORDER_API_PORT)
+    parser.add_argument("--workers", type=int, default=2, help="threads for ASR / intent work")
+    parser.add_argument("--fake", action="store_true", help="stub ASR, LLM and robot")
+    parser.add_argument("--fixtures", help="fixture directory for --fake (generated if omitted)")
+    parser.add_argument("--episode-s", type=float, default=0.5, help="fake robot episode time")
+    args = parser.parse_args()
+
+    if args.fake:
+        service, fixture_dir = build_fake_service(args.fixtures, episode_s=args.episode_s)
+        service.workers = args.workers
+        print(f"Fake backends; fixtures in {fixture_dir}")
+    else:
+        service = OrderService(workers=args.workers)
+    try:
+        asyncio.run(run_server(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
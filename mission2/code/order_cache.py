@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+LRU / TTL cache for LLM order interpretations.
+
+Keys are the normalized transcript within a namespace derived from the menu
+and the prompt template, so changing either invalidates old entries. The
+cache lives in memory and can optionally be persisted to a JSON file so it
+survives restarts.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize_transcript(text):
+    """'  One TUNA, please! ' -> 'one tuna please'"""
+    return " ".join(_WORD_RE.findall((text or "").lower()))
+
+
+def make_namespace(*parts):
+    """Short hash of everything that changes the meaning of a cached answer."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(json.dumps(part, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+class OrderCache:
+    """
+    Bounded in-memory cache with LRU eviction and an optional time-to-live.
+
+    `valid_orders` restricts what can be stored: only results whose "order" is
+    in that collection (i.e. in SUSHI_MENU) and that are not fallbacks are cached.
+    """
+
+    def __init__(self, namespace, max_entries=512, ttl_s=None, path=None, valid_orders=None):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.path = path
+        self.valid_orders = set(valid_orders) if valid_orders is not None else None
+        self._entries = OrderedDict()  # key -> (stored_at, result)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if self.path:
+            self._load()
+
+    def _key(self, text):
+        return normalize_transcript(text)
+
+    def _expired(self, stored_at, now):
+        return self.ttl_s is not None and now - stored_at > self.ttl_s
+
+    def get(self, text):
+        key = self._key(text)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._expired(entry[0], now):
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[1])
+
+    def put(self, text, result):
+        """Store `result` if it is a validated, non-fallback menu item. Returns True if stored."""
+        if not result or result.get("fallback"):
+            return False
+        if self.valid_orders is not None and result.get("order") not in self.valid_orders:
+            return False
+        key = self._key(text)
+        if not key:
+            return False
+        with self._lock:
+            self._entries[key] = (time.time(), dict(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        if self.path:
+            self._save()
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.path:
+            self._save()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+    # ----- Disk store -----
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Ignoring unreadable order cache {self.path}: {e}")
+            return
+
+        if data.get("namespace") != self.namespace:
+            # Menu or prompt changed since the file was written.
+            return
+        now = time.time()
+        for key, stored_at, result in data.get("entries", []):
+            if not self._expired(stored_at, now):
+                self._entries[key] = (stored_at, result)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _save(self):
+        with self._lock:
+            entries = [[key, stored_at, result] for key, (stored_at, result) in self._entries.items()]
+        data = {"namespace": self.namespace, "entries": entries}
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️  Could not write order cache {self.path}: {e}")
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Per-order latency budget with deadline-aware degradation.
+
+An `OrderDeadline` starts when intake starts and is passed through capture,
+transcription and interpretation. Each stage asks for its budget (the time
+left minus what the later stages need, `reserves`) and degrades instead of
+overrunning it:
+
+- capture:  the maximum recording length is shortened
+- asr:      greedy decoding or a smaller resident model, or the last
+            streaming partial transcript without a final decode
+- intent:   the LLM is skipped (or given only the time left) in favour of
+            local matching; a low-confidence guess is flagged for the
+            customer to confirm
+
+Stage overruns ("misses") and the degradation path are reported per order
+(`report()`) and summed up in `DeadlineStats`. A deadline without a budget
+never degrades, so the stages can always take one.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+from tracing import RollingHistogram
+
+STAGES = ("capture", "asr", "intent")
+# Seconds kept free for each stage while the stages before it run
+DEFAULT_RESERVES = {"asr": 1.5, "intent": 1.0}
+
+
+class OrderDeadline:
+    """
+    - `budget_s`: time from the start of intake to a recognized order (None = unlimited)
+    - `reserves`: {stage: seconds} a stage needs at least (see DEFAULT_RESERVES)
+    """
+
+    def __init__(self, budget_s=None, reserves=None, clock=time.perf_counter):
+        self.budget_s = budget_s
+        self.reserves = dict(DEFAULT_RESERVES, **(reserves or {}))
+        self.clock = clock
+        self.started = clock()
+        self.stages = {}     # stage -> {"budget_s", "elapsed_s", "missed"}
+        self.degraded = []   # [{"stage", "action", "reason"}] in the order they happened
+
+    @property
+    def limited(self):
+        return self.budget_s is not None
+
+    def elapsed(self):
+        return self.clock() - self.started
+
+    def remaining(self):
+        if not self.limited:
+            return float("inf")
+        return max(0.0, self.budget_s - self.elapsed())
+
+    def stage_budget(self, stage):
+        """Seconds `stage` may take: the time left minus the reserves of the stages after it."""
+        later = STAGES[STAGES.index(stage) + 1:] if stage in STAGES else ()
+        return max(0.0, self.remaining() - sum(self.reserves.get(s, 0.0) for s in later))
+
+    @contextmanager
+    def stage(self, stage):
+        """Time one stage against its budget (yielded); overruns are recorded as misses."""
+        budget = self.stage_budget(stage)
+        start = self.clock()
+        try:
+            yield budget
+        finally:
+            elapsed = self.clock() - start
+            self.stages[stage] = {
+                "budget_s": budget if self.limited else None,
+                "elapsed_s": elapsed,
+                "missed": self.limited and elapsed > budget,
+            }
+
+    def degrade(self, stage, action, reason=""):
+        self.degraded.append({"stage": stage, "action": action, "reason": reason})
+        print(f"⏱  Deadline: {stage} → {action}" + (f" ({reason})" if reason else ""))
+
+    def report(self):
+        elapsed = self.elapsed()
+        return {
+            "budget_s": self.budget_s,
+            "elapsed_s": elapsed,
+            "missed": self.limited and elapsed > self.budget_s,
+            "stage_misses": [stage for stage, s in self.stages.items() if s["missed"]],
+            "path": [f"{d['stage']}:{d['action']}" for d in self.degraded],
+            "stages": {stage: round(s["elapsed_s"], 4) for stage, s in self.stages.items()},
+        }
+
+
+class DecodeEstimator:
+    """
+    Predicts ASR decode times from recent ones: the `pct` percentile of seconds
+    per second of audio, kept per decoding mode ("beam", "greedy", "small").
+    """
+
+    def __init__(self, window=50, pct=90, min_samples=3):
+        self.pct = pct
+        self.min_samples = min_samples
+        self.window = window
+        self._rtf = {}
+        self._lock = threading.Lock()
+
+    def add(self, mode, audio_s, decode_s):
+        if audio_s <= 0:
+            return
+        with self._lock:
+            self._rtf.setdefault(mode, RollingHistogram(self.window)).add(decode_s / audio_s)
+
+    def estimate(self, mode, audio_s):
+        """Expected decode seconds, or None without enough samples."""
+        with self._lock:
+            hist = self._rtf.get(mode)
+            if hist is None or len(hist.samples) < self.min_samples:
+                return None
+            return hist.percentile(self.pct) * audio_s
+
+
+class DeadlineStats:
+    """Deadline misses and degradation paths over all orders."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.orders = 0
+        self.missed = 0
+        self.degraded = 0
+        self.stage_misses = {}
+        self.actions = {}
+
+    def record(self, report):
+        with self._lock:
+            self.orders += 1
+            self.missed += report["missed"]
+            self.degraded += bool(report["path"])
+            for stage in report["stage_misses"]:
+                self.stage_misses[stage] = self.stage_misses.get(stage, 0) + 1
+            for step in report["path"]:
+                self.actions[step] = self.actions.get(step, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "orders": self.orders,
+                "miss_rate": self.missed / self.orders if self.orders else 0.0,
+                "degraded_rate": self.degraded / self.orders if self.orders else 0.0,
+                "stage_misses": dict(self.stage_misses),
+                "paths": dict(self.actions),
+            }
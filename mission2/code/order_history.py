@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Persistent order log (SQLite).
+
+Every finished order is kept: transcript, the dishes served, recognition
+confidence and source, whether the random fallback was used, and the stage
+timings. Records come from a tracing.PhaseTracer (`on_finish=history.record`),
+so the stage spans are the same as in the latency traces.
+
+Writes never touch the database on the order path: `record()` appends to a
+pending list and a writer thread inserts it in batches (one transaction per
+`batch_size` orders or every `flush_interval_s`). The log is read back by
+demand_predictor.DemandPredictor to decide which policies to keep warm.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from serving_plan import order_items
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at REAL NOT NULL,
+    kiosk TEXT,
+    transcript TEXT,
+    items TEXT NOT NULL,
+    confidence TEXT,
+    source TEXT,
+    fallback INTEGER NOT NULL DEFAULT 0,
+    status TEXT,
+    spans TEXT
+);
+CREATE INDEX IF NOT EXISTS orders_started_at ON orders (started_at);
+"""
+
+_COLUMNS = ("started_at", "kiosk", "transcript", "items", "confidence", "source", "fallback", "status", "spans")
+
+
+class OrderHistory:
+    """
+    SQLite order log with batched writes.
+
+    - `path`: database file (":memory:" for a throwaway log)
+    - `batch_size`: pending orders that trigger a write
+    - `flush_interval_s`: longest time an order waits before it is written
+    - `kiosk`: stored with every order (several kiosks can share one file)
+    """
+
+    def __init__(self, path, batch_size=32, flush_interval_s=2.0, kiosk=None):
+        self.path = path
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval_s = flush_interval_s
+        self.kiosk = kiosk
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._db_lock = threading.Lock()
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = False
+        self.written = 0
+        self.batches = 0
+        self.write_s = 0.0
+        self._thread = threading.Thread(target=self._run, name="order-history", daemon=True)
+        self._thread.start()
+
+    # ----- Writing -----
+    def record(self, record):
+        """
+        Queue one finished order: a PhaseTracer record ({"started_at", "status",
+        "spans", "order", "text", "confidence", "source", "fallback"}).
+        Orders that were not served (no dish, or a guess the customer rejected) are skipped.
+        """
+        if not record.get("order") or record.get("status") == "order_cancelled":
+            return False
+        row = (
+            record.get("started_at", time.time()),
+            record.get("kiosk", self.kiosk),
+            record.get("text"),
+            json.dumps(order_items(record["order"]), ensure_ascii=False),
+            record.get("confidence"),
+            record.get("source"),
+            int(bool(record.get("fallback"))),
+            record.get("status"),
+            json.dumps(record.get("spans") or {}),
+        )
+        with self._pending_lock:
+            self._pending.append(row)
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._wake.set()
+        return True
+
+    def flush(self):
+        """Write every pending order now; returns how many were written."""
+        with self._pending_lock:
+            rows, self._pending = self._pending, []
+        if not rows:
+            return 0
+        start = time.perf_counter()
+        with self._db_lock:
+            with self._db:
+                self._db.executemany(
+                    f"INSERT INTO orders ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})",
+                    rows,
+                )
+            self.written += len(rows)
+            self.batches += 1
+            self.write_s += time.perf_counter() - start
+        return len(rows)
+
+    def _run(self):
+        while not self._stop:
+            self._wake.wait(self.flush_interval_s)
+            self._wake.clear()
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"⚠️  Order history write failed: {e}")
+
+    def close(self):
+        self._stop = True
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+        with self._db_lock:
+            self._db.close()
+
+    # ----- Reading -----
+    def _query(self, sql, params=()):
+        with self._db_lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def item_events(self, since=None, until=None):
+        """[(started_at, item)] of every served dish (repeats expanded), oldest first."""
+        rows = self._query(
+            "SELECT started_at, items FROM orders WHERE started_at >= ? AND started_at < ? ORDER BY started_at",
+            (since if since is not None else 0.0, until if until is not None else float("inf")),
+        )
+        return [(started_at, item) for started_at, items in rows for item in json.loads(items)]
+
+    def recent(self, limit=20):
+        """The last `limit` orders as dicts, newest first."""
+        rows = self._query(
+            f"SELECT {', '.join(_COLUMNS)} FROM orders ORDER BY started_at DESC LIMIT ?", (limit,)
+        )
+        orders = []
+        for row in rows:
+            order = dict(zip(_COLUMNS, row))
+            order["items"] = json.loads(order["items"])
+            order["spans"] = json.loads(order["spans"] or "{}")
+            order["fallback"] = bool(order["fallback"])
+            orders.append(order)
+        return orders
+
+    def stats(self):
+        (count, fallbacks), = self._query("SELECT COUNT(*), COALESCE(SUM(fallback), 0) FROM orders")
+        with self._pending_lock:
+            pending = len(self._pending)
+        return {
+            "orders": count,
+            "fallback_rate": fallbacks / count if count else 0.0,
+            "sources": dict(self._query("SELECT source, COUNT(*) FROM orders GROUP BY source")),
+            "pending": pending,
+            "batches": self.batches,
+            "mean_batch": self.written / self.batches if self.batches else 0.0,
+            "write_ms_per_order": self.write_s * 1000 / self.written if self.written else 0.0,
+        }
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Overlapped order pipeline.
+
+Intake (audio → ASR → intent) and robot execution run as separate stages
+joined by a bounded queue: the counter can take the next voice order while the
+arm is still serving, and throughput is limited by the robot instead of by the
+sum of every stage's latency. When the queue is full, intake pauses
+(backpressure) until the robot catches up.
+"""
+
+import itertools
+import queue
+import threading
+import time
+
+
+class OrderPipeline:
+    """
+    Robot-side consumer of recognized orders.
+
+    `serve(order, status_callback)` executes one order (e.g.
+    sushi_voice_master.serve_order); the callback is the one given to
+    `submit()`, so per-order tracing follows the order onto the robot.
+    `on_event(phase, **info)` receives
+    "queued", "serving", "served" and "serve_failed" events, each with the
+    current queue depth, so a UI can show how many orders are waiting.
+    A failed serve is also reported to the order's own callback, so its
+    trace (and anyone waiting on the order) sees it finish:
+
+    >>> def serve(order, status_callback):
+    ...     raise RuntimeError("arm offline")
+    >>> events = []
+    >>> pipeline = OrderPipeline(serve).start()
+    >>> _ = pipeline.submit("tuna", status_callback=lambda phase, **info: events.append((phase, info)))
+    >>> pipeline.stop()
+    >>> events
+    [('serve_failed', {'order': 'tuna', 'error': 'arm offline'})]
+    >>> pipeline.stats()["failed"]
+    1
+    """
+
+    def __init__(self, serve, max_queue=3, on_event=None):
+        self.serve = serve
+        self.max_queue = max_queue
+        self.on_event = on_event
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._ids = itertools.count(1)
+        self._capacity = threading.Condition()
+        self._thread = None
+        self._busy = False
+        self.started_at = None
+        self.served = 0
+        self.failed = 0
+        self.wait_s = []      # time each order spent queued
+        self.serve_s = []     # time each order spent on the robot
+
+    # ----- Events -----
+    def _emit(self, phase, **info):
+        info.setdefault("depth", self.depth)
+        if self.on_event is not None:
+            try:
+                self.on_event(phase, **info)
+            except Exception as e:
+                print(f"[Pipeline event error @ {phase}]: {e}")
+
+    @staticmethod
+    def _notify(status_callback, phase, **info):
+        """Send `phase` to an order's own status_callback (errors there never stop the robot stage)."""
+        if status_callback is not None:
+            try:
+                status_callback(phase, **info)
+            except Exception as e:
+                print(f"[Status callback error @ {phase}]: {e}")
+
+    # ----- Producer side (intake) -----
+    @property
+    def depth(self):
+        """Orders waiting for the robot (not counting the one being served)."""
+        return self._queue.qsize()
+
+    @property
+    def busy(self):
+        return self._busy
+
+    def has_capacity(self):
+        return not self._queue.full()
+
+    def wait_for_capacity(self, timeout=None):
+        """Block until another order can be queued. Returns False on timeout."""
+        with self._capacity:
+            return self._capacity.wait_for(self.has_capacity, timeout=timeout)
+
+    def submit(self, order, block=True, timeout=None, status_callback=None):
+        """Queue a recognized order; returns its id. Raises queue.Full if non-blocking and full."""
+        order_id = next(self._ids)
+        self._queue.put(
+            (order_id, order, time.perf_counter(), status_callback), block=block, timeout=timeout
+        )
+        self._emit("queued", order=order, order_id=order_id)
+        return order_id
+
+    # ----- Consumer side (robot) -----
+    def start(self):
+        if self._thread is None:
+            self.started_at = time.perf_counter()
+            self._thread = threading.Thread(target=self._run, name="robot-stage", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            order_id, order, queued_at, status_callback = item
+            with self._capacity:
+                self._capacity.notify_all()
+
+            self._busy = True
+            self.wait_s.append(time.perf_counter() - queued_at)
+            self._emit("serving", order=order, order_id=order_id)
+            start = time.perf_counter()
+            try:
+                self.serve(order, status_callback)
+                self.served += 1
+                self._emit("served", order=order, order_id=order_id)
+            except Exception as e:
+                self.failed += 1
+                self._notify(status_callback, "serve_failed", order=order, error=str(e))
+                self._emit("serve_failed", order=order, order_id=order_id, error=str(e))
+            finally:
+                self.serve_s.append(time.perf_counter() - start)
+                self._busy = False
+                self._queue.task_done()
+
+    def join(self):
+        """Wait until every queued order has been served."""
+        self._queue.join()
+
+    def stop(self, drain=True):
+        """Stop the robot stage, by default after serving what is already queued."""
+        if self._thread is None:
+            return
+        if not drain:
+            while True:
+                try:
+                    self._queue.get_nowait()
+                    self._queue.task_done()
+                except queue.Empty:
+                    break
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def stats(self):
+        elapsed = (time.perf_counter() - self.started_at) if self.started_at else 0.0
+        return {
+            "served": self.served,
+            "failed": self.failed,
+            "depth": self.depth,
+            "orders_per_hour": (self.served / elapsed * 3600) if elapsed else 0.0,
+            "mean_wait_s": (sum(self.wait_s) / len(self.wait_s)) if self.wait_s else 0.0,
+            "mean_serve_s": (sum(self.serve_s) / len(self.serve_s)) if self.serve_s else 0.0,
+        }
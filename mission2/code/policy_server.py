@@ -0,0 +1,541 @@
+#!/usr/bin/env python3
+"""
+Resident policy runtime for serving orders.
+
+`ModelInference.run_inference()` starts a new `lerobot-record` process per
+dish, which re-imports torch, reloads the policy, reopens both cameras and
+reconnects the arm every time. This module keeps all of that resident in one
+long-lived worker process:
+
+    python policy_server.py                # real SO-101 + LeRobot ACT policies
+    python policy_server.py --fake         # fake robot / cameras / policies
+
+Clients send "serve <menu item>" commands over a local
+`multiprocessing.connection` socket; `PolicyServerClient` wraps that with the
+same `cache_models()` / `run_inference()` methods as `ModelInference`, so
+`execute_sushi_serving()` can use either backend. Both sides authenticate
+with POLICY_SERVER_AUTHKEY or the generated key file (ipc_auth.py).
+"""
+
+import argparse
+import os
+import threading
+import time
+from collections import OrderedDict
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+from completion import CompletionDetector, EpisodeLog, joint_vector
+from episode_recorder import RECORDING_MODES, EpisodeRecorder
+from ipc_auth import is_loopback, load_authkey
+
+POLICY_SERVER_HOST = "127.0.0.1"
+POLICY_SERVER_PORT = int(os.environ.get("POLICY_SERVER_PORT", "6010"))
+POLICY_SERVER_AUTHKEY_ENV = "POLICY_SERVER_AUTHKEY"  # shared secret, else the generated key file (see ipc_auth.py)
+
+
+# ===== LeRobot adapters (only imported when the real hardware is used) =====
+def parse_cameras(cameras):
+    """Parse the `--robot.cameras` string used by lerobot-record into a dict."""
+    import yaml
+
+    return yaml.safe_load(cameras) if isinstance(cameras, str) else dict(cameras)
+
+
+def make_lerobot_robot(robot_port, robot_id, cameras):
+    """Create (but do not connect) the SO-101 follower with its OpenCV cameras."""
+    from lerobot.cameras.opencv.configuration_opencv import OpenCVCameraConfig
+    from lerobot.robots.so101_follower import SO101Follower, SO101FollowerConfig
+
+    camera_configs = {}
+    for name, cfg in parse_cameras(cameras).items():
+        cfg = {k: v for k, v in cfg.items() if k != "type"}
+        camera_configs[name] = OpenCVCameraConfig(**cfg)
+    config = SO101FollowerConfig(port=robot_port, id=robot_id, cameras=camera_configs)
+    return SO101Follower(config)
+
+
+class LeRobotPolicy:
+    """
+    ACT policy wrapper exposing `reset()` / `select_action(observation, task)`,
+    doing the same observation → action conversion as lerobot-record.
+    """
+
+    def __init__(self, policy_path, robot):
+        from lerobot.datasets.utils import hw_to_dataset_features
+        from lerobot.policies.act.modeling_act import ACTPolicy
+        from lerobot.utils.utils import get_safe_torch_device
+
+        self.policy = ACTPolicy.from_pretrained(policy_path)
+        self.device = get_safe_torch_device(self.policy.config.device)
+        self.robot = robot
+        self.features = hw_to_dataset_features(robot.observation_features, "observation")
+
+    def reset(self):
+        self.policy.reset()
+
+    def select_action(self, observation, task=None):
+        from lerobot.datasets.utils import build_dataset_frame
+        from lerobot.utils.control_utils import predict_action
+
+        frame = build_dataset_frame(self.features, observation, prefix="observation")
+        values = predict_action(
+            frame,
+            self.policy,
+            self.device,
+            self.policy.config.use_amp,
+            task=task,
+            robot_type=self.robot.robot_type,
+        )
+        return {key: values[i].item() for i, key in enumerate(self.robot.action_features)}
+
+
+# ===== Runtime =====
+class PolicyRuntime:
+    """
+    Keeps the robot connection, cameras and the most recently used policies loaded.
+
+    - `robot`: object with connect() / get_observation() / send_action() / disconnect()
+    - `policy_loader(model_name, policy_path)`: returns an object with
+      reset() / select_action(observation, task)
+    - `completion_detector`: completion.CompletionDetector that ends an episode
+      once the arm is back at rest (None = always run `episode_time_s`)
+    - `episode_log`: completion.EpisodeLog for the real episode durations
+    - `recorder`: episode_recorder.EpisodeRecorder for eval episodes (None = no recording)
+    """
+
+    def __init__(self, robot, policy_loader, max_policies=2, fps=30, completion_detector=None,
+                 episode_log=None, recorder=None):
+        self.robot = robot
+        self.policy_loader = policy_loader
+        self.max_policies = max_policies
+        self.fps = fps
+        self.completion_detector = completion_detector
+        self.episode_log = episode_log if episode_log is not None else EpisodeLog()
+        self.recorder = recorder
+        self.policies = OrderedDict()  # model_name -> policy (LRU order)
+        self._lock = threading.Lock()
+        self.episodes = []
+
+    def connect(self):
+        if not getattr(self.robot, "is_connected", False):
+            start = time.perf_counter()
+            self.robot.connect()
+            print(f"✓ Robot connected ({time.perf_counter() - start:.2f}s)")
+
+    def load_policy(self, model_name, policy_path):
+        """Return a resident policy, loading it (and evicting the LRU one) if needed."""
+        if model_name in self.policies:
+            self.policies.move_to_end(model_name)
+            return self.policies[model_name], 0.0
+
+        start = time.perf_counter()
+        policy = self.policy_loader(model_name, policy_path)
+        load_s = time.perf_counter() - start
+        self.policies[model_name] = policy
+        while len(self.policies) > self.max_policies:
+            evicted, _ = self.policies.popitem(last=False)
+            print(f"   Unloaded policy: {evicted}")
+        print(f"✓ Policy loaded: {model_name} ({load_s:.2f}s)")
+        return policy, load_s
+
+    def preload(self, model_name, policy_path):
+        """Connect and load a policy ahead of its order; returns the load time (0.0 if resident)."""
+        with self._lock:
+            self.connect()
+            _, load_s = self.load_policy(model_name, policy_path)
+            return load_s
+
+    def run_episode(self, model_name, policy_path, task, episode_time_s):
+        """Run one serving episode and return its timing breakdown."""
+        with self._lock:
+            start = time.perf_counter()
+            self.connect()
+            policy, load_s = self.load_policy(model_name, policy_path)
+            policy.reset()
+            detector = self.completion_detector
+            if detector is not None:
+                detector.reset()
+                joint_names = list(self.robot.action_features)
+
+            recorder = self.recorder
+            recording = recorder.begin(model_name, task) if recorder is not None else None
+
+            period = 1.0 / self.fps
+            steps = 0
+            overruns = 0
+            stop_reason = "timeout"
+            episode_start = time.perf_counter()
+            next_tick = episode_start
+            try:
+                while time.perf_counter() - episode_start < episode_time_s:
+                    observation = self.robot.get_observation()
+                    action = policy.select_action(observation, task=task)
+                    self.robot.send_action(action)
+                    steps += 1
+                    if recording is not None:
+                        recorder.add_frame(recording, observation, action)
+                    if detector is not None and detector.update(
+                        time.perf_counter() - episode_start,
+                        joint_vector(observation, joint_names),
+                        joint_vector(action, joint_names),
+                    ):
+                        stop_reason = "completed"
+                        break
+                    next_tick += period
+                    delay = next_tick - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    else:
+                        overruns += 1
+            except Exception:
+                if recording is not None:
+                    recorder.end(recording, "error")
+                raise
+            episode_s = time.perf_counter() - episode_start
+            recorded = recorder.end(recording, stop_reason) if recording is not None else False
+
+            timing = {
+                "model_name": model_name,
+                "policy_load_s": load_s,
+                "episode_s": episode_s,
+                "total_s": time.perf_counter() - start,
+                "episode_time_s": episode_time_s,
+                "stop_reason": stop_reason,
+                "steps": steps,
+                "loop_overruns": overruns,
+                "recorded": recorded,
+                "frames_dropped": recording.dropped if recording is not None else 0,
+            }
+            self.episodes.append(timing)
+            self.episode_log.record(timing)
+            print(f"   Episode {model_name}: {episode_s:.1f}s of {episode_time_s:.0f}s ({stop_reason})")
+            return timing
+
+    def close(self):
+        if self.recorder is not None:
+            self.recorder.close()
+        if getattr(self.robot, "is_connected", False):
+            self.robot.disconnect()
+
+
+# ===== IPC server =====
+def parse_command(message):
+    """Accept either a dict command or a plain "serve <menu item>" string."""
+    if isinstance(message, dict):
+        return message
+    text = str(message).strip()
+    cmd, _, arg = text.partition(" ")
+    return {"cmd": cmd.lower(), "item": arg.strip()}
+
+
+def _policy_path(runtime, command, model_paths):
+    item = command.get("item")
+    if command.get("policy_path"):
+        return command["policy_path"]
+    if item in model_paths:
+        return model_paths[item]
+    # A resident policy can be served by name alone.
+    return item if item in runtime.policies else None
+
+
+def handle_command(runtime, command, model_paths):
+    cmd = command.get("cmd")
+    if cmd == "ping":
+        return {"ok": True}
+    if cmd == "stats":
+        return {
+            "ok": True,
+            "episodes": runtime.episodes,
+            "durations": runtime.episode_log.summary(),
+            "resident": list(runtime.policies),
+            "recording": runtime.recorder.stats() if runtime.recorder is not None else None,
+        }
+    if cmd == "serve":
+        item = command.get("item")
+        policy_path = _policy_path(runtime, command, model_paths)
+        if not policy_path:
+            return {"ok": False, "error": f"No model available for: {item}"}
+        timings = []
+        for _ in range(int(command.get("num_episodes", 1))):
+            timings.append(runtime.run_episode(
+                item,
+                policy_path,
+                task=command.get("task") or f"Serve {item}",
+                episode_time_s=float(command.get("episode_time_s", 20)),
+            ))
+        return {"ok": True, "timings": timings}
+    if cmd == "preload":
+        item = command.get("item")
+        policy_path = _policy_path(runtime, command, model_paths)
+        if not policy_path:
+            return {"ok": False, "error": f"No model available for: {item}"}
+        return {"ok": True, "policy_load_s": runtime.preload(item, policy_path)}
+    return {"ok": False, "error": f"Unknown command: {cmd}"}
+
+
+def _handle_connection(conn, runtime, model_paths, stop):
+    """Execute commands from one client until it disconnects."""
+    with conn:
+        while not stop.is_set():
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                return
+            command = parse_command(message)
+            if command.get("cmd") == "shutdown":
+                stop.set()
+                conn.send({"ok": True})
+                return
+            try:
+                reply = handle_command(runtime, command, model_paths)
+            except Exception as e:
+                reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            conn.send(reply)
+
+
+def serve_forever(runtime, model_paths=None, host=POLICY_SERVER_HOST, port=POLICY_SERVER_PORT,
+                  authkey=None, ready=None):
+    """
+    Accept client connections and execute their commands until "shutdown".
+    Each connection gets a thread; episodes are serialized by the runtime's lock.
+    """
+    model_paths = model_paths or {}
+    stop = threading.Event()
+    authkey = authkey or load_authkey(POLICY_SERVER_AUTHKEY_ENV)
+    if not is_loopback(host):
+        print(f"⚠️  Policy server reachable from other machines on {host}: clients need the same {POLICY_SERVER_AUTHKEY_ENV}")
+    listener = Listener((host, port), authkey=authkey)
+    print(f"🤖 Policy server listening on {host}:{listener.address[1]}")
+    if ready is not None:
+        ready(listener.address)
+
+    def close_on_stop():
+        stop.wait()
+        # Closing the socket does not wake a blocked accept() on Linux; connect once instead.
+        try:
+            Client(listener.address, authkey=authkey).close()
+        except OSError:
+            pass
+        listener.close()
+
+    threading.Thread(target=close_on_stop, daemon=True).start()
+    try:
+        while not stop.is_set():
+            try:
+                conn = listener.accept()
+            except AuthenticationError:
+                print("⚠️  Rejected a connection with a wrong authkey")
+                continue
+            except OSError:
+                break
+            if stop.is_set():
+                conn.close()
+                break
+            threading.Thread(
+                target=_handle_connection, args=(conn, runtime, model_paths, stop), daemon=True
+            ).start()
+    finally:
+        stop.set()
+        runtime.close()
+
+
+# ===== Client (drop-in for ModelInference) =====
+class PolicyServerClient:
+    """
+    Talks to a running policy server. Has the same `cache_models()` /
+    `run_inference()` methods as ModelInference.
+    """
+
+    def __init__(self, model_paths, host=POLICY_SERVER_HOST, port=POLICY_SERVER_PORT,
+                 authkey=None):
+        self.model_paths = model_paths
+        self.address = (host, port)
+        self.authkey = authkey or load_authkey(POLICY_SERVER_AUTHKEY_ENV)
+        self._conn = None
+        self._lock = threading.Lock()
+        self.last_timings = []
+
+    def _request(self, command):
+        with self._lock:
+            if self._conn is None:
+                self._conn = Client(self.address, authkey=self.authkey)
+            self._conn.send(command)
+            return self._conn.recv()
+
+    def ping(self):
+        try:
+            return self._request({"cmd": "ping"}).get("ok", False)
+        except (OSError, EOFError):
+            return False
+
+    def cache_models(self, model_names=None):
+        """Ask the server to preload policies (it keeps the most recent ones resident)."""
+        if model_names is None:
+            model_names = list(self.model_paths.keys())
+        for model_name in model_names:
+            if model_name not in self.model_paths:
+                print(f"Warning: Model {model_name} is not registered")
+                continue
+            reply = self._request({
+                "cmd": "preload",
+                "item": model_name,
+                "policy_path": self.model_paths[model_name],
+            })
+            if not reply.get("ok"):
+                print(f"✗ Preload failed {model_name}: {reply.get('error')}")
+        return {}
+
+    def run_inference(self, model_name, task="Serve ordered sushi", repo_id=None,
+                      episode_time_s=40, num_episodes=1, display_data=True):
+        if model_name not in self.model_paths:
+            raise ValueError(f"Model {model_name} is not available.")
+        reply = self._request({
+            "cmd": "serve",
+            "item": model_name,
+            "policy_path": self.model_paths[model_name],
+            "task": task,
+            "episode_time_s": episode_time_s,
+            "num_episodes": num_episodes,
+        })
+        if not reply.get("ok"):
+            raise RuntimeError(reply.get("error"))
+        self.last_timings = reply["timings"]
+        for timing in self.last_timings:
+            print(
+                f"   Episode {model_name}: load {timing['policy_load_s']:.2f}s, "
+                f"run {timing['episode_s']:.2f}s, {timing['steps']} steps"
+            )
+        return self.last_timings
+
+    def stats(self):
+        return self._request({"cmd": "stats"})
+
+    def resident(self):
+        """Policies the server has loaded right now."""
+        return self.stats().get("resident", [])
+
+    def shutdown(self):
+        try:
+            self._request({"cmd": "shutdown"})
+        finally:
+            self.close()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class LocalPolicyBackend:
+    """
+    In-process PolicyRuntime with the ModelInference interface (no server):
+    `cache_models()` preloads policies, `run_inference()` runs episodes.
+    """
+
+    def __init__(self, runtime, model_paths):
+        self.runtime = runtime
+        self.model_paths = model_paths
+        self.last_timings = []
+
+    def cache_models(self, model_names=None):
+        if model_names is None:
+            model_names = list(self.model_paths.keys())
+        model_names = [name for name in model_names if name in self.model_paths]
+        # Only the last `max_policies` stay resident; loading the others would be evicted right away
+        for model_name in model_names[-self.runtime.max_policies:]:
+            self.runtime.preload(model_name, self.model_paths[model_name])
+        return {}
+
+    def run_inference(self, model_name, task="Serve ordered sushi", repo_id=None,
+                      episode_time_s=40, num_episodes=1, display_data=True):
+        if model_name not in self.model_paths:
+            raise ValueError(f"Model {model_name} is not available.")
+        self.last_timings = [
+            self.runtime.run_episode(model_name, self.model_paths[model_name], task, episode_time_s)
+            for _ in range(num_episodes)
+        ]
+        return self.last_timings
+
+    def resident(self):
+        """Policies loaded right now."""
+        return list(self.runtime.policies)
+
+
+def build_runtime(args):
+    detector = None
+    if args.hold_s > 0:
+        detector = CompletionDetector(position_tol=args.rest_tol, hold_s=args.hold_s)
+    episode_log = EpisodeLog(args.episode_log)
+    recorder = None
+    if args.record_mode != "rollout":
+        recorder = EpisodeRecorder(
+            args.record_root, mode=args.record_mode, every_n=args.record_every, fps=args.fps,
+            quota_bytes=args.record_quota_mb * 1e6 if args.record_quota_mb else None,
+        ).start()
+
+    if args.fake:
+        from fake_hardware import FakePolicyLoader, FakeRobot
+
+        robot = FakeRobot(connect_delay_s=args.fake_connect_s)
+        return PolicyRuntime(
+            robot, FakePolicyLoader(load_time_s=args.fake_load_s),
+            max_policies=args.max_policies, fps=args.fps,
+            completion_detector=detector, episode_log=episode_log, recorder=recorder,
+        )
+
+    robot = make_lerobot_robot(args.robot_port, args.robot_id, args.cameras)
+    return PolicyRuntime(
+        robot,
+        lambda model_name, policy_path: LeRobotPolicy(policy_path, robot),
+        max_policies=args.max_policies,
+        fps=args.fps,
+        completion_detector=detector,
+        episode_log=episode_log,
+        recorder=recorder,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resident SO-101 policy server")
+    parser.add_argument("--port", type=int, default=POLICY_SERVER_PORT)
+    parser.add_argument("--robot-port", default="/dev/ttyACM2")
+    parser.add_argument("--robot-id", default="my_awsome_follower_arm")
+    parser.add_argument(
+        "--cameras",
+        default="{top: {type: opencv, index_or_path: 8, width: 640, height: 480, fps: 30}, "
+                "wrist: {type: opencv, index_or_path: 10, width: 640, height: 480, fps: 30}}",
+    )
+    parser.add_argument("--max-policies", type=int, default=2,
+                        help="Number of policies kept loaded (LRU)")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--model", action="append", default=[], metavar="ITEM=REPO_OR_PATH",
+                        help='Policy for plain "serve <item>" commands (repeatable)')
+    parser.add_argument("--hold-s", type=float, default=1.0,
+                        help="End an episode after the arm rested this long (0 = always run episode_time_s)")
+    parser.add_argument("--rest-tol", type=float, default=3.0,
+                        help="Max joint distance from the rest pose (degrees) that counts as resting")
+    parser.add_argument("--episode-log", default="./episode_durations.jsonl",
+                        help="JSONL log of the real episode durations")
+    parser.add_argument("--record-mode", choices=RECORDING_MODES, default="rollout",
+                        help="Which serving episodes are recorded as eval episodes")
+    parser.add_argument("--record-every", type=int, default=10, help="Record every Nth episode (sampled)")
+    parser.add_argument("--record-root", default="./eval_policy_server",
+                        help="Directory of the recorded eval episodes")
+    parser.add_argument("--record-quota-mb", type=float, default=2000.0,
+                        help="Disk budget of --record-root; the oldest episodes are deleted (0 = unlimited)")
+    parser.add_argument("--fake", action="store_true",
+                        help="Use fake robot / cameras / policies (no hardware needed)")
+    parser.add_argument("--fake-connect-s", type=float, default=1.0)
+    parser.add_argument("--fake-load-s", type=float, default=2.0)
+    args = parser.parse_args()
+
+    model_paths = dict(entry.split("=", 1) for entry in args.model)
+    runtime = build_runtime(args)
+    runtime.connect()
+    serve_forever(runtime, model_paths=model_paths, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Streaming polyphase decimator (e.g. 48 kHz microphone → 16 kHz for Whisper).
+
+Replaces the FFT-based `scipy.signal.resample` over the whole recording with
+a low-pass FIR filter designed once, applied block by block as audio arrives.
+Only the kept output samples are computed, filter state is carried across
+blocks, and all work / output buffers are preallocated.
+"""
+
+import numpy as np
+from scipy import signal
+
+
+def design_lowpass(factor, taps_per_phase=32, cutoff=0.9, beta=8.0):
+    """
+    Kaiser-window anti-aliasing filter for decimation by `factor`.
+
+    The filter has an odd length (so its delay is a whole number of input
+    samples) and is padded with one trailing zero to `taps_per_phase * factor`
+    taps. With an even `taps_per_phase` the delay is then a whole number of
+    output samples as well: `taps_per_phase // 2 - 1`.
+    """
+    if taps_per_phase % 2:
+        raise ValueError("taps_per_phase must be even")
+    taps = signal.firwin(taps_per_phase * factor - 1, cutoff / factor, window=("kaiser", beta))
+    return np.append(taps, 0.0).astype(np.float32)
+
+
+class PolyphaseResampler:
+    """
+    Decimate a stream by the integer factor `orig_sr // target_sr`.
+
+    The input is viewed as rows of `factor` samples (one row per output sample),
+    so each filter phase is a matrix-vector product over contiguous memory and
+    nothing is computed for the samples that would be thrown away.
+    """
+
+    def __init__(self, orig_sr=48000, target_sr=16000, taps_per_phase=32, max_block=4096):
+        if orig_sr % target_sr != 0:
+            raise ValueError(
+                f"PolyphaseResampler needs an integer ratio, got {orig_sr} → {target_sr}"
+            )
+        self.orig_sr = orig_sr
+        self.target_sr = target_sr
+        self.factor = orig_sr // target_sr
+        self.taps = design_lowpass(self.factor, taps_per_phase)
+        # Group delay of the linear-phase filter, in output samples
+        self.delay = taps_per_phase // 2 - 1
+
+        m = self.factor
+        self.num_phases = len(self.taps) // m
+        # phases[j] multiplies the row that is j rows older than the current one
+        self.phases = np.ascontiguousarray(
+            self.taps.reshape(self.num_phases, m)[:, ::-1]
+        )
+        self._pending = np.zeros(m, dtype=np.float32)
+        self._pending_count = 0
+        self._allocate(max_block)
+        self.reset()
+
+    def _allocate(self, max_block):
+        m = self.factor
+        self.max_block = max_block
+        max_rows = max_block // m + 1
+        history = self.num_phases - 1
+        old_rows = getattr(self, "_rows", None)
+        self._rows = np.zeros((history + max_rows, m), dtype=np.float32)
+        if old_rows is not None:
+            self._rows[:history] = old_rows[:history]
+        self._flat = self._rows.reshape(-1)
+        self._out = np.zeros(max_rows, dtype=np.float32)
+        self._tmp = np.zeros(max_rows, dtype=np.float32)
+
+    def reset(self):
+        """Clear the filter state (start of a new utterance)."""
+        self._rows[: self.num_phases - 1] = 0.0
+        self._pending_count = 0
+
+    def output_length(self, num_input):
+        """Number of output samples produced after feeding `num_input` more samples."""
+        return (self._pending_count + num_input) // self.factor
+
+    def process(self, chunk, out=None):
+        """
+        Feed one block at `orig_sr` and return the new samples at `target_sr`.
+
+        The result is written into `out` when given (it must hold at least
+        `output_length(len(chunk))` samples), otherwise into an internal buffer
+        that is reused by the next call.
+        """
+        m = self.factor
+        chunk = np.asarray(chunk, dtype=np.float32).reshape(-1)
+        if len(chunk) + m > self.max_block:
+            self._allocate(len(chunk) + m)
+
+        history = self.num_phases - 1
+        base = history * m
+        p = self._pending_count
+        self._flat[base:base + p] = self._pending[:p]
+        self._flat[base + p:base + p + len(chunk)] = chunk
+        total = p + len(chunk)
+        rows = total // m
+        remainder = total - rows * m
+        self._pending[:remainder] = self._flat[base + rows * m:base + total]
+        self._pending_count = remainder
+
+        if out is None:
+            out = self._out
+        y = out[:rows]
+        tmp = self._tmp[:rows]
+        y[:] = 0.0
+        for j in range(self.num_phases):
+            np.dot(self._rows[history - j:history - j + rows], self.phases[j], out=tmp)
+            y += tmp
+
+        # Keep the newest rows as history for the next block.
+        self._rows[:history] = self._rows[rows:rows + history]
+        return y
+
+    def flush(self):
+        """Push zeros through the filter to emit the delayed tail of the stream."""
+        tail = np.zeros(len(self.taps), dtype=np.float32)
+        return self.process(tail).copy()
+
+    def resample(self, audio):
+        """Resample a whole buffer in one call, compensating for the filter delay."""
+        audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+        self.reset()
+        num_out = len(audio) // self.factor
+        result = np.empty(num_out + len(self.taps) // self.factor + 1, dtype=np.float32)
+        n = self.output_length(len(audio))
+        self.process(audio, out=result)
+        tail = self.flush()
+        result[n:n + len(tail)] = tail
+        return result[self.delay:self.delay + num_out]
+
+
+def choose_capture_rate(device, preferred_rate, fallback_rate, channels=1):
+    """
+    Return `preferred_rate` if the input device accepts it (so no resampling is
+    needed at all), otherwise `fallback_rate`.
+    """
+    try:
+        import sounddevice as sd
+        sd.check_input_settings(
+            device=device, samplerate=preferred_rate, channels=channels, dtype="float32"
+        )
+        return preferred_rate
+    except Exception:
+        return fallback_rate
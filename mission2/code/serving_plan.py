@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Multi-item orders and their execution plan.
+
+A customer can order several dishes in one go ("two tuna and a green tea").
+Recognition returns the dishes as `items` ([{"order": ..., "quantity": n}]);
+the order that goes through the robot queue is the item name for a single
+dish and otherwise the list of item names with repeats, which is what
+`execute_sushi_serving(orders)` takes.
+
+`build_plan()` turns that list into one plan for the arm: repeated dishes are
+grouped, so each policy is loaded (and each lerobot-record process started)
+once and run for N episodes, dishes whose policy is already loaded go first,
+and dishes listed in `serve_last` (the greentea cup) move to the end. `run_plan()` runs a plan on any serving backend with
+one shared model-cache check and reports per-step and plan timings;
+`plan_error()` tells whether the report served the whole plan.
+"""
+
+import time
+
+
+def normalize_items(raw_items, menu, max_quantity=5):
+    """
+    Clean recognized items: drop names that are not on `menu`, clamp each
+    quantity to 1..`max_quantity` and merge repeated names (first mention
+    keeps its place). Returns [{"order", "quantity"}].
+    """
+    quantities = {}
+    for raw in raw_items or []:
+        if isinstance(raw, str):
+            raw = {"order": raw}
+        if not isinstance(raw, dict) or raw.get("order") not in menu:
+            continue
+        try:
+            quantity = int(raw.get("quantity", 1))
+        except (TypeError, ValueError):
+            quantity = 1
+        quantities[raw["order"]] = quantities.get(raw["order"], 0) + max(quantity, 1)
+    return [
+        {"order": order, "quantity": min(quantity, max_quantity)}
+        for order, quantity in quantities.items()
+    ]
+
+
+def result_items(result):
+    """The recognized items of a recognize_order() result (single-item results have no "items")."""
+    return result.get("items") or [{"order": result["order"], "quantity": 1}]
+
+
+def items_to_order(items):
+    """The order to queue: the item name for one dish, otherwise the list of names with repeats."""
+    orders = [item["order"] for item in items for _ in range(item.get("quantity", 1))]
+    return orders[0] if len(orders) == 1 else orders
+
+
+def order_items(order):
+    """Item names of a queued order (a single name or a list)."""
+    return [order] if isinstance(order, str) else list(order)
+
+
+def describe_order(order):
+    """Short label, e.g. 'tuna' or '2 x tuna + greentea cup'."""
+    counts = {}
+    for item in order_items(order):
+        counts[item] = counts.get(item, 0) + 1
+    return " + ".join(item if n == 1 else f"{n} x {item}" for item, n in counts.items())
+
+
+def build_plan(orders, serve_last=(), warm=()):
+    """
+    Group `orders` (item names, repeats allowed) into [(item, episodes)]:
+    one step per dish in order of first mention, dishes in `warm` (policies
+    already loaded) first and `serve_last` dishes at the end.
+    """
+    counts = {}
+    for order in orders:
+        counts[order] = counts.get(order, 0) + 1
+    return sorted(counts.items(), key=lambda step: (step[0] in serve_last, step[0] not in warm))
+
+
+def resident_policies(backend):
+    """Policies `backend` has loaded right now (empty if it cannot tell, e.g. ModelInference)."""
+    resident = getattr(backend, "resident", None)
+    if resident is None:
+        return []
+    try:
+        return resident()
+    except (OSError, EOFError):
+        return []
+
+
+def run_plan(backend, plan, model_paths, step_kwargs=None):
+    """
+    Execute `plan` on `backend` (ModelInference, PolicyServerClient or
+    LocalPolicyBackend): one cache_models() call for every dish, then one
+    run_inference(num_episodes=N) call per step. `step_kwargs(order)` gives
+    the other run_inference() arguments (task, repo_id, episode_time_s, ...).
+
+    Returns {"plan", "setup_s", "steps": [{"order", "episodes", "elapsed_s", "ok"}],
+    "served", "total_s"}; a failed cache check also sets "error", and a
+    failed (or skipped) step has "ok": False and its own "error".
+    """
+    report = {"plan": list(plan), "setup_s": 0.0, "steps": [], "served": 0, "total_s": 0.0}
+    start = time.perf_counter()
+
+    # Cache models if not already cached (warm hits do not touch the network). In reverse
+    # plan order, so a backend that keeps few policies loaded is left with the first ones.
+    print("\n📦 Checking model cache...")
+    try:
+        backend.cache_models(model_names=[order for order, _ in reversed(plan)])
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        report["error"] = str(e)
+        return report
+    report["setup_s"] = time.perf_counter() - start
+
+    for order, episodes in plan:
+        if order not in model_paths:
+            print(f"⚠️  No model available for: {order}")
+            report["steps"].append(
+                {"order": order, "episodes": episodes, "ok": False, "error": "no model", "elapsed_s": 0.0}
+            )
+            continue
+
+        print(f"\n🍣 Preparing to serve: {order}" + (f" (x{episodes})" if episodes > 1 else ""))
+        print(f"   Model: {model_paths[order]}")
+
+        step = {"order": order, "episodes": episodes, "ok": False}
+        step_start = time.perf_counter()
+        try:
+            backend.run_inference(
+                model_name=order, num_episodes=episodes, **(step_kwargs(order) if step_kwargs else {})
+            )
+            print(f"✅ Successfully served: {order}")
+            step["ok"] = True
+            report["served"] += episodes
+        except Exception as e:
+            print(f"❌ Failed to serve {order}: {e}")
+            step["error"] = str(e)
+        step["elapsed_s"] = time.perf_counter() - step_start
+        report["steps"].append(step)
+
+    report["total_s"] = time.perf_counter() - start
+    if len(plan) > 1 or any(episodes > 1 for _, episodes in plan):
+        print(f"⏱  Plan: {report['served']} items in {len(plan)} steps, {report['total_s']:.1f}s "
+              f"(setup {report['setup_s']:.1f}s)")
+    return report
+
+
+def plan_error(report):
+    """
+    Why `report` (from run_plan()) did not serve the whole plan, or None if it did:
+    the cache check error, or "<dish>: <error>" for every failed step.
+    """
+    if report is None:
+        return None
+    if report.get("error"):
+        return report["error"]
+    failed = [f"{step['order']}: {step.get('error', 'failed')}" for step in report["steps"] if not step["ok"]]
+    return "; ".join(failed) or None
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Speculative policy warm-up.
+
+While the customer is still speaking (partial transcripts) or while the LLM
+is still interpreting the final transcript, the local matcher often already
+points to a menu item. `SpeculativeWarmer` starts the robot-side warm-up for
+that item right away: `backend.cache_models([item])` verifies / downloads
+the model with ModelInference, and preloads the policy with a resident
+policy backend. When the final intent is known the guess is resolved: a hit
+means the robot stage finds everything warm, a miss cancels the pending
+warm-up (work that already started cannot be interrupted and is counted as
+wasted).
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class OrderSpeculation:
+    """Speculation state of one order; created by `SpeculativeWarmer.begin()`."""
+
+    def __init__(self, warmer):
+        self.warmer = warmer
+        self.started_at = time.perf_counter()
+        self.guess = None
+        self.guessed_at = None
+        self.future = None
+        self.warm_started_at = None
+        self.warm_finished_at = None
+        self.guesses = 0
+        self.cancelled = 0
+        self.resolved = False
+        self._lock = threading.Lock()
+
+    def observe(self, text):
+        """Feed a partial (or final) transcript; may start or redirect the warm-up."""
+        if self.resolved or not text:
+            return None
+        match = self.warmer.matcher.match(text)
+        if match is None or match["score"] < self.warmer.min_score:
+            return None
+        item = match["order"]
+        if item not in self.warmer.model_paths:
+            return None
+        with self._lock:
+            if item == self.guess:
+                return item
+            if self.future is not None and self.future.cancel():
+                self.cancelled += 1
+            self.guess = item
+            self.guessed_at = time.perf_counter()
+            self.warm_started_at = None
+            self.warm_finished_at = None
+            self.guesses += 1
+            self.future = self.warmer.executor.submit(self._warm, item)
+        return item
+
+    def _warm(self, item):
+        with self._lock:
+            if item != self.guess:
+                return
+            self.warm_started_at = time.perf_counter()
+        try:
+            self.warmer.backend.cache_models(model_names=[item])
+        except Exception as e:
+            print(f"⚠️  Speculative warm-up of {item} failed: {e}")
+        finally:
+            with self._lock:
+                if item == self.guess:
+                    self.warm_finished_at = time.perf_counter()
+
+    def resolve(self, final_order):
+        """
+        Compare the guess with the recognized order and record the outcome.
+        Returns {"guess", "final", "hit", "lead_s", "warm_s", "saved_s"}.
+
+        `saved_s` is the warm-up time taken off the robot stage's critical path:
+        the whole warm-up if it finished before the order was recognized, or
+        the part already done if it is still running (0 for a miss).
+        """
+        now = time.perf_counter()
+        with self._lock:
+            self.resolved = True
+            hit = self.guess is not None and self.guess == final_order
+            if not hit and self.future is not None and self.future.cancel():
+                self.cancelled += 1
+            started, finished = self.warm_started_at, self.warm_finished_at
+            if not hit or started is None:
+                saved_s = 0.0
+            elif finished is not None and finished <= now:
+                saved_s = finished - started
+            else:
+                saved_s = now - started
+            outcome = {
+                "guess": self.guess,
+                "final": final_order,
+                "hit": hit,
+                "guesses": self.guesses,
+                "lead_s": (now - self.guessed_at) if self.guessed_at is not None else 0.0,
+                "warm_s": (finished - started) if started is not None and finished is not None else None,
+                "saved_s": saved_s,
+                "wasted": self.guess is not None and not hit and started is not None,
+            }
+        self.warmer.record(outcome, self.cancelled)
+        return outcome
+
+
+class SpeculativeWarmer:
+    """
+    Shared warm-up worker plus hit-rate / latency-saved statistics.
+
+    - `backend`: ModelInference, PolicyServerClient or LocalPolicyBackend
+      (anything with `cache_models(model_names=[...])`)
+    - `matcher`: intent_matcher.LocalIntentMatcher
+    - `min_score`: matcher score needed before a guess triggers a warm-up
+    """
+
+    def __init__(self, backend, matcher, model_paths, min_score=0.8, max_workers=1):
+        self.backend = backend
+        self.matcher = matcher
+        self.model_paths = model_paths
+        self.min_score = min_score
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix="speculative-warmup")
+        self._lock = threading.Lock()
+        self.orders = 0
+        self.speculated = 0
+        self.hits = 0
+        self.wasted = 0
+        self.cancelled = 0
+        self.saved_s = []
+
+    def begin(self):
+        """Start tracking one order."""
+        return OrderSpeculation(self)
+
+    def record(self, outcome, cancelled):
+        with self._lock:
+            self.orders += 1
+            self.cancelled += cancelled
+            if outcome["guess"] is not None:
+                self.speculated += 1
+            if outcome["hit"]:
+                self.hits += 1
+            if outcome["wasted"]:
+                self.wasted += 1
+            self.saved_s.append(outcome["saved_s"])
+
+    def stats(self):
+        with self._lock:
+            return {
+                "orders": self.orders,
+                "speculated": self.speculated,
+                "hits": self.hits,
+                "hit_rate": (self.hits / self.speculated) if self.speculated else 0.0,
+                "coverage": (self.hits / self.orders) if self.orders else 0.0,
+                "wasted_warmups": self.wasted,
+                "cancelled": self.cancelled,
+                "mean_saved_s": (sum(self.saved_s) / len(self.saved_s)) if self.saved_s else 0.0,
+                "total_saved_s": sum(self.saved_s),
+            }
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
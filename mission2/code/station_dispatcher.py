@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Multi-arm order dispatcher.
+
+A counter with several SO-101 stations serves orders on all arms at once.
+Each `Station` has its own serving backend (robot port, cameras, policy
+cache) and remembers which dishes' policies it has warm. `StationDispatcher`
+routes every recognized order to the least-loaded station that can serve the
+dish, preferring a station that already has the dish's policy warm, and runs
+one robot worker per station.
+
+`StationDispatcher` has the same producer interface as OrderPipeline
+(`submit`, `has_capacity`, `wait_for_capacity`, `depth`, `stats`, ...), so
+the UI, the CLI loop and the order API can use either.
+"""
+
+import itertools
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+from serving_plan import order_items
+
+
+class Station:
+    """
+    One serving arm.
+
+    - `backend`: ModelInference, PolicyServerClient or LocalPolicyBackend for this arm
+    - `menu`: dishes this station can serve (None = all)
+    - `warm_slots`: how many policies stay warm (e.g. the policy server's max_policies)
+    - `warm`: dishes whose policies are already warm at startup
+    """
+
+    def __init__(self, name, backend, menu=None, warm_slots=2, warm=()):
+        self.name = name
+        self.backend = backend
+        self.menu = set(menu) if menu is not None else None
+        self.warm_slots = warm_slots
+        self.warm = OrderedDict((item, None) for item in warm)
+        self.queue = queue.Queue()
+        self.pending = 0       # orders routed here and not finished yet
+        self.current = None    # order being served
+        self.busy_s = 0.0
+        self.served = 0
+        self.failed = 0
+        self.warm_hits = 0
+        self.cold_starts = 0
+        self.thread = None
+
+    def can_serve(self, item):
+        return self.menu is None or item in self.menu
+
+    def is_warm(self, item):
+        return item in self.warm
+
+    def touch(self, item):
+        """Mark `item`'s policy as most recently used (evicting the LRU one)."""
+        self.warm[item] = None
+        self.warm.move_to_end(item)
+        while len(self.warm) > self.warm_slots:
+            self.warm.popitem(last=False)
+
+
+class StationDispatcher:
+    """
+    Route recognized orders to stations and serve them concurrently.
+
+    `serve(order, status_callback, backend)` executes one order on one arm
+    (e.g. sushi_voice_master.serve_order). Routing picks the eligible station
+    with the lowest `pending + cold_penalty * <dishes of the order not warm>`:
+    with the default penalty a warm station wins ties, and a cold one wins
+    once the warm one has a whole order more to do. A multi-item order goes to
+    one station as a whole. `max_queue` bounds the orders waiting for an
+    arm over all stations; `on_event` gets the same events as OrderPipeline,
+    with a `station` field, and a failed serve also reaches the order's
+    status_callback as "serve_failed".
+    """
+
+    def __init__(self, stations, serve, max_queue=3, on_event=None, cold_penalty=0.5):
+        if not stations:
+            raise ValueError("At least one station is needed")
+        self.stations = list(stations)
+        self.serve = serve
+        self.max_queue = max_queue
+        self.on_event = on_event
+        self.cold_penalty = cold_penalty
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._capacity = threading.Condition(self._lock)
+        self._waiting = 0
+        self.started_at = None
+        self.wait_s = []
+        self.serve_s = []
+
+    # ----- Events -----
+    def _emit(self, phase, **info):
+        info.setdefault("depth", self.depth)
+        if self.on_event is not None:
+            try:
+                self.on_event(phase, **info)
+            except Exception as e:
+                print(f"[Dispatcher event error @ {phase}]: {e}")
+
+    @staticmethod
+    def _notify(status_callback, phase, **info):
+        """Send `phase` to an order's own status_callback (see OrderPipeline._notify)."""
+        if status_callback is not None:
+            try:
+                status_callback(phase, **info)
+            except Exception as e:
+                print(f"[Status callback error @ {phase}]: {e}")
+
+    # ----- Producer side (intake) -----
+    @property
+    def depth(self):
+        """Orders waiting for an arm (not counting the ones being served)."""
+        return self._waiting
+
+    @property
+    def busy(self):
+        return any(station.current is not None for station in self.stations)
+
+    def has_capacity(self):
+        return self._waiting < self.max_queue
+
+    def wait_for_capacity(self, timeout=None):
+        """Block until another order can be queued. Returns False on timeout."""
+        with self._capacity:
+            return self._capacity.wait_for(self.has_capacity, timeout=timeout)
+
+    def route(self, order):
+        """Pick the station for `order` (call with the lock held)."""
+        dishes = set(order_items(order))
+        candidates = [s for s in self.stations if all(s.can_serve(d) for d in dishes)]
+        if not candidates:
+            raise ValueError(f"No station can serve: {order}")
+        return min(
+            candidates,
+            key=lambda s: s.pending + self.cold_penalty * sum(not s.is_warm(d) for d in dishes),
+        )
+
+    def submit(self, order, block=True, timeout=None, status_callback=None):
+        """Route and queue a recognized order; returns its id. Raises queue.Full if non-blocking and full."""
+        with self._capacity:
+            if not self._capacity.wait_for(self.has_capacity, timeout=timeout if block else 0):
+                raise queue.Full
+            station = self.route(order)
+            warm = all(station.is_warm(dish) for dish in order_items(order))
+            if warm:
+                station.warm_hits += 1
+            else:
+                station.cold_starts += 1
+            # The policies will be loaded there, so later orders of these dishes prefer this station
+            for dish in order_items(order):
+                station.touch(dish)
+            station.pending += 1
+            self._waiting += 1
+            order_id = next(self._ids)
+        station.queue.put((order_id, order, time.perf_counter(), status_callback))
+        self._emit("queued", order=order, order_id=order_id, station=station.name, warm=warm)
+        return order_id
+
+    # ----- Consumer side (one worker per arm) -----
+    def start(self):
+        if self.started_at is None:
+            self.started_at = time.perf_counter()
+            for station in self.stations:
+                station.thread = threading.Thread(
+                    target=self._run, args=(station,), name=f"robot-{station.name}", daemon=True
+                )
+                station.thread.start()
+        return self
+
+    def _run(self, station):
+        while True:
+            item = station.queue.get()
+            if item is None:
+                return
+            order_id, order, queued_at, status_callback = item
+            with self._capacity:
+                self._waiting -= 1
+                self._capacity.notify_all()
+
+            station.current = order
+            self.wait_s.append(time.perf_counter() - queued_at)
+            self._emit("serving", order=order, order_id=order_id, station=station.name)
+            start = time.perf_counter()
+            try:
+                self.serve(order, status_callback, station.backend)
+                station.served += 1
+                self._emit("served", order=order, order_id=order_id, station=station.name)
+            except Exception as e:
+                station.failed += 1
+                self._notify(status_callback, "serve_failed", order=order, station=station.name,
+                             error=str(e))
+                self._emit("serve_failed", order=order, order_id=order_id, station=station.name,
+                           error=str(e))
+            finally:
+                elapsed = time.perf_counter() - start
+                self.serve_s.append(elapsed)
+                with self._lock:
+                    station.busy_s += elapsed
+                    station.pending -= 1
+                    station.current = None
+                station.queue.task_done()
+
+    def join(self):
+        """Wait until every queued order has been served."""
+        for station in self.stations:
+            station.queue.join()
+
+    def stop(self, drain=True):
+        """Stop every arm's worker, by default after serving what is already queued."""
+        if self.started_at is None:
+            return
+        for station in self.stations:
+            if not drain:
+                while True:
+                    try:
+                        station.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    with self._lock:
+                        self._waiting -= 1
+                        station.pending -= 1
+                    station.queue.task_done()
+            station.queue.put(None)
+        for station in self.stations:
+            station.thread.join()
+        self.started_at = None
+
+    def stats(self):
+        elapsed = (time.perf_counter() - self.started_at) if self.started_at else 0.0
+        served = sum(s.served for s in self.stations)
+        return {
+            "served": served,
+            "failed": sum(s.failed for s in self.stations),
+            "depth": self.depth,
+            "orders_per_hour": (served / elapsed * 3600) if elapsed else 0.0,
+            "mean_wait_s": (sum(self.wait_s) / len(self.wait_s)) if self.wait_s else 0.0,
+            "mean_serve_s": (sum(self.serve_s) / len(self.serve_s)) if self.serve_s else 0.0,
+            "stations": {
+                s.name: {
+                    "served": s.served,
+                    "failed": s.failed,
+                    "pending": s.pending,
+                    "utilization": (s.busy_s / elapsed) if elapsed else 0.0,
+                    "warm_hits": s.warm_hits,
+                    "cold_starts": s.cold_starts,
+                    "warm": list(s.warm),
+                }
+                for s in self.stations
+            },
+        }
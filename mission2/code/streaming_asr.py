@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Incremental transcription while the customer is still speaking.
+
+Audio blocks from the recorder are fed in as they arrive. A background thread
+repeatedly decodes an overlapping window over the newest audio and reports
+partial transcripts. Segments that have slid far enough out of the window are
+committed and not decoded again. When the recording stops, the final text is
+taken from the last partial if that decode already covered all speech,
+otherwise one last decode of the remaining window is run.
+"""
+
+import threading
+import time
+
+import numpy as np
+
+
+class IncrementalTranscriber:
+    """
+    Decode overlapping windows of a growing audio buffer on a worker thread.
+
+    `engine` is an ASR engine (see asr_engine.ASREngine). If it has
+    `transcribe_segments()`, segment timestamps are used to commit text from
+    older windows; otherwise each decode covers the whole window.
+    `resampler` (see resampler.PolyphaseResampler) converts each fed block to
+    `sample_rate` as it arrives; leave it as None when the input is already
+    at `sample_rate`.
+    """
+
+    def __init__(self, engine, sample_rate=16000, language="en", step_seconds=1.0,
+                 window_seconds=10.0, resampler=None, capacity_seconds=10.0,
+                 on_partial=None):
+        self.engine = engine
+        self.sample_rate = sample_rate
+        self.language = language
+        self.step_seconds = step_seconds
+        self.window_seconds = window_seconds
+        self.resampler = resampler
+        self.on_partial = on_partial
+
+        # Preallocated 16 kHz buffer (grown by doubling if an utterance is longer)
+        self._audio = np.zeros(int(capacity_seconds * sample_rate), dtype=np.float32)
+        self._filled = 0
+        self._speech_end_s = 0.0
+        self._committed = []          # committed segment texts
+        self._committed_until = 0.0   # seconds
+        self._window_segments = []    # (start_s, end_s, text) of the last decode, absolute
+        self._decoded_until = 0.0     # seconds of audio covered by the last decode
+        self._last_text = ""
+        self.decode_count = 0
+        self.decode_time_s = 0.0
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._finished = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    # ----- Feeding -----
+    def feed(self, chunk, is_speech=True):
+        """Add one block of captured audio (recorder `on_chunk` signature)."""
+        if self.resampler is not None:
+            chunk = self.resampler.process(chunk)
+        with self._lock:
+            self._append(chunk)
+            if is_speech:
+                self._speech_end_s = self._filled / self.sample_rate
+        self._wakeup.set()
+
+    def _append(self, samples):
+        end = self._filled + len(samples)
+        if end > len(self._audio):
+            grown = np.zeros(max(end, 2 * len(self._audio)), dtype=np.float32)
+            grown[:self._filled] = self._audio[:self._filled]
+            # Views handed out earlier keep pointing at the old array, which stays valid.
+            self._audio = grown
+        self._audio[self._filled:end] = samples
+        self._filled = end
+
+    def _take_audio(self):
+        """Return a view of the 16 kHz audio received so far."""
+        with self._lock:
+            return self._audio[:self._filled]
+
+    # ----- Decoding -----
+    def _decode(self):
+        audio = self._take_audio()
+        total_s = len(audio) / self.sample_rate
+        if total_s == 0:
+            return
+
+        window_start = max(self._committed_until, total_s - self.window_seconds)
+        window = audio[int(window_start * self.sample_rate):]
+
+        start = time.perf_counter()
+        if hasattr(self.engine, "transcribe_segments"):
+            segments = self.engine.transcribe_segments(window, language=self.language)
+            segments = [(window_start + s, window_start + e, t) for s, e, t in segments]
+        else:
+            text = self.engine.transcribe(window, language=self.language)
+            segments = [(window_start, total_s, text)] if text else []
+        self.decode_time_s += time.perf_counter() - start
+        self.decode_count += 1
+
+        # Commit segments that will soon slide out of the window.
+        horizon = total_s - self.window_seconds / 2
+        pending = []
+        for seg in segments:
+            if seg[1] <= horizon and not pending:
+                self._committed.append(seg[2])
+                self._committed_until = seg[1]
+            else:
+                pending.append(seg)
+
+        self._window_segments = pending
+        self._decoded_until = total_s
+        text = "".join(self._committed + [t for _, _, t in pending]).strip()
+        if text and text != self._last_text and self.on_partial is not None:
+            try:
+                self.on_partial(text)
+            except Exception as e:
+                print(f"[Partial transcript callback error]: {e}")
+        self._last_text = text
+
+    def _fed_seconds(self):
+        with self._lock:
+            return self._filled / self.sample_rate
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            if self._finished:
+                return
+            if self._fed_seconds() - self._decoded_until >= self.step_seconds:
+                self._decode()
+
+    def stop(self):
+        """Stop the worker (an in-progress decode completes); finish() decodes what is left."""
+        if self._finished:
+            return
+        self._finished = True
+        self._wakeup.set()
+        self._thread.join()
+        with self._lock:
+            if self.resampler is not None:
+                self._append(self.resampler.flush())
+
+    def final_decode_estimate(self):
+        """Seconds finish() is expected to spend decoding (0.0 if the partial already covers all speech)."""
+        self.stop()
+        with self._lock:
+            speech_end_s = self._speech_end_s
+        if self._covers_speech(speech_end_s):
+            return 0.0
+        return self.decode_time_s / self.decode_count if self.decode_count else None
+
+    @property
+    def partial_text(self):
+        """Latest partial transcript ("" before the first decode)."""
+        return self._last_text
+
+    def finish(self, final_decode=True):
+        """
+        Stop the worker and return the final transcript. With `final_decode=False`
+        the last partial is returned as is, even if it missed the end of the speech.
+        """
+        self.stop()
+        with self._lock:
+            speech_end_s = self._speech_end_s
+        if self._covers_speech(speech_end_s) or not final_decode:
+            return self._last_text
+        self._decode()
+        return self._last_text
+
+    def _covers_speech(self, speech_end_s):
+        """True when the last decode already included every speech block."""
+        return self.decode_count > 0 and self._decoded_until >= speech_end_s
@@ -7,13 +7,36 @@ Always returns one of the predefined menu items.
 
 import numpy as np
 import sounddevice as sd
-from faster_whisper import WhisperModel
 from scipy import signal
-import google.generativeai as genai
+import atexit
 import json
 import os
 import random
+import sys
+import threading
+import time
+from asr_engine import ASREngine, load_asr_profile
+from asr_service import ASRServiceClient
+from audio_capture import AlwaysOnInput, StreamingRecorder
+from llm_client import GeminiBackend, LLMClient
+from intent_matcher import LocalIntentMatcher, RecognitionStats, MENU_ALIASES
+from order_cache import OrderCache, make_namespace
+from resampler import PolyphaseResampler, choose_capture_rate
+from streaming_asr import IncrementalTranscriber
+from demand_predictor import DemandPredictor, DemandPrewarmer
 from model_inference import ModelInference
+from order_deadline import DecodeEstimator, DeadlineStats, OrderDeadline
+from order_history import OrderHistory
+from order_pipeline import OrderPipeline
+from station_dispatcher import Station, StationDispatcher
+from policy_server import PolicyServerClient
+from serving_plan import (
+    build_plan, describe_order, items_to_order, normalize_items, order_items, resident_policies, result_items,
+    plan_error, run_plan,
+)
+from speculative import SpeculativeWarmer
+from tracing import PhaseTracer
+from wake_word import HandsFreeListener, KeywordSpotter
 
 # Menu definition (sushi + drink)
 SUSHI_MENU = ["egg", "tuna", "cucumber roll", "tempura (fried shrimp)", "greentea cup"]
@@ -30,129 +53,590 @@ SUSHI_MODEL_PATHS = {
     "greentea cup": f"{HF_USERNAME}/ServeTeacup",  # change to "HankLL/ServeTeacup" if fixed
 }
 
+# Robot configuration
+ROBOT_PORT = "/dev/ttyACM2"
+ROBOT_ID = "my_awsome_follower_arm"
+ROBOT_CAMERAS = (
+    "{top: {type: opencv, index_or_path: 8, width: 640, height: 480, fps: 30}, "
+    "wrist: {type: opencv, index_or_path: 10, width: 640, height: 480, fps: 30}}"
+)
+# Serving stations (one SO-101 arm each). With more than one, orders are routed by a
+# StationDispatcher; override with SUSHI_STATIONS='[{"name": "arm-2", "robot_port": ...}, ...]'.
+# Optional keys: robot_id, cameras, menu (dishes the arm can serve), policy_server_port, warm_slots.
+ROBOT_STATIONS = json.loads(os.environ["SUSHI_STATIONS"]) if os.environ.get("SUSHI_STATIONS") else [
+    {"name": "arm-1", "robot_port": ROBOT_PORT, "robot_id": ROBOT_ID, "cameras": ROBOT_CAMERAS},
+]
+MODEL_CACHE_DIR = "./model_cache"
+MODEL_CACHE_OFFLINE = os.environ.get("MODEL_CACHE_OFFLINE", "0") == "1"  # fail fast if not cached
+PREFETCH_MODELS_AT_STARTUP = True  # download / verify every menu model when the UI or CLI starts
+# Eval episodes kept per serve: "full" (every one, the default), or opt in to "rollout" (none),
+# "sampled" (every RECORD_EVERY_N-th) or "failures" (see episode_recorder.py); sampled / failed
+# runs share RECORD_QUOTA_MB of disk. With the subprocess backend, lerobot-record still writes
+# every run (the lighter modes delete it afterwards), so only the policy server saves the I/O.
+RECORDING_MODE = os.environ.get("SUSHI_RECORDING", "full")
+RECORD_EVERY_N = 10
+RECORD_QUOTA_MB = 2000
+# "subprocess": one lerobot-record run per dish (ModelInference)
+# "policy_server": resident robot / cameras / policies in policy_server.py (start it first)
+SERVING_BACKEND = os.environ.get("SERVING_BACKEND", "subprocess")
+EPISODE_TIME_S = 20  # Ceiling per dish; the policy server ends episodes early once the arm is back at rest
+SERVE_LAST = ("greentea cup",)  # Served after the other dishes of a multi-item order
+SERVE_RESET_TIME_S = 3  # Pause between episodes of the same dish in one lerobot-record run
+MAX_ITEM_QUANTITY = 5   # Upper bound for one dish in one order
+PIPELINE_MAX_QUEUE = 3  # Recognized orders that may wait for the robot before intake pauses
+SPECULATIVE_WARMUP = os.environ.get("SUSHI_SPECULATIVE_WARMUP", "1") == "1"  # warm the guessed policy early
+SPECULATION_MIN_SCORE = 0.8  # Local-matcher score a partial transcript needs to trigger a warm-up
+
 # Gemini API configuration (retrieved from environment variable)
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY", "")
 
+GEMINI_MODEL_NAME = "gemini-2.5-flash"  # or 'gemini-2.0-flash'
+LLM_TIMEOUT_S = 6.0         # Give up on Gemini (and use the fallback) after this many seconds
+LLM_HEDGE_PERCENTILE = 95   # Send a hedged second request after this latency percentile (None = off)
+
+# Prompt sent to Gemini ({menu} and {text} are filled in per order)
+ORDER_PROMPT_TEMPLATE = """
+The following is a transcribed text of a customer's spoken order at a sushi restaurant.
+Please recognize the ordered item from this text and return it in JSON format.
+
+Available menu:
+{menu}
+
+Customer's statement:
+"{text}"
+
+Instructions:
+1. Identify every item that the customer ordered from the menu, with its quantity (1 if no number is given).
+2. If the same item is mentioned more than once, add up its quantities.
+3. If the text is unclear, infer the menu item with similar pronunciation.
+4. You MUST return only the following JSON object (no extra explanation):
+
+{{
+    "items": [
+        {{"order": "item name", "quantity": 1}}
+    ],
+    "confidence": "high" or "medium" or "low"
+}}
+"""
+
+# Cache of Gemini interpretations (set ORDER_CACHE_PATH to persist it across restarts)
+ORDER_CACHE_SIZE = 512
+ORDER_CACHE_TTL_S = 7 * 24 * 3600
+ORDER_CACHE_PATH = os.environ.get("ORDER_CACHE_PATH") or None
+ORDER_CACHE = OrderCache(
+    namespace=make_namespace(SUSHI_MENU, ORDER_PROMPT_TEMPLATE, GEMINI_MODEL_NAME),
+    max_entries=ORDER_CACHE_SIZE,
+    ttl_s=ORDER_CACHE_TTL_S,
+    path=ORDER_CACHE_PATH,
+    valid_orders=SUSHI_MENU,
+)
+
+# Local fast-path matcher: Gemini is only called below this score (0.0 - 1.0)
+LOCAL_MATCH_THRESHOLD = float(os.environ.get("LOCAL_MATCH_THRESHOLD", "0.85"))
+LOCAL_MATCHER = LocalIntentMatcher(SUSHI_MENU, MENU_ALIASES)  # index built once at import
+RECOGNITION_STATS = RecognitionStats()
+
 # Whisper / audio configuration
 MODEL_SIZE = "small"      # "tiny", "base", "small", "medium", "large-v2", "large-v3"
 DEVICE = "cpu"            # Use CPU for ROCm environment (faster-whisper only supports CUDA)
 COMPUTE_TYPE = "int8"     # "int8" recommended for CPU
 LANGUAGE = "en"           # "ja" (Japanese), "en" (English)
-RECORD_SECONDS = 7        # Recording duration (seconds)
+ASR_BEAM_SIZE = 5         # 1 = greedy decoding
+ASR_CPU_THREADS = 0       # 0 = faster-whisper default
+ASR_NUM_WORKERS = 1
+# "local" = Whisper in this process, "service" = shared asr_service.py for several kiosks
+ASR_BACKEND = os.environ.get("SUSHI_ASR_BACKEND", "local")
+KIOSK_ID = os.environ.get("SUSHI_KIOSK_ID", "kiosk-1")
+# Written by asr_autotune.py; overrides the Whisper settings above when present
+ASR_PROFILE_PATH = os.environ.get("SUSHI_ASR_PROFILE", "./asr_profile.json")
+RECORD_SECONDS = 7        # Recording duration (seconds); maximum duration in streaming mode
+CAPTURE_MODE = "streaming"  # "streaming" (stop on trailing silence) or "fixed" (always RECORD_SECONDS)
+END_SILENCE_SECONDS = 0.8   # Trailing silence that ends an utterance in streaming mode
+STREAMING_TRANSCRIPTION = True  # Decode while the customer is still speaking (streaming mode only)
+PARTIAL_STEP_SECONDS = 1.0      # Minimum new audio between partial decodes
+PARTIAL_WINDOW_SECONDS = 10.0   # Length of the overlapping decode window
 
 # Microphone settings
 MIC_DEVICE = 5            # USB Microphone (USB PnP Audio Device)
 MIC_SAMPLE_RATE = 48000   # Microphone sample rate
+CAPTURE_16K_IF_SUPPORTED = True  # Open the mic directly at 16 kHz when the device allows it
+ALWAYS_ON_MIC = True      # Keep the mic open between orders (no stream-open latency per order)
+PREROLL_SECONDS = 0.5     # Audio from before the trigger included in each recording (ALWAYS_ON_MIC only)
+MIC_BUFFER_SECONDS = 30   # Ring buffer length of the always-on mic
+HANDS_FREE = os.environ.get("SUSHI_HANDS_FREE", "0") == "1"  # Listen continuously instead of a button press
+WAKE_MODE = os.environ.get("SUSHI_WAKE_MODE", "phrase")  # "phrase" (wake phrase) or "utterance" (any speech)
+WAKE_PHRASE_PATH = os.environ.get("SUSHI_WAKE_PHRASE", "./wake_phrase.npz")  # from `wake_word.py enroll`
 MIC_CHANNELS = 1          # Mono
 WHISPER_SAMPLE_RATE = 16000  # Sample rate required by Whisper
 
+# Latency tracing (per-phase p50/p95/p99); when disabled nothing is wrapped
+TRACING_ENABLED = os.environ.get("SUSHI_TRACING", "0") == "1"
+TRACE_LOG_PATH = os.environ.get("SUSHI_TRACE_LOG", "./order_traces.jsonl")
+TRACE_METRICS_PATH = os.environ.get("SUSHI_TRACE_METRICS", "./order_metrics.prom")
+
+# Per-order latency budget from intake start to a recognized order (see order_deadline.py)
+ORDER_DEADLINE_S = float(os.environ.get("SUSHI_ORDER_DEADLINE_S", "10"))  # 0 = no deadline
+DEADLINE_RESERVES = {"asr": 1.5, "intent": 1.0}  # Seconds kept free for the later stages
+MIN_CAPTURE_SECONDS = 2.0   # A short deadline never cuts the recording below this
+LLM_MIN_BUDGET_S = 0.5      # With less time left the LLM is skipped for the local matcher
+FAST_ASR_MODEL_SIZE = os.environ.get("SUSHI_FAST_ASR_MODEL", "")  # e.g. "base", kept loaded for slow decodes
+DEADLINE_STATS = DeadlineStats()
+ASR_DECODE_ESTIMATOR = DecodeEstimator()
+
+# Order history (SQLite, batched writes) and demand-driven policy prewarming
+ORDER_HISTORY_PATH = os.environ.get("SUSHI_ORDER_HISTORY", "./order_history.sqlite3")  # "" = no history
+DEMAND_PREWARM = os.environ.get("SUSHI_DEMAND_PREWARM", "1") == "1"  # keep the likely next dishes loaded
+PREWARM_BUDGET = 2            # Policies kept warm (the policy server keeps --max-policies 2 resident)
+DEMAND_HISTORY_DAYS = 14      # Order history the predictor learns from at startup
+DEMAND_HALF_LIFE_S = 1800     # Half-life of the recent-popularity counts
+
+# The tracer also feeds the order history, so it runs when either is on (files only with tracing)
+TRACER = PhaseTracer(
+    TRACE_LOG_PATH if TRACING_ENABLED else None,
+    TRACE_METRICS_PATH if TRACING_ENABLED else None,
+    on_finish=lambda record: record_order_history(record),
+) if TRACING_ENABLED or ORDER_HISTORY_PATH else None
+
+
+# Shared ASR engine (loaded once and reused by every order)
+_asr_engine = None
+_asr_engine_lock = threading.Lock()
+
+
+def asr_settings():
+    """Whisper engine settings: the autotuned profile if one exists, else the constants above."""
+    settings = {
+        "model_size": MODEL_SIZE,
+        "device": DEVICE,
+        "compute_type": COMPUTE_TYPE,
+        "beam_size": ASR_BEAM_SIZE,
+        "cpu_threads": ASR_CPU_THREADS,
+        "num_workers": ASR_NUM_WORKERS,
+    }
+    profile = load_asr_profile(ASR_PROFILE_PATH)
+    if profile:
+        print(f"Using ASR profile {ASR_PROFILE_PATH}: {profile}")
+        settings.update(profile)
+    return settings
+
+
+def get_asr_engine(warm_up=False):
+    """
+    Return the process-wide ASR engine, loading it on first use.
+    The UI / CLI call this at startup so that orders never wait for the model load.
+    """
+    global _asr_engine
+    with _asr_engine_lock:
+        if _asr_engine is None and ASR_BACKEND == "service":
+            _asr_engine = ASRServiceClient(kiosk=KIOSK_ID)
+        elif _asr_engine is None:
+            _asr_engine = ASREngine(sample_rate=WHISPER_SAMPLE_RATE, **asr_settings())
+    _asr_engine.load()
+    if warm_up and _asr_engine.warmup_time_s is None:
+        _asr_engine.warm_up(language=LANGUAGE)
+    return _asr_engine
+
+
+# Fallback ASR engine for orders short of time (only with FAST_ASR_MODEL_SIZE)
+_fast_asr_engine = None
+
+
+def get_fast_asr_engine(load=False):
+    """
+    Return the smaller, greedy Whisper engine used when the main one would miss
+    the order deadline, or None if it is not configured (or not loaded yet;
+    `load=True` loads it, as the UI / CLI do at startup).
+    """
+    global _fast_asr_engine
+    if not FAST_ASR_MODEL_SIZE or ASR_BACKEND == "service":
+        return None
+    with _asr_engine_lock:
+        if _fast_asr_engine is None:
+            settings = dict(asr_settings(), model_size=FAST_ASR_MODEL_SIZE, beam_size=1)
+            _fast_asr_engine = ASREngine(sample_rate=WHISPER_SAMPLE_RATE, **settings)
+    if load:
+        _fast_asr_engine.load()
+    return _fast_asr_engine if _fast_asr_engine.is_loaded else None
+
+
+def new_order_deadline():
+    """Deadline for one order (unlimited when ORDER_DEADLINE_S is 0)."""
+    return OrderDeadline(ORDER_DEADLINE_S or None, reserves=DEADLINE_RESERVES)
+
+
+# Shared LLM client (created once, reused by every order)
+_llm_client = None
+_llm_client_lock = threading.Lock()
+
+
+def get_llm_client(backend=None):
+    """
+    Return the process-wide order interpretation client.
+    `backend` (e.g. llm_client.StubBackend) replaces Gemini on first creation.
+    """
+    global _llm_client
+    with _llm_client_lock:
+        if _llm_client is None:
+            if backend is None:
+                backend = GeminiBackend(GEMINI_API_KEY, GEMINI_MODEL_NAME)
+            _llm_client = LLMClient(
+                backend, timeout_s=LLM_TIMEOUT_S, hedge_percentile=LLM_HEDGE_PERCENTILE
+            )
+    return _llm_client
+
 
 def resample_audio(audio, orig_sr, target_sr):
-    """Resample audio data."""
+    """
+    Resample audio data.
+    Integer decimation (e.g. 48kHz → 16kHz) uses the polyphase FIR resampler;
+    other ratios fall back to FFT-based scipy.signal.resample.
+    """
     if orig_sr == target_sr:
         return audio
+    if orig_sr % target_sr == 0:
+        return PolyphaseResampler(orig_sr, target_sr, max_block=len(audio)).resample(audio)
     num_samples = int(len(audio) * target_sr / orig_sr)
     return signal.resample(audio, num_samples)
 
 
-def execute_sushi_serving(orders):
+def create_resampler(orig_sr, target_sr=WHISPER_SAMPLE_RATE):
+    """Streaming resampler for captured blocks, or None if no resampling is needed."""
+    if orig_sr == target_sr:
+        return None
+    return PolyphaseResampler(orig_sr, target_sr)
+
+
+def choose_mic_rate():
+    if CAPTURE_16K_IF_SUPPORTED:
+        return choose_capture_rate(
+            MIC_DEVICE, WHISPER_SAMPLE_RATE, MIC_SAMPLE_RATE, channels=MIC_CHANNELS
+        )
+    return MIC_SAMPLE_RATE
+
+
+# Shared always-on microphone (opened once, on first use or at startup)
+_mic_input = None
+_mic_input_lock = threading.Lock()
+
+
+def get_mic_input():
+    """Return the process-wide AlwaysOnInput, opening the microphone on first use."""
+    global _mic_input
+    with _mic_input_lock:
+        if _mic_input is None:
+            _mic_input = AlwaysOnInput(
+                sample_rate=choose_mic_rate(),
+                channels=MIC_CHANNELS,
+                device=MIC_DEVICE,
+                buffer_seconds=max(MIC_BUFFER_SECONDS, RECORD_SECONDS + PREROLL_SECONDS + 1),
+            ).start()
+    return _mic_input
+
+
+def create_recorder(stream_factory=None, start_position=None):
+    """
+    Create a streaming recorder using the microphone settings above.
+    With ALWAYS_ON_MIC (and no `stream_factory`) it reads from the shared
+    always-on input, including PREROLL_SECONDS before the recording starts
+    (or from `start_position`, the "start" of a hands-free wake).
+    """
+    if ALWAYS_ON_MIC and stream_factory is None:
+        return StreamingRecorder(
+            channels=MIC_CHANNELS,
+            max_seconds=RECORD_SECONDS,
+            silence_seconds=END_SILENCE_SECONDS,
+            source=get_mic_input(),
+            preroll_seconds=PREROLL_SECONDS,
+            start_position=start_position,
+        )
+    sample_rate = MIC_SAMPLE_RATE
+    if stream_factory is None:
+        sample_rate = choose_mic_rate()
+    return StreamingRecorder(
+        sample_rate=sample_rate,
+        channels=MIC_CHANNELS,
+        device=MIC_DEVICE,
+        max_seconds=RECORD_SECONDS,
+        silence_seconds=END_SILENCE_SECONDS,
+        stream_factory=stream_factory,
+    )
+
+
+def record_audio(recorder=None, on_chunk=None, max_seconds=None):
+    """
+    Record one order from the microphone.
+    Returns (mono float32 audio, sample rate, reason the recording stopped).
+    In "fixed" mode (and without an explicit recorder) this is the original blocking sd.rec().
+    `on_chunk(chunk, is_speech)` receives audio blocks as they arrive in streaming mode.
+    `max_seconds` shortens the recording (default RECORD_SECONDS).
+    """
+    max_seconds = RECORD_SECONDS if max_seconds is None else min(max_seconds, RECORD_SECONDS)
+    if recorder is None and CAPTURE_MODE == "fixed":
+        audio = sd.rec(
+            int(max_seconds * MIC_SAMPLE_RATE),
+            samplerate=MIC_SAMPLE_RATE,
+            channels=MIC_CHANNELS,
+            dtype=np.float32,
+            device=MIC_DEVICE,
+        )
+        sd.wait()
+        return audio.flatten(), MIC_SAMPLE_RATE, "fixed_duration"
+
+    recorder.max_seconds = min(recorder.max_seconds, max_seconds)
+    audio = recorder.record(on_chunk=on_chunk)
+    return audio, recorder.sample_rate, recorder.stopped_by
+
+
+def create_listener():
+    """
+    Create a hands-free listener on the always-on mic. Without enrolled wake
+    phrase templates (WAKE_PHRASE_PATH) it falls back to "utterance" mode.
+    """
+    mode = WAKE_MODE
+    spotter = None
+    if mode == "phrase":
+        if os.path.exists(WAKE_PHRASE_PATH):
+            spotter = KeywordSpotter.load(WAKE_PHRASE_PATH)
+        else:
+            print(f"⚠️  No wake phrase templates at {WAKE_PHRASE_PATH}; waking on any speech.")
+            mode = "utterance"
+    return HandsFreeListener(get_mic_input(), spotter=spotter, mode=mode)
+
+
+def create_serving_backend(kind=None, station=None):
+    """
+    Create the robot serving backend selected by SERVING_BACKEND.
+    Both backends provide cache_models() and run_inference().
+    `station` (an entry of ROBOT_STATIONS) selects the arm; default is ROBOT_PORT etc.
+    """
+    kind = kind or SERVING_BACKEND
+    if kind == "policy_server":
+        if station is not None and station.get("policy_server_port"):
+            return PolicyServerClient(model_paths=SUSHI_MODEL_PATHS, port=int(station["policy_server_port"]))
+        return PolicyServerClient(model_paths=SUSHI_MODEL_PATHS)
+    if station is None:
+        return ModelInference(
+            model_paths=SUSHI_MODEL_PATHS,
+            robot_port=ROBOT_PORT,
+            robot_id=ROBOT_ID,
+            cameras=ROBOT_CAMERAS,
+            cache_dir=MODEL_CACHE_DIR,
+            offline=MODEL_CACHE_OFFLINE,
+            reset_time_s=SERVE_RESET_TIME_S,
+            recording=RECORDING_MODE,
+            record_every=RECORD_EVERY_N,
+            record_quota_bytes=RECORD_QUOTA_MB * 1e6,
+        )
+    return ModelInference(
+        model_paths=SUSHI_MODEL_PATHS,
+        robot_port=station["robot_port"],
+        robot_id=station.get("robot_id", ROBOT_ID),
+        cameras=station.get("cameras", ROBOT_CAMERAS),
+        # Each arm records into its own dataset root, so two arms never write the same episode files
+        run_root=os.path.join(os.getcwd(), "eval_lerobot_dataset", station["name"]),
+        cache_dir=MODEL_CACHE_DIR,
+        offline=MODEL_CACHE_OFFLINE,
+        reset_time_s=SERVE_RESET_TIME_S,
+        recording=RECORDING_MODE,
+        record_every=RECORD_EVERY_N,
+        record_quota_bytes=RECORD_QUOTA_MB * 1e6,
+    )
+
+
+def create_order_pipeline(on_event=None):
+    """
+    Robot stage for recognized orders: an OrderPipeline on the shared backend with
+    one station, or a StationDispatcher over every arm in ROBOT_STATIONS.
+    """
+    if len(ROBOT_STATIONS) <= 1:
+        return OrderPipeline(serve_order, max_queue=PIPELINE_MAX_QUEUE, on_event=on_event)
+    stations = [
+        Station(
+            config["name"],
+            create_serving_backend(station=config),
+            menu=config.get("menu"),
+            warm_slots=config.get("warm_slots", 2),
+        )
+        for config in ROBOT_STATIONS
+    ]
+    return StationDispatcher(stations, serve_order, max_queue=PIPELINE_MAX_QUEUE, on_event=on_event)
+
+
+# Shared serving backend (keeps its model cache state between orders)
+_serving_backend = None
+_serving_backend_lock = threading.Lock()
+
+
+def get_serving_backend(backend=None):
+    """
+    Return the process-wide serving backend, creating it on first use.
+    `backend` (e.g. a ModelInference on a local hub) replaces the default on first creation.
+    """
+    global _serving_backend
+    with _serving_backend_lock:
+        if _serving_backend is None:
+            _serving_backend = backend if backend is not None else create_serving_backend()
+    return _serving_backend
+
+
+# Shared speculative warmer (one warm-up worker for all orders)
+_speculative_warmer = None
+
+
+def get_speculative_warmer():
+    """Return the process-wide SpeculativeWarmer, or None when SPECULATIVE_WARMUP is off."""
+    global _speculative_warmer
+    if not SPECULATIVE_WARMUP:
+        return None
+    backend = get_serving_backend()
+    with _serving_backend_lock:
+        if _speculative_warmer is None:
+            _speculative_warmer = SpeculativeWarmer(
+                backend, LOCAL_MATCHER, SUSHI_MODEL_PATHS, min_score=SPECULATION_MIN_SCORE
+            )
+    return _speculative_warmer
+
+
+# Shared order history (opened on first use, flushed at exit)
+_order_history = None
+_order_history_lock = threading.Lock()
+
+
+def get_order_history():
+    """Return the process-wide OrderHistory, or None when ORDER_HISTORY_PATH is empty."""
+    global _order_history
+    if not ORDER_HISTORY_PATH:
+        return None
+    with _order_history_lock:
+        if _order_history is None:
+            _order_history = OrderHistory(ORDER_HISTORY_PATH, kiosk=KIOSK_ID)
+            atexit.register(_order_history.close)
+    return _order_history
+
+
+def record_order_history(record):
+    """PhaseTracer on_finish hook: log the finished order (the write happens in a batch later)."""
+    history = get_order_history()
+    if history is not None:
+        history.record(record)
+
+
+# Shared demand prewarmer (learns from the order history, refreshes between orders)
+_demand_prewarmer = None
+
+
+def get_demand_prewarmer():
+    """Return the process-wide DemandPrewarmer, or None when DEMAND_PREWARM is off."""
+    global _demand_prewarmer
+    if not DEMAND_PREWARM:
+        return None
+    backend = get_serving_backend()
+    history = get_order_history()
+    with _serving_backend_lock:
+        if _demand_prewarmer is None:
+            predictor = DemandPredictor(SUSHI_MENU, half_life_s=DEMAND_HALF_LIFE_S)
+            if history is not None:
+                learned = predictor.fit(history.item_events(since=time.time() - DEMAND_HISTORY_DAYS * 86400))
+                print(f"📈 Demand predictor: learned from {learned} past dishes")
+            _demand_prewarmer = DemandPrewarmer(backend, predictor, SUSHI_MODEL_PATHS, budget=PREWARM_BUDGET)
+    return _demand_prewarmer
+
+
+def prefetch_models():
+    """Cache every menu model up front so the first order does not wait for a download."""
+    backend = get_serving_backend()
+    if hasattr(backend, "prefetch_all"):
+        print("\n📦 Prefetching all menu models...")
+        backend.prefetch_all()
+    prewarmer = get_demand_prewarmer()
+    if prewarmer is not None:
+        prewarmer.schedule()
+
+
+def execute_sushi_serving(orders, backend=None):
     """
     Execute robot action to serve ordered items using LeRobot models.
-    `orders` is a list of menu names (e.g., ["egg"], ["greentea cup"]).
+    `orders` is a list of menu names (e.g., ["egg"], ["tuna", "tuna", "greentea cup"]).
+    `backend` is a ModelInference or PolicyServerClient (see create_serving_backend()).
+
+    The items are served as one plan (see serving_plan.build_plan()): repeated
+    dishes run as N episodes of one policy, dishes with a loaded policy go first
+    and SERVE_LAST dishes go last.
+    Returns the run_plan() report with plan timings, or None without orders.
     """
     if not orders:
         # With current logic this should not happen, but keep the guard.
         print("No orders to execute.")
-        return
+        return None
 
-    # Initialize ModelInference
-    inference_runner = ModelInference(
-        model_paths=SUSHI_MODEL_PATHS,
-        robot_port="/dev/ttyACM2",
-        robot_id="my_awsome_follower_arm",
-        cameras="{top: {type: opencv, index_or_path: 8, width: 640, height: 480, fps: 30}, "
-                "wrist: {type: opencv, index_or_path: 10, width: 640, height: 480, fps: 30}}",
-        cache_dir="./model_cache",
-    )
+    inference_runner = backend if backend is not None else get_serving_backend()
 
-    # Cache models if not already cached
-    print("\n📦 Checking model cache...")
-    inference_runner.cache_models(model_names=orders)
+    plan = build_plan(orders, serve_last=SERVE_LAST, warm=resident_policies(inference_runner))
+    if len(orders) > 1:
+        print("\n📋 Serving plan: " + ", ".join(f"{order} x{n}" for order, n in plan))
 
-    # Execute each order
-    for order in orders:
-        if order not in SUSHI_MODEL_PATHS:
-            print(f"⚠️  No model available for: {order}")
-            continue
+    return run_plan(
+        inference_runner,
+        plan,
+        SUSHI_MODEL_PATHS,
+        step_kwargs=lambda order: dict(
+            task=f"Serve {order}",
+            repo_id=f"{HF_USERNAME}/eval_{order.replace(' ', '_')}",
+            episode_time_s=EPISODE_TIME_S,
+            display_data=True,
+        ),
+    )
 
-        print(f"\n🍣 Preparing to serve: {order}")
-        print(f"   Model: {SUSHI_MODEL_PATHS[order]}")
 
-        try:
-            inference_runner.run_inference(
-                model_name=order,
-                task=f"Serve {order}",
-                repo_id=f"{HF_USERNAME}/eval_{order.replace(' ', '_')}",
-                episode_time_s=20,
-                num_episodes=1,
-                display_data=True,
-            )
-            print(f"✅ Successfully served: {order}")
-        except Exception as e:
-            print(f"❌ Failed to serve {order}: {e}")
+def build_order_prompt(text):
+    """Fill ORDER_PROMPT_TEMPLATE for one transcript."""
+    return ORDER_PROMPT_TEMPLATE.format(
+        menu=json.dumps(SUSHI_MENU, ensure_ascii=False), text=text
+    )
 
 
-def recognize_order_with_gemini(text):
+def recognize_order_with_gemini(text, model=None, timeout_s=None):
     """
     Recognize order content using Gemini API.
 
     This function always returns a dict with:
         {
-            "order": "<one of SUSHI_MENU>",
+            "order": "<one of SUSHI_MENU>",           # the first item
+            "items": [{"order": "<one of SUSHI_MENU>", "quantity": n}, ...],
             "confidence": "high" | "medium" | "low"
         }
-    If Gemini or JSON parsing fails, it falls back to a random menu item.
+    If Gemini or JSON parsing fails, it falls back to a random menu item
+    (and the dict also has "fallback": True and "fallback_reason").
+
+    `model` is anything with `generate_content(prompt)` returning an object with
+    `.text`; by default the shared LLMClient from `get_llm_client()` is used
+    (pass an LLMClient with a StubBackend, or any stub, in tests).
+    `timeout_s` shortens the client's timeout for this request (the order deadline).
     """
     # Fallback in case of any error
     def fallback_result(reason: str):
         order = random.choice(SUSHI_MENU)
         print(f"⚠️  Falling back to random menu item due to: {reason}")
         print(f"   Selected fallback order: {order}")
-        return {"order": order, "confidence": "low"}
+        return {"order": order, "items": [{"order": order, "quantity": 1}], "confidence": "low",
+                "fallback": True, "fallback_reason": reason}
 
-    if not GEMINI_API_KEY:
+    if model is None and _llm_client is None and not GEMINI_API_KEY:
         print("⚠️  GEMINI_API_KEY environment variable is not set.")
         return fallback_result("missing GEMINI_API_KEY")
 
     try:
-        genai.configure(api_key=GEMINI_API_KEY)
-        model = genai.GenerativeModel("gemini-2.5-flash")  # or 'gemini-2.0-flash'
+        if model is None:
+            model = get_llm_client()
 
         # Create prompt
-        prompt = f"""
-The following is a transcribed text of a customer's spoken order at a sushi restaurant.
-Please recognize the ordered item from this text and return it in JSON format.
-
-Available menu:
-{json.dumps(SUSHI_MENU, ensure_ascii=False)}
-
-Customer's statement:
-"{text}"
-
-Instructions:
-1. Identify ONLY ONE item that the customer ordered from the menu.
-2. If multiple items are mentioned, select only the first or most prominent one.
-3. If the text is unclear, infer the menu item with similar pronunciation.
-4. You MUST return only the following JSON object (no extra explanation):
-
-{{
-    "order": "single item name",
-    "confidence": "high" or "medium" or "low"
-}}
-"""
+        prompt = build_order_prompt(text)
 
         # Call Gemini and parse
-        response = model.generate_content(prompt)
+        if timeout_s is None:
+            response = model.generate_content(prompt)
+        else:
+            response = model.generate_content(prompt, timeout_s=timeout_s)
         result_text = response.text.strip()
 
         # Extract JSON part (remove markdown code blocks)
@@ -163,32 +647,99 @@ Instructions:
 
         result = json.loads(result_text)
 
-        # Normalize and enforce that order is one of SUSHI_MENU
-        order = result.get("order")
+        # Normalize and enforce that every item is one of SUSHI_MENU
+        # (a single "order" is accepted too, as older prompts returned it)
+        items = normalize_items(
+            result.get("items") or [{"order": result.get("order")}], SUSHI_MENU, MAX_ITEM_QUANTITY
+        )
         confidence = result.get("confidence", "unknown")
 
-        if not order or order not in SUSHI_MENU:
+        if not items:
             # If Gemini returns something unexpected, fall back to random menu item
             return fallback_result("order not in SUSHI_MENU")
 
-        return {"order": order, "confidence": confidence}
+        return {"order": items[0]["order"], "items": items, "confidence": confidence}
 
     except json.JSONDecodeError as e:
         print(f"⚠️  JSON parsing error: {e}")
         return fallback_result("JSON parsing error")
+    except TimeoutError as e:
+        print(f"⚠️  Gemini API timeout: {e}")
+        return fallback_result("Gemini API timeout")
     except Exception as e:
         print(f"⚠️  Gemini API error: {e}")
         return fallback_result("Gemini API error")
 
 
-def main(status_callback=None):
+def guess_order(local):
     """
-    Main entry point.
+    Best guess when there is no time to ask the LLM: the local match below the
+    threshold, or a random menu item. Flagged for the customer to confirm.
+    """
+    items = normalize_items(local["items"], SUSHI_MENU, MAX_ITEM_QUANTITY) if local is not None else []
+    result = {"confidence": "low", "source": "local", "needs_confirmation": True}
+    if not items:
+        order = random.choice(SUSHI_MENU)
+        items = [{"order": order, "quantity": 1}]
+        result.update(fallback=True, fallback_reason="no time for the LLM")
+    print(f"🤔 Best guess: {describe_order(items_to_order(items))} (to be confirmed)")
+    return dict(result, order=items[0]["order"], items=items)
 
-    If `status_callback` is provided, it will be called at each processing phase as:
-        status_callback(phase, **info)
-    so that a UI can reflect the current state.
+
+def recognize_order(text, threshold=None, model=None, deadline=None):
+    """
+    Recognize the order, trying the local matcher and the interpretation cache
+    before the Gemini API.
+
+    Returns the same dict as `recognize_order_with_gemini()` plus
+    "source" ("local", "cache" or "llm"). Counts and timings for each path are
+    kept in RECOGNITION_STATS; cache hit/miss rates in ORDER_CACHE.stats().
+
+    With a limited `deadline` (order_deadline.OrderDeadline) the LLM only gets
+    the intent budget; when that is too short, or the LLM times out, the local
+    guess is used instead (see guess_order(), "needs_confirmation": True).
     """
+    if threshold is None:
+        threshold = LOCAL_MATCH_THRESHOLD
+
+    start = time.perf_counter()
+    local = LOCAL_MATCHER.match_items(text)
+    if local is not None and local["score"] >= threshold:
+        RECOGNITION_STATS.record("local", time.perf_counter() - start)
+        items = normalize_items(local["items"], SUSHI_MENU, MAX_ITEM_QUANTITY)
+        print(f"⚡ Local match: {describe_order(items_to_order(items))} "
+              f"(score {local['score']}, {local['method']})")
+        return {"order": local["order"], "items": items, "confidence": local["confidence"],
+                "source": "local"}
+
+    cached = ORDER_CACHE.get(text)
+    if cached is not None:
+        RECOGNITION_STATS.record("cache", time.perf_counter() - start)
+        print(f"📒 Cached interpretation: {describe_order(items_to_order(result_items(cached)))}")
+        return dict(cached, source="cache")
+
+    timeout_s = None
+    if deadline is not None and deadline.limited:
+        budget = deadline.stage_budget("intent")
+        if budget < LLM_MIN_BUDGET_S:
+            deadline.degrade("intent", "local", f"{budget:.1f}s left, LLM skipped")
+            RECOGNITION_STATS.record("local", time.perf_counter() - start)
+            return guess_order(local)
+        timeout_s = min(LLM_TIMEOUT_S, budget)
+
+    print("\n🤖 Analyzing order with Gemini API...")
+    result = recognize_order_with_gemini(text, model=model, timeout_s=timeout_s)
+    if timeout_s is not None and result.get("fallback_reason") == "Gemini API timeout":
+        deadline.degrade("intent", "local", f"LLM timed out after {timeout_s:.1f}s")
+        RECOGNITION_STATS.record("local", time.perf_counter() - start)
+        return guess_order(local)
+    ORDER_CACHE.put(text, result)
+    RECOGNITION_STATS.record("llm", time.perf_counter() - start)
+    return dict(result, source="llm")
+
+
+def make_notifier(status_callback):
+    """Wrap `status_callback` so that UI errors never break order processing."""
 
     def notify(phase, **info):
         """Small helper to send status updates to the UI via status_callback."""
@@ -198,66 +749,304 @@ def main(status_callback=None):
             except Exception as e:
                 print(f"[Status callback error @ {phase}]: {e}")
 
-    # Load Whisper model
+    return notify
+
+
+def trace_order(status_callback=None):
+    """
+    Return the status callback to use for one order: traced when TRACING_ENABLED
+    or the order history is on, otherwise `status_callback` unchanged. Pass the result to both take_order()
+    and serve_order() so the whole order lands in one trace.
+    """
+    if TRACER is None:
+        return status_callback
+    return TRACER.wrap(status_callback)
+
+
+def take_order(status_callback=None, asr_engine=None, recorder=None, confirm=None):
+    """
+    Order intake stage: record → transcribe → recognize.
+    Returns (text, order) without serving; see `main()` for the arguments.
+    `order` is a menu item, or a list of menu items for a multi-item order.
+
+    Intake runs against the ORDER_DEADLINE_S budget (see order_deadline.py);
+    each stage degrades rather than overrunning it, and the per-order report
+    is sent as the "deadline_report" phase. A guess made without the LLM
+    needs confirming: `confirm(order) -> bool` asks the customer, and a
+    rejected guess returns (text, None).
+    """
+    notify = make_notifier(status_callback)
+    deadline = new_order_deadline()
+    warmer = get_speculative_warmer()
+    speculation = warmer.begin() if warmer is not None else None
+
+    def on_partial(partial):
+        notify("partial_transcript", text=partial)
+        if speculation is not None:
+            speculation.observe(partial)
+
+    # Get Whisper model (no-op when it was already loaded at startup)
     notify("loading_model")
-    print(f"Loading Whisper model: {MODEL_SIZE}...")
-    model = WhisperModel(MODEL_SIZE, device=DEVICE, compute_type=COMPUTE_TYPE)
-    print("Loading complete\n")
-    notify("model_loaded")
-
-    # Record audio
-    print(f"Recording... ({RECORD_SECONDS} seconds) [Device: {MIC_DEVICE}]")
-    notify("recording_started", seconds=RECORD_SECONDS, device=MIC_DEVICE)
-
-    audio = sd.rec(
-        int(RECORD_SECONDS * MIC_SAMPLE_RATE),
-        samplerate=MIC_SAMPLE_RATE,
-        channels=MIC_CHANNELS,
-        dtype=np.float32,
-        device=MIC_DEVICE,
-    )
-    sd.wait()
-    print("Recording complete\n")
-    notify("recording_finished")
+    if asr_engine is None:
+        asr_engine = get_asr_engine()
+    else:
+        asr_engine.load()
+    notify("model_loaded", load_time_s=getattr(asr_engine, "load_time_s", None))
 
-    # Resample (48kHz → 16kHz)
-    audio_16k = resample_audio(audio.flatten(), MIC_SAMPLE_RATE, WHISPER_SAMPLE_RATE)
+    # Record audio (shorter when the deadline would leave too little time for the later stages)
+    max_seconds = RECORD_SECONDS
+    if deadline.limited:
+        max_seconds = min(RECORD_SECONDS, max(MIN_CAPTURE_SECONDS, deadline.stage_budget("capture")))
+        if max_seconds < RECORD_SECONDS:
+            max_seconds = max(MIN_CAPTURE_SECONDS, int(max_seconds * 10) / 10)  # round down, not past the budget
+            deadline.degrade("capture", "shortened", f"up to {max_seconds:.1f}s")
+    print(f"Recording... (up to {max_seconds} seconds) [Device: {MIC_DEVICE}]")
+    notify("recording_started", seconds=max_seconds, device=MIC_DEVICE, mode=CAPTURE_MODE)
+
+    # In streaming mode, start decoding while the customer is still speaking
+    transcriber = None
+    if recorder is None and CAPTURE_MODE != "fixed":
+        recorder = create_recorder()
+    if (
+        recorder is not None
+        and STREAMING_TRANSCRIPTION
+        and recorder.sample_rate % WHISPER_SAMPLE_RATE == 0
+    ):
+        transcriber = IncrementalTranscriber(
+            asr_engine,
+            sample_rate=WHISPER_SAMPLE_RATE,
+            language=LANGUAGE,
+            step_seconds=PARTIAL_STEP_SECONDS,
+            window_seconds=PARTIAL_WINDOW_SECONDS,
+            resampler=create_resampler(recorder.sample_rate),
+            capacity_seconds=RECORD_SECONDS + PREROLL_SECONDS,
+            on_partial=on_partial,
+        )
+
+    with deadline.stage("capture"):
+        audio, capture_rate, stopped_by = record_audio(
+            recorder, on_chunk=transcriber.feed if transcriber is not None else None,
+            max_seconds=max_seconds,
+        )
+    duration = len(audio) / capture_rate
+    print(f"Recording complete ({duration:.1f}s, {stopped_by})\n")
+    notify("recording_finished", duration=duration, stopped_by=stopped_by)
 
     # Transcribe
     print("Transcribing...")
-    notify("transcribing")
-    segments, _ = model.transcribe(audio_16k, language=LANGUAGE, vad_filter=True)
-
-    text = "".join([seg.text for seg in segments]).strip()
-    notify("transcribed", text=text)
+    if transcriber is not None:
+        notify("transcribing")
+        with deadline.stage("asr") as budget:
+            # Without time for the final decode, the last partial transcript has to do
+            expected = transcriber.final_decode_estimate()
+            final_decode = not (deadline.limited and transcriber.partial_text and (expected or 0.0) > budget)
+            if not final_decode:
+                deadline.degrade("asr", "partial", f"final decode ~{expected:.1f}s, {budget:.1f}s left")
+            text = transcriber.finish(final_decode=final_decode)
+        notify("transcribed", text=text)
+    else:
+        text = transcribe_recording(audio, capture_rate, asr_engine, notify, deadline=deadline)
 
     print("\n" + "=" * 50)
     print(f"Recognition result: {text}")
     print("=" * 50)
 
-    # Recognize order with Gemini API (or fallback)
-    print("\n🤖 Analyzing order with Gemini API...")
+    # Start warming the likely policy while the LLM is still interpreting
+    if speculation is not None:
+        speculation.observe(text)
+
+    # Recognize order locally, or with Gemini API (or fallback)
+    result = interpret_order(text, notify, deadline=deadline)
+    if speculation is not None:
+        outcome = speculation.resolve(result["order"])
+        notify("speculation_resolved", **outcome)
+    order = items_to_order(result_items(result))
+
+    if result.get("needs_confirmation"):
+        deadline.degrade("intent", "confirm", f"{result.get('confidence', 'low')} confidence guess")
+        notify("confirm_needed", order=order)
+        if confirm is not None and not confirm(order):
+            print("🚫 Order not confirmed; nothing will be served.")
+            order = None
+
+    report = deadline.report()
+    DEADLINE_STATS.record(report)
+    if report["missed"] or report["path"]:
+        print(f"⏱  Order deadline: {report['elapsed_s']:.1f}s of {ORDER_DEADLINE_S:.0f}s"
+              + (" (missed)" if report["missed"] else "")
+              + (f", {' > '.join(report['path'])}" if report["path"] else ""))
+    notify("deadline_report", deadline=report)
+    if order is None:
+        notify("order_cancelled")
+    return text, order
+
+
+def transcribe_recording(audio, sample_rate, asr_engine, notify, deadline=None):
+    """
+    Resample a complete recording to 16 kHz and transcribe it. With a limited
+    `deadline`, a decode expected to overrun the ASR budget runs on the fast
+    engine (FAST_ASR_MODEL_SIZE) or greedily instead.
+    """
+    deadline = deadline if deadline is not None else OrderDeadline()
+    notify("transcribing")
+    # Resample (48kHz → 16kHz)
+    notify("resampling")
+    audio_16k = resample_audio(audio, sample_rate, WHISPER_SAMPLE_RATE)
+    notify("resampled")
+    audio_s = len(audio_16k) / WHISPER_SAMPLE_RATE
+    engine, mode, options = asr_engine, "full", {}
+    with deadline.stage("asr") as budget:
+        expected = ASR_DECODE_ESTIMATOR.estimate("full", audio_s)
+        if deadline.limited and expected is not None and expected > budget:
+            fast_engine = get_fast_asr_engine()
+            if fast_engine is not None:
+                engine, mode = fast_engine, "small"
+            elif getattr(asr_engine, "beam_size", 1) > 1:
+                mode, options = "greedy", {"beam_size": 1}
+            if mode != "full":
+                deadline.degrade("asr", mode, f"expected {expected:.1f}s, {budget:.1f}s left")
+        start = time.perf_counter()
+        text = engine.transcribe(audio_16k, language=LANGUAGE, vad_filter=True, **options)
+        ASR_DECODE_ESTIMATOR.add(mode, audio_s, time.perf_counter() - start)
+    notify("transcribed", text=text)
+    return text
+
+
+def interpret_order(text, notify, deadline=None):
+    """Recognize the order in a transcript; returns the recognize_order() result."""
+    deadline = deadline if deadline is not None else OrderDeadline()
     notify("recognizing")
-    result = recognize_order_with_gemini(text)
+    with deadline.stage("intent"):
+        result = recognize_order(text, deadline=deadline)
 
-    # With the current implementation, result is always a dict with a valid menu item.
+    # With the current implementation, result is always a dict with valid menu items.
     order = result["order"]
+    items = result_items(result)
     confidence = result.get("confidence", "unknown")
-    notify("recognized", text=text, order=order, confidence=confidence)
+    notify("recognized", text=text, order=order, items=items, confidence=confidence,
+           source=result["source"], fallback=bool(result.get("fallback")))
 
     print("\n" + "=" * 50)
     print(f"[Order] (Confidence: {confidence})")
-    print(f"  ✓ {order}")
+    for item in items:
+        print(f"  ✓ {item['order']}" + (f" x{item['quantity']}" if item["quantity"] > 1 else ""))
     print("=" * 50)
+    return result
 
-    # Execute robot serving
+
+def serve_order(order, status_callback=None, backend=None):
+    """
+    Robot stage: serve one recognized order (a menu item or a list of them) as one plan.
+    Raises RuntimeError when a dish was not served (model not cached offline, the
+    robot run failed, ...); OrderPipeline / StationDispatcher report it as "serve_failed".
+    """
+    notify = make_notifier(status_callback)
+    # Demand prewarming manages the shared backend; station backends keep their own warm slots
+    prewarmer = get_demand_prewarmer() if backend is None else None
+    resident = None
+    if prewarmer is not None and hasattr(prewarmer.backend, "resident"):
+        resident = resident_policies(prewarmer.backend)
     print("\n🤖 Starting robot serving sequence...")
     notify("serving", order=order)
-    execute_sushi_serving([order])
-    notify("served", order=order)
+    report = execute_sushi_serving(order_items(order), backend=backend)
+    error = plan_error(report)
+    if error is not None:
+        raise RuntimeError(f"Serving failed ({error})")
+    notify("served", order=order, plan_s=report["total_s"] if report else None)
+    if prewarmer is not None:
+        prewarmer.observe(order_items(order), resident=resident)
+        prewarmer.schedule()
+
+
+def main(status_callback=None, asr_engine=None, recorder=None, confirm=None):
+    """
+    Main entry point.
+
+    If `status_callback` is provided, it will be called at each processing phase as:
+        status_callback(phase, **info)
+    so that a UI can reflect the current state.
 
+    `asr_engine` is the speech recognition engine to use (see asr_engine.ASREngine).
+    If omitted, the shared engine from `get_asr_engine()` is used, so the Whisper
+    model is only loaded for the first order.
+
+    `recorder` is an audio_capture.StreamingRecorder (or compatible object); pass one
+    built with `wav_stream_factory()` to feed a WAV file instead of the microphone.
+
+    `confirm(order) -> bool` is asked when the order is only a guess (see
+    take_order()); a rejected order is not served and is returned as None.
+    """
+    status_callback = trace_order(status_callback)
+    text, order = take_order(status_callback, asr_engine=asr_engine, recorder=recorder, confirm=confirm)
+    if order is not None:
+        try:
+            serve_order(order, status_callback)
+        except RuntimeError as e:
+            print(f"❌ {e}")
+            make_notifier(status_callback)("serve_failed", order=order, error=str(e))
     return text, order
 
 
+def confirm_in_terminal(order):
+    """CLI confirmation of a guessed order."""
+    answer = input(f"❓ Did you order {describe_order(order)}? [Y/n] ").strip().lower()
+    return answer in ("", "y", "yes")
+
+
+def run_order_loop(asr_engine=None, hands_free=False):
+    """
+    CLI pipeline mode: keep taking voice orders while the robot serves earlier ones.
+    Orders wait in a bounded queue (PIPELINE_MAX_QUEUE) in front of the robot.
+    With `hands_free`, orders start on a wake phrase (see create_listener()) instead of Enter.
+    """
+    pipeline = create_order_pipeline()
+    pipeline.start()
+    listener = create_listener() if hands_free else None
+    try:
+        while True:
+            if not pipeline.wait_for_capacity(timeout=0):
+                print(f"⏳ Robot queue is full ({pipeline.depth}), waiting...")
+                pipeline.wait_for_capacity()
+            recorder = None
+            if listener is not None:
+                print(f"\n👂 Listening ({listener.mode})... (Ctrl+C to quit)")
+                listener.skip_to_now()
+                wake = listener.wait_for_wake()
+                recorder = create_recorder(start_position=wake["start"])
+            elif input("\nPress Enter to take an order (q to quit): ").strip().lower() == "q":
+                break
+            status_callback = trace_order()
+            _, order = take_order(
+                status_callback, asr_engine=asr_engine, recorder=recorder,
+                confirm=confirm_in_terminal if listener is None else None,
+            )
+            if order is not None:
+                pipeline.submit(order, status_callback=status_callback)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pipeline.stop()
+        print(f"\n{pipeline.stats()}")
+        if TRACER is not None:
+            print(f"Latency: {TRACER.summary()}")
+        print(f"Deadline: {DEADLINE_STATS.stats()}")
+        if _speculative_warmer is not None:
+            print(f"Speculation: {_speculative_warmer.stats()}")
+        if listener is not None:
+            print(f"Listener: {listener.stats()}")
+        if _demand_prewarmer is not None:
+            print(f"Prewarm: {_demand_prewarmer.stats()}")
+        if _order_history is not None:
+            _order_history.flush()
+            print(f"Order history: {_order_history.stats()}")
+
+
 if __name__ == "__main__":
-    main()
+    if PREFETCH_MODELS_AT_STARTUP:
+        prefetch_models()
+    engine = get_asr_engine(warm_up=True)
+    get_fast_asr_engine(load=True)
+    if "--pipeline" in sys.argv or HANDS_FREE or "--hands-free" in sys.argv:
+        run_order_loop(asr_engine=engine, hands_free=HANDS_FREE or "--hands-free" in sys.argv)
+    else:
+        main(asr_engine=engine, confirm=confirm_in_terminal)
@@ -1,9 +1,20 @@
+import importlib
+import json
 import os
 import threading
+import time
 import tkinter as tk
 from PIL import Image, ImageTk
 
-from sushi_voice_master import main, RECORD_SECONDS, MIC_DEVICE
+from serving_plan import describe_order, items_to_order, order_items
+from ui_assets import IMAGE_FILES, DishImageCache, image_path_for_order
+
+STARTUP_T0 = time.time()
+
+# sushi_voice_master pulls in numpy / scipy / sounddevice and the ASR / LLM clients;
+# it is imported in the background once the window is up (see load_backends()).
+master = None
+order_pipeline = None
 
 
 # ===== Path settings (look for images/ one level above sushi_voice_ui.py) =====
@@ -11,6 +22,21 @@ SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 IMAGES_DIR = os.path.join(SCRIPT_DIR, "..", "images")
 BACKGROUND_IMAGE = os.path.join(IMAGES_DIR, "amd_sushi_bg.png")
 
+# Show live p50/p95 stage latencies (needs SUSHI_TRACING=1)
+SHOW_LATENCY_OVERLAY = os.environ.get("SUSHI_LATENCY_OVERLAY", "1") == "1"
+
+# Print startup timings as JSON and exit once everything is loaded (bench_ui_startup.py)
+STARTUP_REPORT = os.environ.get("SUSHI_UI_STARTUP_REPORT", "0") == "1"
+startup_marks = {}
+
+# How long a guessed order waits for the customer's yes / no (no answer = not served)
+CONFIRM_TIMEOUT_S = 20.0
+
+
+def mark(name):
+    """Record a startup milestone (seconds since STARTUP_T0)."""
+    startup_marks.setdefault(name, round(time.time() - STARTUP_T0, 3))
+
 
 # ===== Create Tk window =====
 root = tk.Tk()
@@ -51,63 +77,44 @@ CENTER_Y = int(bg_height * 0.55)  # general vertical center of beige area
 # ===== Variables for labels, status, and item image =====
 status_var = tk.StringVar(value="Idle")
 result_var = tk.StringVar(value="No order yet.")
+robot_var = tk.StringVar(value="Robot: idle")
+ready_var = tk.StringVar(value="● Starting...")
 
 item_photo = None          # keep reference to ImageTk object
 item_image_id = None       # canvas id for the item image
+item_shown = None          # order whose image is on the canvas
+
+# Dish images are decoded and scaled once, in the background
+image_cache = DishImageCache(IMAGES_DIR, (int(bg_width * 0.30), int(bg_height * 0.35)), menu=IMAGE_FILES)
 
 # Soft background color that blends with the main image (tweak as you like)
 TEXT_BG = "#f8f4e8"
 
 
 def get_image_path_for_order(order: str) -> str:
-    """
-    Map an order string (e.g., 'Egg', 'Tuna', 'greentea cup') to an image file.
-    Default: lower-case, spaces -> underscores, then {name}.png
-    """
-    order_map = {
-        "egg": "egg.png",
-        "tuna": "tuna.png",
-        "cucumber roll": "cucumber_roll.png",
-        "tempura (fried shrimp)": "tempura.png",
-        "tempura": "tempura.png",          # extra alias, just in case
-        "greentea cup": "greentea_cup.png",
-        "green tea": "greentea_cup.png",   # alias
-        "tea": "greentea_cup.png",         # alias
-    }
-
-    key = order.lower().strip()
-    key_simple = key.replace(" ", "_")
-
-    filename = order_map.get(key, f"{key_simple}.png")
-    return os.path.join(IMAGES_DIR, filename)
+    """Map an order string to its image file (see ui_assets.IMAGE_FILES)."""
+    return image_path_for_order(IMAGES_DIR, order)
 
 
 def show_sushi_image(order: str):
     """
-    Load and display the image that matches the given order
+    Display the image that matches the given order
     (e.g., Egg -> egg.png, Tuna -> tuna.png, greentea cup -> greentea_cup.png)
-    on the right side of the canvas.
+    on the right side of the canvas, from the preloaded image cache.
     """
-    global item_photo, item_image_id
+    global item_photo, item_image_id, item_shown
 
-    if not order:
+    if not order or order == item_shown:
         return
 
-    img_path = get_image_path_for_order(order)
-
-    try:
-        img = Image.open(img_path)
-    except FileNotFoundError:
+    photo = image_cache.photo(order)
+    if photo is None:
         # Only show a simple status; this should not happen if images are prepared correctly.
         status_var.set(f"Image not found for order: {order}")
         return
 
-    # Resize image to fit nicely in the center-right area
-    max_width = int(bg_width * 0.30)
-    max_height = int(bg_height * 0.35)
-    img.thumbnail((max_width, max_height), Image.LANCZOS)
-
-    item_photo = ImageTk.PhotoImage(img)
+    item_photo = photo
+    item_shown = order
 
     if item_image_id is None:
         cx = RIGHT_X
@@ -142,6 +149,27 @@ result_label = tk.Label(
     fg="#000000",
     wraplength=int(bg_width * 0.5),
 )
+robot_label = tk.Label(
+    root,
+    textvariable=robot_var,
+    font=("Arial", 16),
+    bg=TEXT_BG,
+    fg="#000000",
+    wraplength=int(bg_width * 0.5),
+)
+ready_label = tk.Label(
+    root,
+    textvariable=ready_var,
+    font=("Arial", 14, "bold"),
+    bg=TEXT_BG,
+    fg="#cc8800",
+)
+
+
+def set_readiness(text, ready=False):
+    """Update the readiness indicator (orange while loading, green when ready)."""
+    ready_var.set(f"● {text}")
+    ready_label.configure(fg="#2e8b57" if ready else "#cc8800")
 
 
 # ===== Round "button" drawn on the canvas (left side) =====
@@ -173,9 +201,41 @@ def on_round_button_hover(enter: bool):
     canvas.itemconfigure(button_circle_id, fill=fill)
 
 
+# ===== Robot stage: serves recognized orders while new orders are taken =====
+intake_running = False
+
+
+def update_robot_status(phase, **info):
+    """Receive robot-stage events from the order pipeline and update the UI."""
+    def update():
+        depth = info.get("depth", 0)
+        waiting = f" ({depth} waiting)" if depth else ""
+        order = describe_order(info["order"]) if info.get("order") else None
+        # With several arms (StationDispatcher) events name the station
+        robot = f"Robot {info['station']}" if info.get("station") else "Robot"
+        if phase == "serving":
+            robot_var.set(f"{robot}: serving {order}{waiting}")
+        elif phase == "served":
+            robot_var.set(f"{robot}: finished {order}{waiting}" if depth else "Robot: idle")
+        elif phase == "serve_failed":
+            robot_var.set(f"{robot}: failed to serve {order}{waiting}")
+        elif phase == "queued":
+            robot_var.set(f"Robot queue: {depth}/{master.PIPELINE_MAX_QUEUE}")
+
+        # Backpressure: only accept a new order when the queue has room.
+        if not intake_running:
+            set_button_enabled(order_pipeline.has_capacity())
+
+    root.after(0, update)
+
+
+# Optional headless order API next to the window (tablets etc. share the same robot queue)
+ORDER_API_PORT = os.environ.get("SUSHI_ORDER_API_PORT")
+
+
 def on_round_button_click(event):
     """Handle click on the round button."""
-    if not button_enabled:
+    if not button_enabled or order_pipeline is None:
         return
     start_recording()
 
@@ -218,11 +278,71 @@ def create_round_button():
         canvas.tag_bind(item, "<Enter>", lambda e: on_round_button_hover(True))
         canvas.tag_bind(item, "<Leave>", lambda e: on_round_button_hover(False))
 
-    set_button_enabled(True)
+    # Enabled once the backends are loaded (see on_backends_ready())
+    set_button_enabled(order_pipeline is not None)
 
 
-def start_recording():
-    """Callback called when the round button is pressed → start voice order."""
+def confirm_order(order):
+    """
+    Ask the customer to confirm a guessed order (master.take_order(confirm=...)).
+    Called from the intake thread; the Yes / No window runs on the Tk thread and
+    is not modal. Returns True only for "Yes" within CONFIRM_TIMEOUT_S; after
+    that the window is closed and later clicks are ignored.
+    """
+    lock = threading.Lock()
+    answered = threading.Event()
+    state = {"answer": None, "expired": False, "window": None}
+
+    def close_window():
+        if state["window"] is not None:
+            state["window"].destroy()
+            state["window"] = None
+
+    def answer(yes):
+        with lock:
+            if state["expired"] or state["answer"] is not None:
+                return
+            state["answer"] = yes
+        close_window()
+        answered.set()
+
+    def ask():
+        with lock:
+            if state["expired"]:
+                return
+        window = tk.Toplevel(root, bg=TEXT_BG)
+        window.title("Please confirm")
+        window.transient(root)
+        window.protocol("WM_DELETE_WINDOW", lambda: answer(False))
+        tk.Label(
+            window, text=f"Did you order {describe_order(order)}?",
+            font=("Arial", 20, "bold"), bg=TEXT_BG,
+        ).pack(padx=30, pady=(25, 15))
+        buttons = tk.Frame(window, bg=TEXT_BG)
+        buttons.pack(pady=(0, 25))
+        for text, yes in (("Yes", True), ("No", False)):
+            tk.Button(
+                buttons, text=text, width=8, font=("Arial", 18, "bold"),
+                command=lambda yes=yes: answer(yes),
+            ).pack(side="left", padx=10)
+        state["window"] = window
+
+    root.after(0, ask)
+    if not answered.wait(CONFIRM_TIMEOUT_S):
+        with lock:
+            if state["answer"] is None:
+                state["expired"] = True
+        root.after(0, close_window)
+    return state["answer"] is True
+
+
+def start_recording(start_position=None):
+    """
+    Callback called when the round button is pressed → start voice order.
+    A hands-free wake passes `start_position` (where the order audio begins in the mic buffer).
+    """
+    global intake_running
+    intake_running = True
     status_var.set("Listening... Please speak your order.")
     result_var.set("Waiting for your voice...")
     set_button_enabled(False)
@@ -231,51 +351,76 @@ def start_recording():
         """Receive status updates from sushi_voice_master and update the UI."""
         def update():
             if phase == "recording_started":
-                status_var.set(
-                    f"Listening... Please speak your order. "
-                    f"({RECORD_SECONDS} seconds)"
-                )
+                seconds = info.get("seconds", master.RECORD_SECONDS)
+                if info.get("mode") == "streaming":
+                    status_var.set(
+                        f"Listening... Please speak your order. "
+                        f"(up to {seconds} seconds)"
+                    )
+                else:
+                    status_var.set(
+                        f"Listening... Please speak your order. "
+                        f"({seconds} seconds)"
+                    )
             elif phase == "recording_finished":
                 status_var.set("Recording finished. Decoding your order, please wait...")
+            elif phase == "partial_transcript":
+                result_var.set(f"Hearing: {info.get('text', '')}")
             elif phase == "transcribing":
                 status_var.set("Decoding your voice, please wait...")
             elif phase == "recognizing":
                 status_var.set("Understanding your order, please wait...")
             elif phase == "recognized":
                 order = info.get("order")
-                # Backend guarantees order is always a valid menu item.
+                # Backend guarantees order is always a valid menu item (the first of the items).
+                items = info.get("items") or [{"order": order}]
                 status_var.set("Order recognized.")
-                result_var.set(f"Order recognized: {order}")
+                result_var.set(f"Order recognized: {describe_order(items_to_order(items))}")
                 show_sushi_image(order)
-            elif phase == "serving":
-                order = info.get("order")
-                status_var.set(f"Serving the robot: {order} ...")
-            elif phase == "served":
-                order = info.get("order")
-                status_var.set(f"Robot finished serving: {order}")
+            elif phase == "confirm_needed":
+                # Recognized without the LLM (order deadline): served only once confirmed
+                status_var.set("Not quite sure I heard that right - please confirm your order.")
 
         root.after(0, update)
 
     def worker():
-        """Run the heavy processing (recording + decoding) in a separate thread."""
+        """Run order intake (recording + decoding) in a separate thread, then queue the order."""
         try:
-            text, order = main(status_callback=status_callback)
+            traced_callback = master.trace_order(status_callback)
+            recorder = None
+            if start_position is not None:
+                recorder = master.create_recorder(start_position=start_position)
+            text, order = master.take_order(
+                status_callback=traced_callback, recorder=recorder, confirm=confirm_order
+            )
+            if order is not None:
+                order_pipeline.submit(order, status_callback=traced_callback)
 
             def finalize():
-                # `order` is always one of the menu items.
-                status_var.set("Order completed.")
-                result_var.set(f"Final order: {order}")
-                show_sushi_image(order)
-                set_button_enabled(True)
+                # `order` is one of the menu items, or a list of them for a multi-item order
+                # (None when the customer rejected a guessed order).
+                global intake_running
+                intake_running = False
+                if order is None:
+                    status_var.set("Order cancelled. Please press the button to order again.")
+                    result_var.set("Nothing will be served.")
+                    set_button_enabled(order_pipeline.has_capacity())
+                    return
+                status_var.set("Order accepted. Next customer, please!")
+                result_var.set(f"Final order: {describe_order(order)}")
+                show_sushi_image(order_items(order)[0])
+                set_button_enabled(order_pipeline.has_capacity())
 
             root.after(0, finalize)
 
         except Exception as e:
             # This is only for unexpected Python errors, not recognition failures.
             def on_error():
+                global intake_running
+                intake_running = False
                 status_var.set("Error occurred.")
                 result_var.set(f"Error: {e}")
-                set_button_enabled(True)
+                set_button_enabled(order_pipeline.has_capacity())
 
             root.after(0, on_error)
 
@@ -286,8 +431,164 @@ def start_recording():
 canvas.create_window(CENTER_X, int(bg_height * 0.32), window=instruction_label)
 canvas.create_window(CENTER_X, int(bg_height * 0.50), window=status_label)
 canvas.create_window(CENTER_X, int(bg_height * 0.68), window=result_label)
+canvas.create_window(CENTER_X, int(bg_height * 0.80), window=robot_label)
+canvas.create_window(int(bg_width * 0.02), int(bg_height * 0.02), window=ready_label, anchor="nw")
+
+
+def show_latency_overlay():
+    """Show live stage latencies from the tracer, refreshed every two seconds."""
+    latency_var = tk.StringVar(value="")
+    latency_label = tk.Label(
+        root,
+        textvariable=latency_var,
+        font=("Courier", 11),
+        bg=TEXT_BG,
+        fg="#555555",
+        justify="left",
+    )
+    canvas.create_window(int(bg_width * 0.98), int(bg_height * 0.98), window=latency_label, anchor="se")
+
+    def refresh_latency_overlay():
+        """Refresh the latency overlay from the tracer every two seconds."""
+        latency_var.set(master.TRACER.overlay_text())
+        root.after(2000, refresh_latency_overlay)
+
+    refresh_latency_overlay()
 
 # ===== Create the round button on the left =====
 create_round_button()
 
+
+def preload_asr_engine():
+    """Load and warm up the Whisper model once, in the background, at startup."""
+    status_var.set("Loading speech model...")
+    set_readiness("Loading speech model...")
+
+    def worker():
+        if master.PREFETCH_MODELS_AT_STARTUP:
+            # Menu models download in parallel with the Whisper load.
+            threading.Thread(target=master.prefetch_models, daemon=True).start()
+        if master.ALWAYS_ON_MIC:
+            # Open the mic now so the first order starts recording (with pre-roll) instantly.
+            try:
+                master.get_mic_input()
+            except Exception as e:
+                print(f"⚠️  Could not open the microphone: {e}")
+        try:
+            engine = master.get_asr_engine(warm_up=True)
+            master.get_fast_asr_engine(load=True)
+            message = (
+                f"Ready. (model load {engine.load_time_s:.1f}s, "
+                f"warm-up {engine.warmup_time_s:.1f}s)"
+            )
+            ready = True
+        except Exception as e:
+            message = f"Speech model failed to load: {e}"
+            ready = False
+
+        def update():
+            mark("asr_ready")
+            set_readiness("Ready" if ready else "Speech model failed", ready=ready)
+            # Do not overwrite the status of an order that is already running.
+            if button_enabled:
+                status_var.set(message)
+            if STARTUP_REPORT:
+                report_startup()
+
+        root.after(0, update)
+
+    threading.Thread(target=worker, daemon=True).start()
+
+
+def load_backends():
+    """Decode the dish images and import sushi_voice_master in background threads."""
+
+    def images():
+        image_cache.preload()
+        mark("images_ready")
+
+    def backends():
+        try:
+            module = importlib.import_module("sushi_voice_master")
+        except Exception as e:
+            def on_error():
+                set_readiness("Backends failed to load")
+                status_var.set(f"Error: {e}")
+
+            root.after(0, on_error)
+            return
+        mark("backends_imported")
+        root.after(0, lambda: on_backends_ready(module))
+
+    threading.Thread(target=images, daemon=True).start()
+    threading.Thread(target=backends, daemon=True).start()
+
+
+def on_backends_ready(module):
+    """Start the robot pipeline and background loaders once sushi_voice_master is imported."""
+    global master, order_pipeline
+    master = module
+    order_pipeline = master.create_order_pipeline(on_event=update_robot_status).start()
+    if ORDER_API_PORT:
+        from order_api import OrderService, start_in_thread
+
+        start_in_thread(OrderService(pipeline=order_pipeline), port=int(ORDER_API_PORT))
+    if SHOW_LATENCY_OVERLAY and master.TRACING_ENABLED:
+        show_latency_overlay()
+
+    mark("backends_ready")
+    set_button_enabled(True)
+    preload_asr_engine()
+    if master.HANDS_FREE:
+        start_hands_free_listener()
+
+
+def report_startup():
+    """Print startup milestones and time-to-image per dish as JSON, then close the window."""
+    image_cache.ready.wait()
+    time_to_image = {}
+    for order in IMAGE_FILES:
+        start = time.perf_counter()
+        show_sushi_image(order)
+        root.update_idletasks()
+        time_to_image[order] = round((time.perf_counter() - start) * 1000, 2)
+    print(json.dumps({
+        "t0": STARTUP_T0, "startup": startup_marks, "time_to_image_ms": time_to_image,
+    }), flush=True)
+    root.after(100, root.destroy)
+
+
+def start_hands_free_listener():
+    """Listen for the wake phrase in the background and start an order like a button press."""
+
+    def worker():
+        try:
+            listener = master.create_listener()
+        except Exception as e:
+            print(f"⚠️  Hands-free listening unavailable: {e}")
+            return
+        while True:
+            # Only listen while a new order could be taken
+            if intake_running or not button_enabled:
+                time.sleep(0.2)
+                listener.skip_to_now()
+                continue
+            wake = listener.wait_for_wake(timeout=0.5)
+            if wake is None:
+                continue
+
+            def trigger(start=wake["start"]):
+                if button_enabled and not intake_running:
+                    start_recording(start_position=start)
+
+            root.after(0, trigger)
+            deadline = time.monotonic() + 1.0
+            while not intake_running and time.monotonic() < deadline:
+                time.sleep(0.05)
+
+    threading.Thread(target=worker, daemon=True).start()
+
+
+root.after(0, lambda: mark("window_shown"))
+load_backends()
 root.mainloop()
@@ -0,0 +1,19 @@
+"""
+Test setup: the modules live one directory up, and the tests never touch a
+real microphone, order history or network (see fake_hardware.py).
+"""
+
+import os
+import sys
+
+CODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, CODE_DIR)
+
+# Read by sushi_voice_master at import time
+os.environ["SUSHI_ORDER_HISTORY"] = ""
+os.environ["SUSHI_DEMAND_PREWARM"] = "0"
+os.environ["SUSHI_SPECULATIVE_WARMUP"] = "0"
+
+from fake_hardware import FakeSoundDevice  # noqa: E402
+
+sys.modules["sounddevice"] = FakeSoundDevice(realtime=False)
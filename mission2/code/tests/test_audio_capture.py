@@ -0,0 +1,49 @@
+"""Ring buffer and always-on recording."""
+
+import numpy as np
+import pytest
+
+from audio_capture import AlwaysOnInput, RingBuffer, StreamingRecorder
+
+RATE = 1000  # samples per second; small so the tests can reason in samples
+
+
+def feed(source, n):
+    """Write `n` samples as if the microphone callback delivered them."""
+    source._callback(np.arange(source.position, source.position + n, dtype=np.float32), n, None, None)
+
+
+def test_ring_buffer_view_is_contiguous_across_the_wrap():
+    ring = RingBuffer(8)
+    ring.write(np.arange(13, dtype=np.float32))
+    assert ring.oldest == 5
+    assert ring.view(6, 12).tolist() == [6, 7, 8, 9, 10, 11]
+    assert ring.latest(3).tolist() == [10, 11, 12]
+    with pytest.raises(ValueError):
+        ring.view(4, 8)
+
+
+def test_recording_reads_from_the_ring_buffer():
+    source = AlwaysOnInput(sample_rate=RATE, buffer_seconds=2.0)
+    feed(source, 1500)
+    recorder = StreamingRecorder(source=source, max_seconds=1.0, preroll_seconds=0.0, start_position=0)
+    audio = recorder.record()
+    assert recorder.stopped_by == "max_duration"
+    assert audio.tolist() == list(range(1000))
+
+
+def test_recording_stops_cleanly_when_the_microphone_overruns_it():
+    source = AlwaysOnInput(sample_rate=RATE, buffer_seconds=2.0)
+    feed(source, 500)
+    recorder = StreamingRecorder(source=source, max_seconds=1.0, preroll_seconds=0.0, start_position=0)
+    chunks = []
+
+    def on_chunk(chunk, is_speech):
+        chunks.append(len(chunk))
+        if len(chunks) == 1:
+            feed(source, 3000)  # the reader stalls while the mic writes past the whole buffer
+
+    audio = recorder.record(on_chunk=on_chunk)
+    assert recorder.stopped_by == "overrun"
+    assert len(chunks) == 1
+    assert len(audio) == 0  # what was read has been overwritten
@@ -0,0 +1,45 @@
+"""Quantity parsing of the local order matcher."""
+
+import pytest
+
+from intent_matcher import LocalIntentMatcher, MENU_ALIASES
+
+matcher = LocalIntentMatcher(list(MENU_ALIASES))
+
+
+def items(text):
+    result = matcher.match_items(text)
+    return [(item["order"], item["quantity"]) for item in result["items"]], result["method"]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("tuna", [("tuna", 1)]),
+    ("a tuna please", [("tuna", 1)]),
+    ("three tuna please", [("tuna", 3)]),
+    ("2 eggs", [("egg", 2)]),
+    ("two tuna and a green tea", [("tuna", 2), ("greentea cup", 1)]),
+    ("one egg, one egg", [("egg", 2)]),
+])
+def test_quantities_read_locally(text, expected):
+    parsed, method = items(text)
+    assert parsed == expected
+    assert method != "ambiguous"
+
+
+@pytest.mark.parametrize("text", [
+    "i want ten tuna",        # above MAX_LOCAL_QUANTITY
+    "seven eggs",
+    "a dozen eggs",           # an amount the fast path does not read
+    "a couple of tuna",
+    "two three tuna",         # two numbers for one dish
+    "twenty cucumber rolls",
+])
+def test_unsure_amounts_are_left_to_the_llm(text):
+    result = matcher.match_items(text)
+    assert result["method"] == "ambiguous"
+    assert result["score"] < 0.85  # below the default LOCAL_MATCH_THRESHOLD
+
+
+def test_quantity_words_do_not_match_dishes():
+    assert matcher.match_items("ten") is None
+    assert matcher.match_items("two and three") is None
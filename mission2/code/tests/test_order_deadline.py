@@ -0,0 +1,68 @@
+"""Deadline budgets and the degradation path of intent recognition."""
+
+import pytest
+
+import sushi_voice_master as master
+from order_deadline import DeadlineStats, OrderDeadline
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_stage_budget_keeps_the_later_stages_reserves():
+    clock = FakeClock()
+    deadline = OrderDeadline(budget_s=5.0, reserves={"asr": 1.5, "intent": 1.0}, clock=clock)
+    assert deadline.stage_budget("capture") == pytest.approx(2.5)
+    assert deadline.stage_budget("asr") == pytest.approx(4.0)
+    clock.now = 4.5
+    assert deadline.stage_budget("intent") == pytest.approx(0.5)
+    clock.now = 6.0
+    assert deadline.stage_budget("intent") == 0.0
+
+
+def test_overrun_stage_is_reported_as_a_miss():
+    clock = FakeClock()
+    deadline = OrderDeadline(budget_s=3.0, clock=clock)
+    with deadline.stage("capture") as budget:
+        clock.now += budget + 0.2
+    with deadline.stage("asr"):
+        clock.now += 0.1
+    deadline.degrade("asr", "greedy", "0.3s left")
+    report = deadline.report()
+    assert report["stage_misses"] == ["capture"]
+    assert report["path"] == ["asr:greedy"]
+    assert not report["missed"]
+
+    stats = DeadlineStats()
+    stats.record(report)
+    assert stats.stats()["orders"] == 1
+
+
+def test_unlimited_deadline_never_degrades():
+    deadline = OrderDeadline()
+    assert deadline.stage_budget("intent") == float("inf")
+    with deadline.stage("intent"):
+        pass
+    assert deadline.report()["stage_misses"] == []
+
+
+def test_intent_falls_back_to_a_local_guess_without_time_for_the_llm():
+    class NoLLM:
+        def generate_content(self, prompt, timeout_s=None):
+            raise AssertionError("the LLM must be skipped")
+
+    master.ORDER_CACHE.clear()
+    clock = FakeClock()
+    deadline = OrderDeadline(budget_s=2.0, clock=clock)
+    clock.now = 1.8  # 0.2s left for the intent stage, below LLM_MIN_BUDGET_S
+    result = master.recognize_order("i want ten tuna", model=NoLLM(), deadline=deadline)
+
+    assert result["order"] == "tuna"
+    assert result["needs_confirmation"] is True
+    assert result["source"] == "local"
+    assert deadline.report()["path"] == ["intent:local"]
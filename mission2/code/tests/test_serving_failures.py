@@ -0,0 +1,82 @@
+"""A dish that is not served must end the order as "serve_failed", never "served"."""
+
+import functools
+
+import pytest
+
+import sushi_voice_master as master
+from order_pipeline import OrderPipeline
+from serving_plan import plan_error
+from station_dispatcher import Station, StationDispatcher
+
+
+class FailingBackend:
+    """Serving backend whose cache check or robot run fails."""
+
+    def __init__(self, cache_error=None, run_error=None):
+        self.cache_error = cache_error
+        self.run_error = run_error
+        self.runs = []
+
+    def cache_models(self, model_names=None, verify=False):
+        if self.cache_error:
+            raise RuntimeError(self.cache_error)
+
+    def run_inference(self, model_name, num_episodes=1, **kwargs):
+        self.runs.append(model_name)
+        if self.run_error:
+            raise RuntimeError(self.run_error)
+
+
+def collect(events):
+    return lambda phase, **info: events.append((phase, info))
+
+
+@pytest.mark.parametrize("backend, reason", [
+    (FailingBackend(run_error="lerobot-record failed for tuna (exit code 1)"), "exit code 1"),
+    (FailingBackend(cache_error="tuna is not cached (offline)"), "not cached"),
+])
+def test_serve_order_raises_instead_of_reporting_served(backend, reason):
+    events = []
+    with pytest.raises(RuntimeError, match=reason):
+        master.serve_order("tuna", status_callback=collect(events), backend=backend)
+    assert [phase for phase, _ in events] == ["serving"]
+
+
+def test_plan_error_names_the_failed_dish():
+    report = {"steps": [{"order": "egg", "ok": True},
+                        {"order": "tuna", "ok": False, "error": "arm offline"}]}
+    assert plan_error(report) == "tuna: arm offline"
+    assert plan_error({"steps": [{"order": "egg", "ok": True}]}) is None
+    assert plan_error({"steps": [], "error": "offline"}) == "offline"
+
+
+def test_pipeline_reports_serve_failed():
+    backend = FailingBackend(run_error="arm offline")
+    pipeline_events, order_events = [], []
+    pipeline = OrderPipeline(
+        functools.partial(master.serve_order, backend=backend), on_event=collect(pipeline_events)
+    ).start()
+    pipeline.submit("tuna", status_callback=collect(order_events))
+    pipeline.stop()
+
+    assert backend.runs == ["tuna"]
+    assert [phase for phase, _ in pipeline_events] == ["queued", "serving", "serve_failed"]
+    assert [phase for phase, _ in order_events] == ["serving", "serve_failed"]
+    assert "arm offline" in order_events[-1][1]["error"]
+    assert pipeline.stats()["failed"] == 1 and pipeline.stats()["served"] == 0
+
+
+def test_dispatcher_reports_serve_failed_per_station():
+    backend = FailingBackend(cache_error="egg is not cached (offline)")
+    dispatcher_events, order_events = [], []
+    dispatcher = StationDispatcher(
+        [Station("left", backend)], master.serve_order, on_event=collect(dispatcher_events)
+    ).start()
+    dispatcher.submit(["egg", "egg"], status_callback=collect(order_events))
+    dispatcher.stop()
+
+    assert [phase for phase, _ in dispatcher_events] == ["queued", "serving", "serve_failed"]
+    assert order_events[-1][0] == "serve_failed"
+    assert order_events[-1][1]["station"] == "left"
+    assert dispatcher.stats()["failed"] == 1 and dispatcher.stats()["served"] == 0
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Per-phase latency tracing built on the `status_callback(phase, **info)` hooks.
+
+`PhaseTracer.wrap(status_callback)` returns a callback that timestamps every
+phase of one order with a monotonic clock before forwarding it. Start/end
+phase pairs become stage spans (model load, capture, resample, ASR, intent,
+robot episode) that feed rolling p50/p95/p99 histograms. Finished orders are
+appended to a JSON-lines log and the histograms are exported as a
+Prometheus-style text file. When tracing is off nothing is wrapped at all.
+"""
+
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# stage name -> (start phase, end phase)
+STAGES = {
+    "model_load": ("loading_model", "model_loaded"),
+    "capture": ("recording_started", "recording_finished"),
+    "resample": ("resampling", "resampled"),
+    "asr": ("transcribing", "transcribed"),
+    "intent": ("recognizing", "recognized"),
+    "robot": ("serving", "served"),
+    "time_to_order": ("recording_started", "recognized"),
+    "end_to_end": ("recording_started", "served"),
+}
+FINAL_PHASES = ("served", "serve_failed", "order_cancelled")
+
+_END_PHASES = {}
+for _stage, (_start, _end) in STAGES.items():
+    _END_PHASES.setdefault(_end, []).append((_stage, _start))
+
+
+class RollingHistogram:
+    """Keeps the last `window` samples and reports percentiles over them."""
+
+    def __init__(self, window=500):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def percentile(self, pct):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
+
+
+class OrderTrace:
+    """Phase timestamps of one order."""
+
+    def __init__(self, trace_id):
+        self.trace_id = trace_id
+        self.started_at = time.time()
+        self.marks = {}     # phase -> monotonic seconds (first occurrence)
+        self.spans = {}     # stage -> seconds
+        self.info = {}
+
+
+class TracedCallback:
+    """Callable wrapper returned by `PhaseTracer.wrap()`; forwards to the wrapped callback."""
+
+    def __init__(self, tracer, trace, status_callback):
+        self.tracer = tracer
+        self.trace = trace
+        self.status_callback = status_callback
+
+    @property
+    def trace_id(self):
+        return self.trace.trace_id
+
+    def __call__(self, phase, **info):
+        self.tracer.mark(self.trace, phase, info)
+        if self.status_callback is not None:
+            self.status_callback(phase, **info)
+
+
+class PhaseTracer:
+    """
+    Collects phase timings for every order.
+
+    - `jsonl_path`: one JSON line per finished order (spans in seconds)
+    - `prometheus_path`: text exposition file rewritten after each order
+    - `on_finish(record)`: called with each finished order's record
+    """
+
+    def __init__(self, jsonl_path=None, prometheus_path=None, window=500,
+                 metric_prefix="sushi", on_finish=None):
+        self.jsonl_path = jsonl_path
+        self.on_finish = on_finish
+        self.prometheus_path = prometheus_path
+        self.metric_prefix = metric_prefix
+        self.histograms = {stage: RollingHistogram(window) for stage in STAGES}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.orders = 0
+
+    def wrap(self, status_callback=None):
+        """Start a new order trace and return its status callback."""
+        return TracedCallback(self, OrderTrace(next(self._ids)), status_callback)
+
+    def mark(self, trace, phase, info):
+        now = time.monotonic()
+        trace.marks.setdefault(phase, now)
+        for key in ("order", "text", "confidence", "source", "fallback", "stopped_by", "deadline"):
+            if key in info:
+                trace.info[key] = info[key]
+
+        for stage, start_phase in _END_PHASES.get(phase, ()):
+            start = trace.marks.get(start_phase)
+            if start is not None and stage not in trace.spans:
+                trace.spans[stage] = now - start
+                with self._lock:
+                    self.histograms[stage].add(trace.spans[stage])
+
+        if phase in FINAL_PHASES:
+            self.finish(trace, status=phase)
+
+    def finish(self, trace, status="done"):
+        """Write the order's record and refresh the exported metrics."""
+        with self._lock:
+            self.orders += 1
+        record = {
+            "trace_id": trace.trace_id,
+            "started_at": trace.started_at,
+            "status": status,
+            "spans": {k: round(v, 6) for k, v in trace.spans.items()},
+        }
+        record.update(trace.info)
+        if self.jsonl_path:
+            with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        if self.prometheus_path:
+            self.export_prometheus(self.prometheus_path)
+        if self.on_finish is not None:
+            self.on_finish(record)
+        return record
+
+    def summary(self):
+        with self._lock:
+            return {stage: h.summary() for stage, h in self.histograms.items() if h.count}
+
+    def prometheus_text(self):
+        name = f"{self.metric_prefix}_stage_latency_seconds"
+        lines = [
+            f"# HELP {name} Latency of each order processing stage.",
+            f"# TYPE {name} summary",
+        ]
+        with self._lock:
+            for stage, hist in self.histograms.items():
+                if not hist.count:
+                    continue
+                for quantile, pct in (("0.5", 50), ("0.95", 95), ("0.99", 99)):
+                    lines.append(
+                        f'{name}{{stage="{stage}",quantile="{quantile}"}} {hist.percentile(pct):.6f}'
+                    )
+                lines.append(f'{name}_sum{{stage="{stage}"}} {hist.total:.6f}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {hist.count}')
+            lines.append(f"# TYPE {self.metric_prefix}_orders_total counter")
+            lines.append(f"{self.metric_prefix}_orders_total {self.orders}")
+        return "\n".join(lines) + "\n"
+
+    def export_prometheus(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+    def overlay_text(self, stages=("asr", "intent", "robot", "time_to_order")):
+        """Short multi-line summary for an on-screen overlay."""
+        summary = self.summary()
+        lines = []
+        for stage in stages:
+            s = summary.get(stage)
+            if s:
+                lines.append(f"{stage}: p50 {s['p50'] * 1000:.0f} ms  p95 {s['p95'] * 1000:.0f} ms")
+        return "\n".join(lines)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Dish images for the order UI, decoded and scaled once.
+
+`show_sushi_image()` used to open the PNG and run a LANCZOS `thumbnail()` on
+the Tk thread for every recognized order. `DishImageCache.preload()` does
+that work once for the whole menu (in a background thread at startup); the
+Tk thread then only wraps the cached image in a PhotoImage the first time an
+item is shown and reuses it afterwards.
+"""
+
+import os
+import threading
+
+# Image file per order string (lower case); other items use "<name with underscores>.png"
+IMAGE_FILES = {
+    "egg": "egg.png",
+    "tuna": "tuna.png",
+    "cucumber roll": "cucumber_roll.png",
+    "tempura (fried shrimp)": "tempura.png",
+    "tempura": "tempura.png",          # extra alias, just in case
+    "greentea cup": "greentea_cup.png",
+    "green tea": "greentea_cup.png",   # alias
+    "tea": "greentea_cup.png",         # alias
+}
+
+
+def image_path_for_order(images_dir, order):
+    """
+    Map an order string (e.g., 'Egg', 'Tuna', 'greentea cup') to an image file.
+    Default: lower-case, spaces -> underscores, then {name}.png
+    """
+    key = order.lower().strip()
+    filename = IMAGE_FILES.get(key, f"{key.replace(' ', '_')}.png")
+    return os.path.join(images_dir, filename)
+
+
+def load_scaled(path, max_size):
+    """Decode an image and scale it to fit `max_size` (PIL Image, fully loaded)."""
+    from PIL import Image
+
+    with Image.open(path) as img:
+        img.thumbnail(max_size, Image.LANCZOS)
+        img.load()
+        return img.copy()
+
+
+class DishImageCache:
+    """
+    Scaled dish images keyed by menu item.
+
+    `preload()` (safe to run in any thread) decodes and scales every image;
+    `photo(order)` must be called on the Tk thread and returns a cached
+    ImageTk.PhotoImage, or None if the item has no image.
+    """
+
+    def __init__(self, images_dir, max_size, menu=()):
+        self.images_dir = images_dir
+        self.max_size = max_size
+        self.menu = list(menu)
+        self.images = {}  # image path -> scaled PIL image (None: file missing)
+        self.photos = {}  # image path -> ImageTk.PhotoImage
+        self._lock = threading.Lock()
+        self.ready = threading.Event()
+
+    def _image(self, path):
+        with self._lock:
+            if path in self.images:
+                return self.images[path]
+        try:
+            img = load_scaled(path, self.max_size)
+        except FileNotFoundError:
+            img = None
+        with self._lock:
+            return self.images.setdefault(path, img)
+
+    def preload(self):
+        """Decode and scale the image of every menu item."""
+        for order in self.menu:
+            self._image(image_path_for_order(self.images_dir, order))
+        self.ready.set()
+        return self
+
+    def photo(self, order):
+        from PIL import ImageTk
+
+        path = image_path_for_order(self.images_dir, order)
+        photo = self.photos.get(path)
+        if photo is None:
+            img = self._image(path)
+            if img is None:
+                return None
+            photo = self.photos[path] = ImageTk.PhotoImage(img)
+        return photo
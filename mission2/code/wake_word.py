@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Hands-free listening: wake-phrase spotting on the always-on microphone.
+
+`HandsFreeListener` reads the AlwaysOnInput ring buffer block by block and
+only computes an RMS energy per block while the room is quiet. A speech
+segment of wake-phrase length is handed to `KeywordSpotter` (MFCC + DTW
+against a few enrolled recordings of the wake phrase); only when it matches
+does the listener wake and the full Whisper pipeline record the order. In
+"utterance" mode any sustained speech wakes the listener instead, and the
+order recording starts at the beginning of that speech.
+
+Enroll the wake phrase from a few WAV recordings:
+
+    python wake_word.py enroll wake_phrase.npz hey_sushi_1.wav hey_sushi_2.wav ...
+"""
+
+import argparse
+import threading
+import time
+
+import numpy as np
+from scipy import signal
+
+from audio_capture import EnergyVAD, read_wav
+
+SPOTTER_SAMPLE_RATE = 16000
+
+
+# ===== Features =====
+def mel_filterbank(n_mels, n_fft, sample_rate, fmin=20.0, fmax=None):
+    """Triangular mel filters as an (n_mels, n_fft // 2 + 1) matrix."""
+    fmax = fmax or sample_rate / 2
+
+    def to_mel(f):
+        return 2595.0 * np.log10(1.0 + f / 700.0)
+
+    def to_hz(m):
+        return 700.0 * (10 ** (m / 2595.0) - 1.0)
+
+    points = to_hz(np.linspace(to_mel(fmin), to_mel(fmax), n_mels + 2))
+    bins = np.floor((n_fft + 1) * points / sample_rate).astype(int)
+    filters = np.zeros((n_mels, n_fft // 2 + 1), dtype=np.float32)
+    for i in range(n_mels):
+        left, center, right = bins[i], bins[i + 1], bins[i + 2]
+        if center > left:
+            filters[i, left:center] = (np.arange(left, center) - left) / (center - left)
+        if right > center:
+            filters[i, center:right] = (right - np.arange(center, right)) / (right - center)
+    return filters
+
+
+class MFCCExtractor:
+    """MFCCs with cepstral mean normalization; window, filters and DCT are precomputed."""
+
+    def __init__(self, sample_rate=SPOTTER_SAMPLE_RATE, n_mfcc=13, n_mels=26, frame_ms=25, hop_ms=10):
+        self.sample_rate = sample_rate
+        self.frame = int(sample_rate * frame_ms / 1000)
+        self.hop = int(sample_rate * hop_ms / 1000)
+        self.n_fft = 1 << (self.frame - 1).bit_length()
+        self.window = np.hamming(self.frame).astype(np.float32)
+        self.filters = mel_filterbank(n_mels, self.n_fft, sample_rate)
+        k = np.arange(n_mels)
+        self.dct = np.cos(np.pi / n_mels * (k + 0.5)[None, :] * np.arange(n_mfcc)[:, None]).astype(np.float32)
+
+    def __call__(self, audio):
+        audio = np.asarray(audio, dtype=np.float32)
+        if len(audio) < self.frame:
+            audio = np.pad(audio, (0, self.frame - len(audio)))
+        frames = np.lib.stride_tricks.sliding_window_view(audio, self.frame)[::self.hop]
+        spectrum = np.abs(np.fft.rfft(frames * self.window, n=self.n_fft)) ** 2
+        log_mel = np.log(spectrum @ self.filters.T + 1e-8)
+        mfcc = log_mel @ self.dct.T
+        return mfcc - mfcc.mean(axis=0)
+
+
+def dtw_distance(a, b):
+    """Dynamic-time-warping distance of two feature sequences, normalized by their lengths."""
+    cost = np.sqrt(((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=2))
+    n, m = cost.shape
+    previous = np.full(m + 1, np.inf)
+    previous[0] = 0.0
+    for i in range(n):
+        current = np.full(m + 1, np.inf)
+        diagonal_or_up = np.minimum(previous[:-1], previous[1:]) + cost[i]
+        for j in range(m):
+            current[j + 1] = min(diagonal_or_up[j], current[j] + cost[i, j])
+        previous = current
+    return float(previous[m] / (n + m))
+
+
+class KeywordSpotter:
+    """
+    Template-matching keyword spotter: a segment matches when its DTW
+    distance to the closest enrolled template is below `threshold`.
+    """
+
+    def __init__(self, templates=(), threshold=None, extractor=None):
+        self.extractor = extractor or MFCCExtractor()
+        self.templates = list(templates)
+        self.threshold = threshold
+
+    def enroll(self, audio, sample_rate):
+        features = self.extractor(to_spotter_rate(trim_silence(audio, sample_rate), sample_rate))
+        self.templates.append(features)
+        return features
+
+    def calibrate(self, margin=1.2):
+        """Set the threshold from the spread between the enrolled templates."""
+        if len(self.templates) < 2:
+            raise ValueError("Enroll at least two recordings of the wake phrase to calibrate")
+        distances = [
+            dtw_distance(a, b)
+            for i, a in enumerate(self.templates)
+            for b in self.templates[i + 1:]
+        ]
+        self.threshold = margin * max(distances)
+        return self.threshold
+
+    def score(self, audio, sample_rate):
+        """Distance of `audio` to the closest template (lower is better)."""
+        features = self.extractor(to_spotter_rate(audio, sample_rate))
+        return min(dtw_distance(features, template) for template in self.templates)
+
+    def save(self, path):
+        np.savez(path, threshold=self.threshold,
+                 **{f"template_{i}": template for i, template in enumerate(self.templates)})
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        templates = [data[key] for key in sorted(data.files, key=lambda k: (len(k), k)) if key.startswith("template_")]
+        return cls(templates, threshold=float(data["threshold"]))
+
+
+def to_spotter_rate(audio, sample_rate):
+    if sample_rate == SPOTTER_SAMPLE_RATE:
+        return np.asarray(audio, dtype=np.float32)
+    g = np.gcd(int(sample_rate), SPOTTER_SAMPLE_RATE)
+    return signal.resample_poly(audio, SPOTTER_SAMPLE_RATE // g, int(sample_rate) // g).astype(np.float32)
+
+
+def trim_silence(audio, sample_rate, block_ms=10):
+    """Cut leading and trailing non-speech blocks (EnergyVAD) off an enrollment recording."""
+    vad = EnergyVAD()
+    block = int(sample_rate * block_ms / 1000)
+    speech = [i for i in range(0, len(audio), block) if vad.is_speech(audio[i:i + block])]
+    if not speech:
+        return audio
+    return audio[speech[0]:speech[-1] + block]
+
+
+# ===== Listener =====
+class HandsFreeListener:
+    """
+    Wait on an AlwaysOnInput for a wake phrase (mode "phrase") or for any
+    sustained speech (mode "utterance").
+
+    `wait_for_wake()` returns {"reason", "start", "detected_at", "score",
+    "segment_s"}: `start` is the ring-buffer position the order recording
+    should start from (see `StreamingRecorder(start_position=...)`).
+    """
+
+    def __init__(self, source, spotter=None, mode="phrase", vad=None, block_ms=30,
+                 min_phrase_s=0.3, max_phrase_s=2.0, end_silence_s=0.25,
+                 min_utterance_s=0.4, utterance_preroll_s=0.3):
+        if mode == "phrase" and (spotter is None or spotter.threshold is None):
+            raise ValueError("Mode 'phrase' needs an enrolled, calibrated KeywordSpotter")
+        self.source = source
+        self.spotter = spotter
+        self.mode = mode
+        self.vad = vad or EnergyVAD()
+        self.block = int(source.sample_rate * block_ms / 1000)
+        rate = source.sample_rate
+        self.min_phrase = int(min_phrase_s * rate)
+        self.max_phrase = int(max_phrase_s * rate)
+        self.end_silence = int(end_silence_s * rate)
+        self.min_utterance = int(min_utterance_s * rate)
+        self.utterance_preroll = int(utterance_preroll_s * rate)
+        self.position = None
+        self._segment_start = None  # position where the current speech segment began
+        self._speech_samples = 0
+        self._silence_run = 0
+        self._stop = threading.Event()
+        # Statistics
+        self.cpu_s = 0.0
+        self.listen_s = 0.0
+        self.blocks = 0
+        self.spotter_runs = 0
+        self.wakes = 0
+
+    def skip_to_now(self):
+        """Ignore everything buffered so far (e.g. the order that was just taken)."""
+        self.position = self.source.position
+        self._segment_start = None
+        self.vad.reset()
+
+    def stop(self):
+        self._stop.set()
+
+    def wait_for_wake(self, timeout=None):
+        """Block until the listener wakes; None on timeout or after `stop()`."""
+        if self.position is None:
+            self.skip_to_now()
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            return self._listen(None if timeout is None else wall_start + timeout)
+        finally:
+            self.cpu_s += time.thread_time() - cpu_start
+            self.listen_s += time.perf_counter() - wall_start
+
+    def _listen(self, deadline):
+        rate = self.source.sample_rate
+        while not self._stop.is_set():
+            if deadline is not None and time.perf_counter() >= deadline:
+                return None
+            end = self.position + self.block
+            if self.source.position < end:
+                self.source.wait_for(end, timeout=0.5)
+                continue
+            if self.position < self.source.ring.oldest:
+                # Fell behind the ring buffer; resume from the oldest audio still held.
+                self.position = self.source.ring.oldest
+                self._segment_start = None
+                continue
+
+            chunk = self.source.ring.view(self.position, end)
+            self.position = end
+            self.blocks += 1
+            if self.vad.is_speech(chunk):
+                if self._segment_start is None:
+                    self._segment_start = end - self.block
+                    self._speech_samples = 0
+                self._speech_samples += self.block
+                self._silence_run = 0
+                if self.mode == "utterance" and self._speech_samples >= self.min_utterance:
+                    start = max(self.source.ring.oldest, self._segment_start - self.utterance_preroll)
+                    self._segment_start = None
+                    return self._wake("utterance", start, None, self._speech_samples / rate)
+                continue
+            if self._segment_start is None:
+                continue
+            self._silence_run += self.block
+            if self._silence_run < self.end_silence:
+                continue
+
+            segment_end = self.position - self._silence_run
+            length = segment_end - self._segment_start
+            self._segment_start = None
+            if self.mode != "phrase" or not (self.min_phrase <= length <= self.max_phrase):
+                continue
+            self.spotter_runs += 1
+            audio = self.source.ring.view(segment_end - length, segment_end)
+            score = self.spotter.score(audio, rate)
+            if score <= self.spotter.threshold:
+                return self._wake("phrase", self.position, score, length / rate)
+        return None
+
+    def _wake(self, reason, start, score, segment_s):
+        self.wakes += 1
+        return {
+            "reason": reason,
+            "start": start,
+            "detected_at": self.position,
+            "score": score,
+            "segment_s": segment_s,
+        }
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "cpu_percent": 100.0 * self.cpu_s / self.listen_s if self.listen_s else 0.0,
+            "blocks": self.blocks,
+            "spotter_runs": self.spotter_runs,
+            "wakes": self.wakes,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Wake-phrase enrollment")
+    sub = parser.add_subparsers(dest="command", required=True)
+    enroll = sub.add_parser("enroll", help="build wake-phrase templates from WAV recordings")
+    enroll.add_argument("output", help="template file (.npz)")
+    enroll.add_argument("wavs", nargs="+", help="recordings of the wake phrase")
+    enroll.add_argument("--margin", type=float, default=1.2,
+                        help="threshold = margin x largest distance between the recordings")
+    args = parser.parse_args()
+
+    spotter = KeywordSpotter()
+    for path in args.wavs:
+        audio, rate = read_wav(path)
+        spotter.enroll(audio, rate)
+    threshold = spotter.calibrate(args.margin)
+    spotter.save(args.output)
+    print(f"Enrolled {len(spotter.templates)} recordings, threshold {threshold:.2f} -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()